@@ -0,0 +1,114 @@
+"""
+注册 / 登录的数据库往返次数
+
+统计每个操作发出的 SQL 语句数和 commit 数，并与预期值比较（不一致时退出码为 1），
+防止后续修改重新引入多余的查询。除 service 函数外，也通过 ASGI 直接调用 /users/login 路由，
+把登录限流的读写计算在内。
+
+用法（在 MynoteBack 目录下）：
+    python -m benchmarks.bench_db_roundtrips
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="mynote-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'bench.db')}"
+os.environ.setdefault("AUTH_DEV_MODE", "true")
+os.environ["MUSIC_SCHEDULER_ENABLED"] = "false"
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import main  # noqa: E402,F401  (注册所有模型)
+from config import Base, engine  # noqa: E402
+from services import db_executor  # noqa: E402
+from services.user_service import authenticate_user, register_user  # noqa: E402
+
+
+class RoundtripCounter:
+    """通过 SQLAlchemy 事件统计语句数和 commit 数"""
+
+    def __init__(self, bind):
+        self.statements = []
+        self.commits = 0
+        event.listen(bind, "before_cursor_execute", self._on_execute)
+        event.listen(bind, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement.split(None, 1)[0].upper())
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    def reset(self) -> None:
+        self.statements = []
+        self.commits = 0
+
+
+async def _concurrent_admin_first_login() -> None:
+    # 两个请求都查不到 admin 后同时插入：后插入的一方回滚并读取已创建的用户，两者都登录成功
+    users = await asyncio.gather(*(authenticate_user(login="admin", password="123456") for _ in range(2)))
+    if None in users or users[0]["id"] != users[1]["id"]:
+        raise AssertionError(f"concurrent admin logins returned {users}")
+
+
+async def _login_route(login: str, password: str) -> None:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        response = await client.post("/users/login", json={"login": login, "password": password})
+    response.raise_for_status()
+
+
+# (名称, 操作, 预期语句数, 预期 commit 数)
+CASES = [
+    ("register", lambda: register_user(email="a@mynote.com", phone="100", username="a", password="secret1"), 1, 1),
+    ("register duplicate email", lambda: register_user(email="a@mynote.com", phone="200", username="b", password="secret1"), 2, 0),
+    ("register duplicate phone", lambda: register_user(email="c@mynote.com", phone="100", username="c", password="secret1"), 2, 0),
+    ("login by email", lambda: authenticate_user(login="a@mynote.com", password="secret1"), 1, 0),
+    ("login by phone", lambda: authenticate_user(login="100", password="secret1"), 1, 0),
+    ("login unknown", lambda: authenticate_user(login="nobody@mynote.com", password="secret1"), 1, 0),
+    # 两个请求各查一次、各插入一次，冲突的一方再查一次
+    ("admin first login, concurrent", _concurrent_admin_first_login, 5, 1),
+    ("admin login", lambda: authenticate_user(login="admin", password="123456"), 1, 0),
+    # 路由：限流计数为一条 upsert（每个窗口第一次还会清理过期记录）；窗口内第一次就成功时不再清零
+    ("route login, purge", lambda: _login_route("a@mynote.com", "secret1"), 3, 1),
+    ("route login", lambda: _login_route("100", "secret1"), 2, 1),
+    ("route login wrong password", lambda: _login_route("a@mynote.com", "wrong"), 2, 1),
+    ("route login after failure", lambda: _login_route("a@mynote.com", "secret1"), 3, 2),
+]
+
+
+async def _run() -> bool:
+    counter = RoundtripCounter(engine)
+    ok = True
+    print(f"{'operation':<32}{'statements':>11}{'expected':>10}{'commits':>9}{'expected':>10}  sql")
+    for name, op, expected_statements, expected_commits in CASES:
+        counter.reset()
+        try:
+            await op()
+            failed = ""
+        except Exception as e:
+            failed = f"  <-- {type(e).__name__}: {e}"
+        passed = not failed and len(counter.statements) == expected_statements and counter.commits == expected_commits
+        ok = ok and passed
+        print(
+            f"{name:<32}{len(counter.statements):>11}{expected_statements:>10}"
+            f"{counter.commits:>9}{expected_commits:>10}  {' '.join(counter.statements)}"
+            f"{failed or ('' if passed else '  <-- MISMATCH')}"
+        )
+    return ok
+
+
+def main_(argv=None) -> int:
+    Base.metadata.create_all(bind=engine)
+    db_executor.configure(0)
+    ok = asyncio.run(_run())
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
@@ -0,0 +1,127 @@
+"""
+/emotions/days 列表基准：Pydantic 往返 vs 原样输出存储的 JSON
+
+对比两种模式：
+- pydantic：解码事件 JSON -> EmotionDayData(**...).model_dump() -> jsonable_encoder -> JSONResponse（改造前的路径）
+- raw：事件以数据库中的 JSON 文本直接拼接输出（services.response.raw_success）
+
+用法（在 MynoteBack 目录下）：
+    python -m benchmarks.bench_emotions_list [--days 1000 10000] [--events 5] [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+_DB_DIR = tempfile.mkdtemp(prefix="mynote-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'bench.db')}"
+os.environ.setdefault("AUTH_DEV_MODE", "true")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import main  # noqa: E402,F401  (注册所有模型)
+from config import Base, SessionLocal, engine  # noqa: E402
+from models.emotion import EmotionDay, EmotionEventRecord  # noqa: E402
+from routers.emotions import list_emotion_days  # noqa: E402
+from schemas.emotion import EmotionDayData  # noqa: E402
+from services.emotion_service import list_days  # noqa: E402
+from services.response import success  # noqa: E402
+
+
+def _event(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "time": f"{9 + i % 12:02d}:00",
+        "hr": 70 + i % 30,
+        "hrv": 40 + i % 20,
+        "triggered": bool(i % 2),
+        "userInput": f"事件 {i}",
+        "emotion": ("Joy", "Calm", "Sadness", "Anger")[i % 4],
+        "phrase": [{"pitch": p, "duration": 0.5, "velocity": 0.7} for p in ("C4", "E4", "G4", "C5")],
+        "conversationId": None,
+        "aiTriggered": False,
+        "conversationSummary": None,
+    }
+
+
+def _seed(days: int, events: int) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            EmotionDay.__table__.insert(),
+            [
+                {"id": d + 1, "date": f"{2000 + d // 372:04d}-{d // 31 % 12 + 1:02d}-{d % 31 + 1:02d}",
+                 "data": {"finalPrompt": None, "musicGenerated": False}}
+                for d in range(days)
+            ],
+        )
+        conn.execute(
+            EmotionEventRecord.__table__.insert(),
+            [
+                {"day_id": d + 1, "event_id": e["id"], "emotion": e["emotion"], "time": e["time"], "data": e}
+                for d in range(days)
+                for e in (_event(d * events + i) for i in range(events))
+            ],
+        )
+
+
+def _pydantic_list(db) -> bytes:
+    items = list_days(db, None)
+    events = {obj.id: [] for obj in items}
+    rows = (
+        db.query(EmotionEventRecord.day_id, EmotionEventRecord.data)
+        .order_by(EmotionEventRecord.day_id, EmotionEventRecord.id)
+        .all()
+    )
+    for day_id, data in rows:
+        events[day_id].append(data)
+    data = [
+        EmotionDayData(date=obj.date, events=events[obj.id], **obj.data).model_dump()
+        for obj in items
+    ]
+    return JSONResponse(content=jsonable_encoder(success(data=data))).body
+
+
+def _raw_list(db) -> bytes:
+    return list_emotion_days(
+        date_from=None, date_to=None, cursor=None, limit=None, summary=False, user_id=None, db=db
+    ).body
+
+
+def _time(fn, repeat: int) -> dict:
+    samples, size = [], 0
+    for _ in range(repeat):
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            size = len(fn(db))
+            samples.append(time.perf_counter() - started)
+        finally:
+            db.close()
+    return {"mean_ms": statistics.mean(samples) * 1000, "min_ms": min(samples) * 1000, "bytes": size}
+
+
+def main_(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--events", type=int, default=5, help="每天的事件数")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"events/day={args.events} repeat={args.repeat} db={os.environ['DATABASE_URL']}")
+    print(f"{'days':>7}  {'mode':<10}{'mean(ms)':>10}{'min(ms)':>10}{'bytes':>12}")
+    for days in args.days:
+        _seed(days, args.events)
+        for mode, fn in (("pydantic", _pydantic_list), ("raw", _raw_list)):
+            r = _time(fn, args.repeat)
+            print(f"{days:>7}  {mode:<10}{r['mean_ms']:>10.1f}{r['min_ms']:>10.1f}{r['bytes']:>12}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
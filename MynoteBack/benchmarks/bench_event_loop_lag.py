@@ -0,0 +1,135 @@
+"""
+事件循环延迟基准：并发 generate + query 时，数据库操作对事件循环的阻塞
+
+对比两种模式：
+- inline：数据库操作直接在事件循环中执行（改造前 async 路由直接使用同步 Session 的行为）
+- executor：数据库操作通过 services.db_executor 的有界线程池执行
+
+用法（在 MynoteBack 目录下）：
+    python -m benchmarks.bench_event_loop_lag [--requests 400] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_DB_DIR = tempfile.mkdtemp(prefix="mynote-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'bench.db')}"
+os.environ.setdefault("AUTH_DEV_MODE", "true")
+os.environ.setdefault("SUNO_API_KEY", "bench")
+os.environ["MUSIC_SCHEDULER_ENABLED"] = "false"
+os.environ["MUSIC_CACHE_MAX_AGE_SECONDS"] = "0"
+os.environ["MUSIC_QUERY_CACHE_TTL"] = "0"
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from config import Base, engine  # noqa: E402
+from services import db_executor  # noqa: E402
+from services.suno_client import SunoClientFactory  # noqa: E402
+
+
+class FakeSunoClient:
+    """模拟 Suno：固定网络延迟，不访问外网"""
+
+    def __init__(self, latency: float = 0.005):
+        self.latency = latency
+        self._seq = 0
+
+    async def generate_music(self, **kwargs) -> str:
+        await asyncio.sleep(self.latency)
+        self._seq += 1
+        return f"bench-{self._seq}"
+
+    async def query_task(self, task_id: str):
+        await asyncio.sleep(self.latency)
+        return {"taskId": task_id, "status": "running", "musicUrl": None, "duration": None}
+
+    def pool_stats(self):
+        return {}
+
+
+def _daily_body(i: int) -> dict:
+    return {
+        "date": "2025-10-14",
+        "emotions": [
+            {"emotion": "Joy", "intensity": 0.8, "time": "09:00", "event": f"事件 {i}"},
+            {"emotion": "Calm", "intensity": 0.4, "time": "14:00", "event": "工作"},
+        ],
+        "dailySummary": {
+            "dominantEmotion": "Joy",
+            "emotionDistribution": {"Joy": 0.6, "Calm": 0.4},
+            "overallMood": f"积极 {i}",
+            "avgHeartRate": 80,
+            "totalSteps": 8000,
+        },
+    }
+
+
+async def _heartbeat(samples: list, stop: asyncio.Event, interval: float = 0.001) -> None:
+    """每 interval 秒醒来一次，记录实际醒来时间比预期晚了多少"""
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(time.perf_counter() - expected, 0.0))
+
+
+async def _run(requests: int, concurrency: int) -> dict:
+    samples: list = []
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(samples, stop))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one(i: int) -> None:
+            async with semaphore:
+                r = await client.post("/music/generate-daily", json=_daily_body(i))
+                task_id = r.json()["data"]["taskId"]
+                await client.get(f"/music/query/{task_id}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    stop.set()
+    await heartbeat
+
+    samples.sort()
+    return {
+        "elapsed": elapsed,
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p99_ms": samples[int(len(samples) * 0.99) - 1] * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+
+def main_(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=8, help="executor 模式的数据库线程数")
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    SunoClientFactory._instance = FakeSunoClient()
+
+    print(f"requests={args.requests} concurrency={args.concurrency} db={os.environ['DATABASE_URL']}")
+    print(f"{'mode':<10}{'elapsed(s)':>12}{'lag mean(ms)':>14}{'lag p99(ms)':>13}{'lag max(ms)':>13}")
+    for mode, workers in (("inline", 0), ("executor", args.workers)):
+        db_executor.configure(workers)
+        result = asyncio.run(_run(args.requests, args.concurrency))
+        print(
+            f"{mode:<10}{result['elapsed']:>12.2f}{result['mean_ms']:>14.2f}"
+            f"{result['p99_ms']:>13.2f}{result['max_ms']:>13.2f}"
+        )
+    db_executor.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
@@ -0,0 +1,113 @@
+"""
+登录吞吐基准：bcrypt 在 Web 进程线程中计算 vs 独立进程池
+
+对比两种模式：
+- thread：密码校验在当前进程的线程池中执行（改造前同步路由的行为）
+- process：密码校验在 services.password_hasher 的进程池中执行
+
+同时以固定频率请求 /ping，观察登录洪峰期间其他接口的延迟。
+
+用法（在 MynoteBack 目录下）：
+    python -m benchmarks.bench_login [--requests 200] [--concurrency 32] [--workers N]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_DB_DIR = tempfile.mkdtemp(prefix="mynote-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'bench.db')}"
+os.environ.setdefault("AUTH_DEV_MODE", "true")
+os.environ["MUSIC_SCHEDULER_ENABLED"] = "false"
+# 基准需要同一账号反复登录，关闭限流
+os.environ["LOGIN_MAX_ATTEMPTS"] = "1000000000"
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from config import Base, SessionLocal, engine  # noqa: E402
+from models.user import User  # noqa: E402
+from services import password_hasher  # noqa: E402
+from services.security import get_password_hash  # noqa: E402
+
+USERS = 16
+PASSWORD = "bench-password"
+
+
+def _seed() -> None:
+    Base.metadata.create_all(bind=engine)
+    hashed = get_password_hash(PASSWORD)
+    db = SessionLocal()
+    try:
+        db.add_all([User(email=f"bench{i}@mynote.com", password_hash=hashed) for i in range(USERS)])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _run(requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    ping_latencies: list = []
+    done = asyncio.Event()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def login(i: int) -> None:
+            async with semaphore:
+                r = await client.post(
+                    "/users/login", json={"login": f"bench{i % USERS}@mynote.com", "password": PASSWORD}
+                )
+                assert r.json()["code"] == 0, r.json()
+
+        async def ping() -> None:
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/ping")
+                ping_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        pinger = asyncio.create_task(ping())
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await pinger
+
+    ping_latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "logins_per_sec": requests / elapsed,
+        "ping_p50_ms": statistics.median(ping_latencies) * 1000,
+        "ping_p99_ms": ping_latencies[int(len(ping_latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main_(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="process 模式的进程数")
+    args = parser.parse_args(argv)
+
+    _seed()
+    cores = os.cpu_count() or 1
+    print(f"requests={args.requests} concurrency={args.concurrency} cores={cores}")
+    print(f"{'mode':<10}{'workers':>8}{'logins/s':>10}{'per core':>10}{'ping p50(ms)':>14}{'ping p99(ms)':>14}")
+    for mode, workers in (("thread", 0), ("process", args.workers)):
+        password_hasher.configure(workers, max_pending=args.concurrency)
+        result = asyncio.run(_run(args.requests, args.concurrency))
+        print(
+            f"{mode:<10}{workers:>8}{result['logins_per_sec']:>10.1f}"
+            f"{result['logins_per_sec'] / cores:>10.1f}"
+            f"{result['ping_p50_ms']:>14.1f}{result['ping_p99_ms']:>14.1f}"
+        )
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
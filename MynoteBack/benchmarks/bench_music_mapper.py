@@ -0,0 +1,85 @@
+"""
+情绪音乐映射基准：批量把合成的每日情绪数据映射为 Suno 参数
+
+生成 N 天的合成数据（每天 3~12 个事件，情绪包含映射表之外的名称、时间包含非法值），
+分别统计映射本身（prompt / 风格 / 标签等字符串拼接）和完整 map_emotions_to_suno_params
+（含 SunoGenerationParams 校验）的耗时，用于确认批量生成时映射器的开销。
+
+用法（在 MynoteBack 目录下）：
+    python -m benchmarks.bench_music_mapper [--days 100000] [--seed 42]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from schemas.music import DailySummary, EmotionEventData
+from services.music_mapper import EMOTION_STYLE_MAP, emotion_mapper
+
+# 映射表之外的情绪（走默认值分支）
+EXTRA_EMOTIONS = ("Digest", "Surprise", "Neutral")
+EMOTION_NAMES = tuple(EMOTION_STYLE_MAP) + EXTRA_EMOTIONS
+
+
+def synthetic_days(n: int, seed: int):
+    rng = random.Random(seed)
+    days = []
+    for _ in range(n):
+        events = [
+            EmotionEventData.model_construct(
+                emotion=rng.choice(EMOTION_NAMES),
+                intensity=round(rng.random(), 2),
+                time=f"{rng.randrange(25):02d}:{rng.randrange(60):02d}" if rng.random() > 0.02 else "n/a",
+                event="",
+            )
+            for _ in range(rng.randint(3, 12))
+        ]
+        summary = DailySummary.model_construct(
+            dominantEmotion=rng.choice(EMOTION_NAMES),
+            emotionDistribution={},
+            overallMood="平稳",
+            avgHeartRate=75,
+            totalSteps=6000,
+        )
+        days.append((events, summary))
+    return days
+
+
+def _map_fields(mapper, events, summary):
+    """map_emotions_to_suno_params 中除构造 SunoGenerationParams 以外的部分"""
+    sequence = mapper._extract_emotion_sequence(events)
+    return (
+        mapper._build_daily_prompt(sequence, summary),
+        mapper._select_music_style(summary.dominantEmotion, events),
+        mapper._generate_title(summary),
+        mapper._calculate_style_weight(events),
+        mapper._calculate_weirdness(events),
+        mapper._generate_negative_tags(summary.dominantEmotion),
+    )
+
+
+def main_(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    days = synthetic_days(args.days, args.seed)
+    events = sum(len(e) for e, _ in days)
+    print(f"days={args.days} events={events}")
+    print(f"{'stage':<28}{'total(s)':>10}{'µs/day':>10}{'days/s':>12}")
+
+    for name, fn in (
+        ("mapping only", lambda e, s: _map_fields(emotion_mapper, e, s)),
+        ("map_emotions_to_suno_params", emotion_mapper.map_emotions_to_suno_params),
+    ):
+        started = time.perf_counter()
+        for e, s in days:
+            fn(e, s)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<28}{elapsed:>10.2f}{elapsed / args.days * 1e6:>10.1f}{args.days / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
@@ -0,0 +1,67 @@
+"""
+密码哈希成本基准：不同算法 / 成本参数下单次校验的耗时
+
+用于选择 BCRYPT_ROUNDS、ARGON2_TIME_COST、ARGON2_MEMORY_COST 等参数：
+登录延迟 ≈ 一次校验耗时 + 排队时间，每核每秒可处理的登录数 ≈ 1000 / 校验耗时(ms)。
+
+用法（在 MynoteBack 目录下）：
+    python -m benchmarks.bench_password_cost [--iterations 10]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from passlib.hash import argon2, bcrypt
+
+PASSWORD = "bench-password"
+
+BCRYPT_ROUNDS = (10, 11, 12, 13)
+# (time_cost, memory_cost KiB, parallelism)
+ARGON2_PARAMS = (
+    (2, 19456, 1),
+    (3, 65536, 4),
+    (4, 131072, 4),
+)
+
+
+def _measure(handler, iterations: int) -> dict:
+    hashed = handler.hash(PASSWORD)
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        assert handler.verify(PASSWORD, hashed)
+        samples.append(time.perf_counter() - started)
+    mean = statistics.mean(samples)
+    return {
+        "mean_ms": mean * 1000,
+        "p50_ms": statistics.median(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+        "per_core": 1 / mean,
+    }
+
+
+def main_(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    cases = [(f"bcrypt rounds={r}", bcrypt.using(rounds=r)) for r in BCRYPT_ROUNDS]
+    if argon2.has_backend():
+        cases += [
+            (f"argon2id t={t} m={m} p={p}", argon2.using(type="ID", time_cost=t, memory_cost=m, parallelism=p))
+            for t, m, p in ARGON2_PARAMS
+        ]
+    else:
+        print("argon2-cffi 未安装，跳过 argon2")
+
+    print(f"iterations={args.iterations}")
+    print(f"{'scheme':<34}{'mean(ms)':>10}{'p50(ms)':>10}{'max(ms)':>10}{'logins/s/core':>15}")
+    for name, handler in cases:
+        r = _measure(handler, args.iterations)
+        print(f"{name:<34}{r['mean_ms']:>10.1f}{r['p50_ms']:>10.1f}{r['max_ms']:>10.1f}{r['per_core']:>15.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
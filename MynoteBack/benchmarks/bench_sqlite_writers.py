@@ -0,0 +1,145 @@
+"""
+SQLite 并发写入基准：默认回滚日志模式 vs WAL 调优（config.SQLITE_PRAGMAS）
+
+多个写线程同时追加情绪事件、创建乐谱，另有读线程持续读取情绪列表，
+统计写入吞吐、写入延迟、database is locked 错误数和读吞吐。
+
+注意：fsync 的成本取决于磁盘，tmpfs 上 synchronous 的差异会被低估，
+可用 --dir 指定实际部署所在的磁盘目录。
+
+用法（在 MynoteBack 目录下）：
+    python -m benchmarks.bench_sqlite_writers [--writers 8] [--ops 200] [--readers 2] [--dir /data]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='mynote-bench-'), 'unused.db')}"
+os.environ.setdefault("AUTH_DEV_MODE", "true")
+os.environ["MUSIC_SCHEDULER_ENABLED"] = "false"
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+import main  # noqa: E402,F401  (注册所有模型)
+from config import Base, SQLITE_PRAGMAS, _engine_options  # noqa: E402
+from schemas.emotion import EmotionEvent  # noqa: E402
+from schemas.score import Score  # noqa: E402
+from services.emotion_service import add_event, list_days, serialize_days  # noqa: E402
+from services.score_service import create_score  # noqa: E402
+from services.sqlite_pragmas import install_sqlite_pragmas  # noqa: E402
+
+# SQLite 默认值（改造前的行为）；busy_timeout 与 pysqlite 默认的 5 秒超时一致
+DEFAULT_PRAGMAS = {"busy_timeout": "5000", "journal_mode": "DELETE", "synchronous": "FULL"}
+
+
+def _event(i: int) -> EmotionEvent:
+    return EmotionEvent(
+        time=f"{i % 24:02d}:00", hr=70, hrv=50, triggered=False,
+        userInput="bench", emotion="Joy", phrase=[],
+    )
+
+
+def _run(directory: str, name: str, pragmas: dict, writers: int, ops: int, readers: int) -> dict:
+    url = f"sqlite:///{os.path.join(directory, f'{name}.db')}"
+    engine = create_engine(url, future=True, **_engine_options(url))
+    install_sqlite_pragmas(engine, pragmas)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    latencies = []
+    errors = [0]
+    reads = [0]
+    lock = threading.Lock()
+    writing = threading.Event()
+    writing.set()
+
+    def writer(n: int):
+        for i in range(ops):
+            started = time.perf_counter()
+            db = Session()
+            try:
+                if i % 2:
+                    create_score(db, None, Score(title=f"w{n}-{i}"))
+                else:
+                    add_event(db, None, f"2026-01-{n % 28 + 1:02d}", _event(i))
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    errors[0] += 1
+                continue
+            finally:
+                db.close()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    def reader():
+        while writing.is_set():
+            db = Session()
+            try:
+                serialize_days(db, list_days(db, None, limit=30))
+                with lock:
+                    reads[0] += 1
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    errors[0] += 1
+            finally:
+                db.close()
+
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for t in reader_threads:
+        t.start()
+    started = time.perf_counter()
+    for t in writer_threads:
+        t.start()
+    for t in writer_threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    writing.clear()
+    for t in reader_threads:
+        t.join()
+    engine.dispose()
+
+    latencies.sort()
+    return {
+        "writes_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+        "errors": errors[0],
+        "reads_per_s": reads[0] / elapsed,
+    }
+
+
+def main_(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200, help="每个写线程的写入次数")
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--dir", default=None, help="数据库文件目录（默认临时目录）")
+    args = parser.parse_args(argv)
+
+    directory = args.dir or tempfile.mkdtemp(prefix="mynote-bench-")
+    print(f"writers={args.writers} ops={args.ops} readers={args.readers} dir={directory}")
+    print(f"tuned: {SQLITE_PRAGMAS}")
+    print(f"{'mode':<10}{'writes/s':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'locked':>8}{'reads/s':>10}")
+    results = {}
+    for name, pragmas in (("default", DEFAULT_PRAGMAS), ("tuned", SQLITE_PRAGMAS)):
+        r = results[name] = _run(directory, name, pragmas, args.writers, args.ops, args.readers)
+        print(
+            f"{name:<10}{r['writes_per_s']:>10.1f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+            f"{r['errors']:>8}{r['reads_per_s']:>10.1f}"
+        )
+    if results["default"]["writes_per_s"]:
+        print(f"write throughput x{results['tuned']['writes_per_s'] / results['default']['writes_per_s']:.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
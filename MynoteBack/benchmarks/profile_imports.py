@@ -0,0 +1,134 @@
+"""
+冷启动导入耗时分析与预算检查
+
+在子进程中用 python -X importtime 导入 main（重复多次取中位数），输出：
+- 导入 main 的总耗时
+- main 直接导入的各模块的累计耗时
+- 按顶层包汇总的自身耗时（fastapi / sqlalchemy / pydantic / 应用模块……）
+
+并检查导入预算（退出码为 1 表示超出）：
+- 总耗时中位数不超过 --budget-ms
+- LAZY_MODULES 中的模块不会在导入 main 时被加载（与机器性能无关，适合在 CI 中检查）
+
+用法（在 MynoteBack 目录下）：
+    python -m benchmarks.profile_imports [--runs 5] [--top 15] [--budget-ms 1400]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 只在第一次使用时才导入的重依赖
+LAZY_MODULES = (
+    "alembic",   # 只在需要迁移时导入（services.schema）
+    "passlib",   # 在密码哈希进程中导入（services.password_hasher）
+    "bcrypt",
+    "argon2",
+    "httpx",     # 创建 SunoClient 时导入（services.suno_client）
+    "httpcore",
+)
+
+# 导入 main 的总耗时上限（毫秒）：单核开发机上约 1200ms（延迟导入前约 1500ms），
+# 不同机器差异较大，可通过 --budget-ms 或 IMPORT_BUDGET_MS 覆盖
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1400"))
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='mynote-import-'), 'import.db')}"
+    env["MUSIC_SCHEDULER_ENABLED"] = "false"
+    env.setdefault("AUTH_DEV_MODE", "true")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def _profile_once() -> List[Tuple[int, int, int, str]]:
+    """返回 [(自身 µs, 累计 µs, 缩进层级, 模块名)]"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2, m.group(4)))
+    return rows
+
+
+def _main_subtree(rows: List[Tuple[int, int, int, str]]) -> List[Tuple[int, int, int, str]]:
+    """importtime 按完成顺序输出：main 所在行之前、层级更深的连续行都是它的子模块"""
+    for index, (_, _, level, name) in enumerate(rows):
+        if name == "main" and level == 0:
+            start = index
+            while start > 0 and rows[start - 1][2] > 0:
+                start -= 1
+            return rows[start:index + 1]
+    raise RuntimeError("importtime 输出中没有 main")
+
+
+def _loaded_lazy_modules() -> List[str]:
+    code = f"import sys, main; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+    )
+    return result.stdout.split()
+
+
+def main_(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    totals = []
+    direct: Dict[str, List[int]] = defaultdict(list)
+    packages: Dict[str, List[int]] = defaultdict(list)
+    for _ in range(args.runs):
+        tree = _main_subtree(_profile_once())
+        totals.append(tree[-1][1])
+        by_package: Dict[str, int] = defaultdict(int)
+        for self_us, cumulative_us, level, name in tree:
+            if level == 1:
+                direct[name].append(cumulative_us)
+            by_package[name.split(".")[0]] += self_us
+        for name, us in by_package.items():
+            packages[name].append(us)
+
+    total_ms = statistics.median(totals) / 1000
+    print(f"import main: {total_ms:.1f} ms (median of {args.runs})")
+
+    print(f"\n{'module (imported by main)':<40}{'cumulative(ms)':>16}")
+    for name, samples in sorted(direct.items(), key=lambda kv: -statistics.median(kv[1]))[:args.top]:
+        print(f"{name:<40}{statistics.median(samples) / 1000:>16.1f}")
+
+    print(f"\n{'package':<40}{'self(ms)':>16}")
+    for name, samples in sorted(packages.items(), key=lambda kv: -statistics.median(kv[1]))[:args.top]:
+        print(f"{name:<40}{statistics.median(samples) / 1000:>16.1f}")
+
+    ok = True
+    loaded = _loaded_lazy_modules()
+    if loaded:
+        ok = False
+        print(f"\nFAIL: 导入 main 时加载了应延迟导入的模块: {', '.join(loaded)}")
+    if total_ms > args.budget_ms:
+        ok = False
+        print(f"\nFAIL: 导入耗时 {total_ms:.1f} ms 超出预算 {args.budget_ms:.0f} ms")
+    if ok:
+        print(f"\nOK: 未加载 {', '.join(LAZY_MODULES)}；导入耗时在预算 {args.budget_ms:.0f} ms 内")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
@@ -1,22 +1,91 @@
 import os
+import tempfile
 from typing import Generator, List
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from dotenv import load_dotenv
 
+from services.cpus import available_cpus
+from services.db_pool import MeteredQueuePool
+from services.sqlite_pragmas import install_sqlite_pragmas
+
 # 加载 .env 文件
 load_dotenv()
 
 # 数据库配置（默认使用 SQLite，便于本地调试）
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, echo=False, future=True, connect_args=connect_args)
+# 数据库连接池（生产环境 PostgreSQL）
+# 每个进程一个连接池：pool_size 个常驻连接，高峰时最多再额外打开 max_overflow 个，
+# 连接全部被占用时最多等待 DB_POOL_TIMEOUT 秒
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# 取连接前检测连接是否存活；超过 recycle 秒的连接重建（应小于数据库 / 负载均衡的空闲断开时间）
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# 单条 SQL 的最长执行时间（毫秒，仅 PostgreSQL），0 表示不限制
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+# 显示在 pg_stat_activity 中的应用名（仅 PostgreSQL）
+DB_APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "mynote-backend")
+
+
+def _engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        options = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" not in url and url not in ("sqlite://", "sqlite:///"):
+            # 文件数据库同样统计取连接等待，连接池大小使用 SQLAlchemy 默认值
+            options["poolclass"] = MeteredQueuePool
+        return options
+
+    options = {
+        "poolclass": MeteredQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    if url.startswith("postgresql"):
+        connect_args = {"application_name": DB_APPLICATION_NAME}
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+        options["connect_args"] = connect_args
+    return options
+
+
+# SQLite 连接参数（每个新连接执行 PRAGMA），留空表示不设置该项、使用 SQLite 默认值
+SQLITE_PRAGMAS = {
+    name: value
+    for name, value in (
+        # 写锁冲突时等待的毫秒数，放在最前面，切换 journal_mode 时同样生效
+        ("busy_timeout", os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        ("journal_mode", os.getenv("SQLITE_JOURNAL_MODE", "WAL")),
+        ("synchronous", os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")),
+        ("mmap_size", os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        # 负数表示 KiB：64 MiB 页缓存
+        ("cache_size", os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+        ("temp_store", os.getenv("SQLITE_TEMP_STORE", "MEMORY")),
+    )
+    if value
+}
+
+engine = create_engine(DATABASE_URL, echo=False, future=True, **_engine_options(DATABASE_URL))
+install_sqlite_pragmas(engine, SQLITE_PRAGMAS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+# 启动时检查数据库结构版本：strict 版本不一致时拒绝启动，warn 只记录错误日志，off 不检查
+DB_SCHEMA_CHECK = os.getenv("DB_SCHEMA_CHECK", "strict").lower()
+# python main.py 启动 Web 服务前先执行 alembic upgrade head
+DB_MIGRATE_ON_START = os.getenv("DB_MIGRATE_ON_START", "true").lower() == "true"
+
+# async 路由专用的数据库线程池大小（0 表示直接在事件循环中执行，仅用于调试）
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "8"))
+
+
 def get_db() -> Generator:
     db = SessionLocal()
     try:
@@ -35,3 +104,73 @@ else:
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_METHODS = ["*"]
 CORS_ALLOW_HEADERS = ["*"]
+
+
+# Suno HTTP 连接池配置（每个进程一个共享 httpx.AsyncClient）
+SUNO_HTTP_MAX_CONNECTIONS = int(os.getenv("SUNO_HTTP_MAX_CONNECTIONS", "100"))
+SUNO_HTTP_MAX_KEEPALIVE = int(os.getenv("SUNO_HTTP_MAX_KEEPALIVE", "20"))
+SUNO_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("SUNO_HTTP_KEEPALIVE_EXPIRY", "30"))
+SUNO_HTTP2 = os.getenv("SUNO_HTTP2", "false").lower() == "true"
+
+# Suno 批量状态刷新：单次 sweep 的并发查询数、最多处理的任务数
+SUNO_REFRESH_CONCURRENCY = int(os.getenv("SUNO_REFRESH_CONCURRENCY", "8"))
+SUNO_REFRESH_BATCH_SIZE = int(os.getenv("SUNO_REFRESH_BATCH_SIZE", "200"))
+
+# 音乐任务调度器配置（进程内统一轮询 Suno 任务状态）
+MUSIC_SCHEDULER_ENABLED = os.getenv("MUSIC_SCHEDULER_ENABLED", "true").lower() == "true"
+MUSIC_POLL_INITIAL_INTERVAL = float(os.getenv("MUSIC_POLL_INITIAL_INTERVAL", "5"))
+MUSIC_POLL_MAX_INTERVAL = float(os.getenv("MUSIC_POLL_MAX_INTERVAL", "20"))
+MUSIC_TASK_TIMEOUT_SECONDS = float(os.getenv("MUSIC_TASK_TIMEOUT_SECONDS", "300"))
+# 多 worker / 多实例时只有抢到选举锁的一个进程运行调度器，其余进程每隔该秒数重试（接手退出的 leader）
+MUSIC_SCHEDULER_LEADER_RETRY = float(os.getenv("MUSIC_SCHEDULER_LEADER_RETRY", "10"))
+
+
+def _scheduler_lock_file() -> str:
+    # PostgreSQL 使用 advisory lock；SQLite 默认把锁文件放在数据库文件旁边
+    database = engine.url.database
+    if engine.dialect.name == "sqlite" and database and database != ":memory:":
+        return os.path.abspath(database) + ".scheduler.lock"
+    return os.path.join(tempfile.gettempdir(), "mynote-music-scheduler.lock")
+
+
+MUSIC_SCHEDULER_LOCK_FILE = os.getenv("MUSIC_SCHEDULER_LOCK_FILE") or _scheduler_lock_file()
+
+# /music/query 未完成状态的短 TTL 缓存（秒）与容量
+MUSIC_QUERY_CACHE_TTL = float(os.getenv("MUSIC_QUERY_CACHE_TTL", "2"))
+MUSIC_QUERY_CACHE_SIZE = int(os.getenv("MUSIC_QUERY_CACHE_SIZE", "4096"))
+
+# 生成音乐的内容寻址缓存：相同 Suno 参数在该时长（秒）内复用已有任务，0 表示关闭
+MUSIC_CACHE_MAX_AGE_SECONDS = float(os.getenv("MUSIC_CACHE_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+
+# 密码哈希进程池：bcrypt 计算放在独立进程中，不占用事件循环和 Web 线程池
+# workers 为 0 表示在当前进程的线程池中计算（仅用于调试和基准对比）
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(available_cpus())))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+# 登录限流：同一登录标识在窗口期（秒）内最多尝试的次数，登录成功后清零
+LOGIN_MAX_ATTEMPTS = int(os.getenv("LOGIN_MAX_ATTEMPTS", "10"))
+LOGIN_ATTEMPT_WINDOW_SECONDS = float(os.getenv("LOGIN_ATTEMPT_WINDOW_SECONDS", "300"))
+
+# 密码哈希算法：逗号分隔，第一个用于新密码，其余只用于校验旧密码（登录成功后自动升级）
+PASSWORD_SCHEMES = [s.strip() for s in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if s.strip()]
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+# 登录令牌（HMAC-SHA256 签名）
+# 必须配置，多进程 / 多实例部署使用相同的值；未配置时启动失败
+AUTH_SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "")
+# 本地开发：允许不配置 AUTH_SECRET_KEY，每次启动随机生成密钥（重启后已签发的令牌失效），生产环境不要开启
+AUTH_DEV_MODE = os.getenv("AUTH_DEV_MODE", "false").lower() == "true"
+ACCESS_TOKEN_TTL_SECONDS = int(os.getenv("ACCESS_TOKEN_TTL_SECONDS", "900"))
+REFRESH_TOKEN_TTL_SECONDS = int(os.getenv("REFRESH_TOKEN_TTL_SECONDS", str(30 * 24 * 3600)))
+TOKEN_REVOCATION_SIZE = int(os.getenv("TOKEN_REVOCATION_SIZE", "100000"))
+
+# GET /users/{user_id} 的用户资料缓存（秒）与容量
+USER_PROFILE_CACHE_TTL = float(os.getenv("USER_PROFILE_CACHE_TTL", "60"))
+USER_PROFILE_CACHE_SIZE = int(os.getenv("USER_PROFILE_CACHE_SIZE", "10000"))
+
+# NDJSON 导出（/emotions/export、/scores/export）：服务端游标每批读取的行数与 gzip 压缩级别
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
@@ -59,6 +59,7 @@ if [ ! -f "$PROJECT_DIR/.env" ]; then
     echo -e "${RED}错误: .env 文件不存在！${NC}"
     echo "请创建 .env 文件并配置以下变量："
     echo "  - SUNO_API_KEY"
+    echo "  - AUTH_SECRET_KEY"
     echo "  - DEEPSEEK_API_KEY (如果使用)"
     exit 1
 fi
@@ -98,9 +99,12 @@ Type=simple
 User=root
 WorkingDirectory=$PROJECT_DIR
 Environment="PATH=$VENV_DIR/bin"
-ExecStart=$VENV_DIR/bin/python main.py
+ExecStart=$VENV_DIR/bin/gunicorn -c gunicorn.conf.py main:app
+ExecReload=/bin/kill -HUP \$MAINPID
 Restart=always
 RestartSec=10
+# 大于 GUNICORN_GRACEFUL_TIMEOUT，留时间让进行中的请求完成
+TimeoutStopSec=100
 
 # 日志配置
 StandardOutput=append:/var/log/${SERVICE_NAME}.log
@@ -0,0 +1,63 @@
+"""
+生产环境启动配置（gunicorn + uvicorn worker）
+
+用法（在 MynoteBack 目录下）：
+    gunicorn -c gunicorn.conf.py main:app
+
+- 多个 worker 进程，默认每个可用 CPU 一个（按 CPU 亲和性和 cgroup 配额计算，async worker 不需要 2n+1）
+- preload_app：主进程导入一次应用，worker fork 后以写时复制共享已导入的模块
+- 数据库迁移在主进程 fork worker 之前执行一次（DB_MIGRATE_ON_START）
+- worker 处理 max_requests 个请求后重启（带随机抖动，避免同时重启），回收内存碎片
+- 收到 SIGTERM 后停止接收新连接，等待进行中的请求（如正在调用 Suno 的音乐生成）完成，
+  最长 graceful_timeout 秒，然后执行 shutdown 事件（停止调度器、关闭连接池）
+"""
+
+import os
+
+from services.cpus import available_cpus
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+# 容器内 multiprocessing.cpu_count() 返回宿主机核数，改用实际可用的 CPU 数
+cpus = available_cpus()
+workers = int(os.getenv("WEB_CONCURRENCY", str(cpus)))
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+# 音乐生成请求会同步等待 Suno（HTTP 超时 60 秒），优雅退出时间需要大于它
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "90"))
+# worker 心跳超时（事件循环被阻塞超过该秒数时主进程重启 worker）
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+
+# 每个 worker 都有自己的密码哈希进程池：未显式配置时按 worker 数均分 CPU，避免 workers × CPU 个哈希进程
+os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(1, cpus // workers)))
+
+
+def on_starting(server):
+    # 主进程：preload 之后、fork worker 之前执行一次迁移
+    from config import DB_MIGRATE_ON_START, engine
+    from services.schema import upgrade_to_head
+
+    if DB_MIGRATE_ON_START:
+        upgrade_to_head(engine)
+    # 关闭主进程中的数据库连接，worker 不继承
+    engine.dispose()
+
+
+def post_fork(server, worker):
+    # 保险起见：丢弃从主进程继承的连接池（不关闭连接，避免影响主进程）
+    from config import engine
+
+    engine.dispose(close=False)
+    server.log.info(f"Worker {worker.pid} 已启动")
+
+
+def worker_int(worker):
+    worker.log.info(f"Worker {worker.pid} 收到中断信号，等待进行中的请求完成")
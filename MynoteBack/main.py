@@ -1,21 +1,35 @@
+import asyncio
+import logging
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from config import (
-    Base,
     engine,
+    DB_SCHEMA_CHECK,
+    DB_MIGRATE_ON_START,
+    MUSIC_SCHEDULER_ENABLED,
+    MUSIC_SCHEDULER_LEADER_RETRY,
     CORS_ORIGINS,
     CORS_ALLOW_CREDENTIALS,
     CORS_ALLOW_METHODS,
     CORS_ALLOW_HEADERS,
 )
 
-# 导入模型以确保在创建表时被注册
+# 导入模型以注册 ORM 映射（表结构由 migrations/ 中的 Alembic 迁移维护）
 import models.user  # noqa: F401
 import models.emotion  # noqa: F401
 import models.score  # noqa: F401
 import models.music_task  # noqa: F401
 
+from services import db_executor, password_hasher
+from services.db_pool import pool_stats
+from services.response import success
+from services.schema import SchemaOutOfDate, check_schema, upgrade_to_head
+from services.suno_client import SunoClientFactory
+from services.music_scheduler import music_scheduler, scheduler_lock
+
 # 路由
 from routers.users import router as users_router
 from routers.emotions import router as emotions_router
@@ -23,6 +37,11 @@ from routers.scores import router as scores_router
 from routers.ai import router as ai_router
 from routers.music import router as music_router
 
+logger = logging.getLogger(__name__)
+
+# 后台初始化音乐服务的任务（见 start_music_services）
+_music_services_startup: Optional[asyncio.Task] = None
+
 
 app = FastAPI(title="Mynote Backend", version="0.1.0")
 
@@ -38,8 +57,71 @@ app.add_middleware(
 
 @app.on_event("startup")
 def on_startup():
-    # 初始化数据库表
-    Base.metadata.create_all(bind=engine)
+    # 只比较迁移版本（一条查询），建表 / 升级由 alembic upgrade head 在启动 Web 进程前完成
+    if DB_SCHEMA_CHECK == "off":
+        return
+    try:
+        check_schema(engine)
+    except SchemaOutOfDate as e:
+        if DB_SCHEMA_CHECK == "strict":
+            raise
+        logger.error(f"[Startup] ❌ {e}")
+
+
+async def _start_music_services():
+    # 创建进程内共享的 Suno HTTP 连接池
+    await SunoClientFactory.startup()
+
+    # 参与调度器 leader 选举：所有 worker 中只有一个运行调度器并恢复数据库中未完成的任务，
+    # 其余 worker 等待接手（一直运行到关闭时被取消）
+    if not MUSIC_SCHEDULER_ENABLED:
+        return
+    try:
+        SunoClientFactory.get_client()
+    except ValueError:
+        # 未配置 SUNO_API_KEY，无法轮询
+        return
+    await music_scheduler.run_elected(scheduler_lock, MUSIC_SCHEDULER_LEADER_RETRY)
+
+
+@app.on_event("startup")
+async def start_music_services():
+    # 在后台初始化（导入 httpx、选举 leader），不推迟开始监听端口；
+    # 初始化完成前的音乐请求会按需创建连接池，新任务保存在数据库中，由 leader 扫描接手
+    global _music_services_startup
+    _music_services_startup = asyncio.create_task(_start_music_services())
+    _music_services_startup.add_done_callback(_log_startup_error)
+
+
+def _log_startup_error(task: "asyncio.Task") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"[Startup] ❌ 音乐服务初始化失败: {task.exception()}")
+
+
+@app.on_event("shutdown")
+async def stop_music_scheduler():
+    if _music_services_startup is not None and not _music_services_startup.done():
+        _music_services_startup.cancel()
+        await asyncio.gather(_music_services_startup, return_exceptions=True)
+    await music_scheduler.stop()
+
+
+@app.on_event("shutdown")
+async def close_suno_client():
+    # 释放 Suno HTTP 连接池
+    await SunoClientFactory.shutdown()
+
+
+@app.on_event("shutdown")
+def close_password_hasher():
+    # 等待进行中的密码哈希完成，回收进程池
+    password_hasher.shutdown()
+
+
+@app.on_event("shutdown")
+def close_db_executor():
+    # 等待进行中的数据库操作完成
+    db_executor.shutdown()
 
 
 @app.get("/")
@@ -51,6 +133,7 @@ def root():
         "status": "running",
         "endpoints": {
             "health": "/ping",
+            "dbStats": "/db/stats",
             "docs": "/docs",
             "users": "/users",
             "emotions": "/emotions",
@@ -67,6 +150,12 @@ def ping():
     return {"message": "pong"}
 
 
+@app.get("/db/stats")
+def db_stats():
+    """当前进程的数据库连接池统计（等待时间、饱和次数），用于判断瓶颈是否在连接池"""
+    return success(data={"pool": pool_stats(engine)})
+
+
 # 挂载路由
 app.include_router(users_router)
 app.include_router(emotions_router)
@@ -85,6 +174,10 @@ if __name__ == "__main__":
     # Railway 会自动提供 PORT 环境变量
     port = int(os.getenv("PORT", 8000))
     
+    # 在启动 Web 进程前执行一次数据库迁移
+    if DB_MIGRATE_ON_START:
+        upgrade_to_head(engine)
+
     print(f"🚀 Starting Mynote Backend on port {port}...")
     
     uvicorn.run(
@@ -0,0 +1,51 @@
+"""
+Alembic 迁移环境
+连接与模型元数据都来自应用本身（config.DATABASE_URL / Base.metadata）
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+
+from config import Base, DATABASE_URL, engine
+import models.emotion  # noqa: F401
+import models.score  # noqa: F401
+import models.user  # noqa: F401
+import models.music_task  # noqa: F401
+
+config = context.config
+# 应用进程内调用（services.schema.upgrade_to_head）时不覆盖应用的日志配置
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=DATABASE_URL.startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite 不支持大部分 ALTER TABLE，使用 batch 模式重建表
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
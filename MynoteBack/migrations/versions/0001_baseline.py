@@ -0,0 +1,106 @@
+"""baseline: emotion_days / scores / users / music_tasks
+
+已经通过 Base.metadata.create_all 建好表的旧数据库也可以直接升级：
+表、列、索引存在时跳过。
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2025-10-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "emotion_days" not in tables:
+        op.create_table(
+            "emotion_days",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("date", sa.String(32), nullable=False),
+            sa.Column("data", sa.JSON(), nullable=False),
+            *_timestamps(),
+            sa.UniqueConstraint("date", name="uq_emotion_days_date"),
+        )
+        op.create_index("ix_emotion_days_id", "emotion_days", ["id"])
+        op.create_index("ix_emotion_days_date", "emotion_days", ["date"], unique=True)
+
+    if "scores" not in tables:
+        op.create_table(
+            "scores",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("uuid", sa.String(36), nullable=False),
+            sa.Column("title", sa.String(255), nullable=True),
+            sa.Column("data", sa.JSON(), nullable=False),
+            *_timestamps(),
+        )
+        op.create_index("ix_scores_id", "scores", ["id"])
+        op.create_index("ix_scores_uuid", "scores", ["uuid"], unique=True)
+
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String(255), nullable=True),
+            sa.Column("phone", sa.String(32), nullable=True),
+            sa.Column("username", sa.String(50), nullable=True),
+            sa.Column("password_hash", sa.String(255), nullable=False),
+            *_timestamps(),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+        op.create_index("ix_users_phone", "users", ["phone"], unique=True)
+
+    if "music_tasks" not in tables:
+        op.create_table(
+            "music_tasks",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("task_id", sa.String(128), nullable=False, comment="Suno 任务 ID"),
+            sa.Column("date", sa.String(32), nullable=False, comment="日期 YYYY-MM-DD"),
+            sa.Column("task_type", sa.String(32), nullable=True, comment="任务类型: daily/weekly"),
+            sa.Column("status", sa.String(32), nullable=True, comment="任务状态"),
+            sa.Column("music_url", sa.String(512), nullable=True, comment="音乐 URL"),
+            sa.Column("duration", sa.Integer(), nullable=True, comment="时长（秒）"),
+            sa.Column("suno_params", sa.JSON(), nullable=True, comment="Suno 生成参数"),
+            sa.Column("params_hash", sa.String(64), nullable=True, comment="Suno 参数 SHA-256（内容寻址缓存）"),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        )
+        op.create_index("ix_music_tasks_id", "music_tasks", ["id"])
+        op.create_index("ix_music_tasks_task_id", "music_tasks", ["task_id"], unique=True)
+        op.create_index("ix_music_tasks_date", "music_tasks", ["date"])
+    elif "params_hash" not in {c["name"] for c in inspector.get_columns("music_tasks")}:
+        # params_hash 在内容寻址缓存引入前创建的库中不存在
+        with op.batch_alter_table("music_tasks") as batch:
+            batch.add_column(
+                sa.Column("params_hash", sa.String(64), nullable=True, comment="Suno 参数 SHA-256（内容寻址缓存）")
+            )
+
+    indexes = {ix["name"] for ix in sa.inspect(op.get_bind()).get_indexes("music_tasks")}
+    if "ix_music_tasks_params_hash_created_at" not in indexes:
+        op.create_index(
+            "ix_music_tasks_params_hash_created_at", "music_tasks", ["params_hash", "created_at"]
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("music_tasks")
+    op.drop_table("users")
+    op.drop_table("scores")
+    op.drop_table("emotion_days")
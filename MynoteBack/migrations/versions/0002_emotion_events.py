@@ -0,0 +1,113 @@
+"""emotion_events: 事件从 emotion_days.data 拆分为独立行
+
+升级：为每一天的 data["events"] 逐条写入 emotion_events（保持原有顺序），
+然后从 data 中去掉 events，只保留 finalPrompt / musicGenerated。
+降级：按 id 顺序把事件折叠回 data["events"]，再删除 emotion_events。
+
+Revision ID: 0002_emotion_events
+Revises: 0001_baseline
+Create Date: 2025-10-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_emotion_events"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+emotion_days = sa.table(
+    "emotion_days",
+    sa.column("id", sa.Integer),
+    sa.column("date", sa.String),
+    sa.column("data", sa.JSON),
+)
+
+emotion_events = sa.table(
+    "emotion_events",
+    sa.column("id", sa.Integer),
+    sa.column("day_id", sa.Integer),
+    sa.column("event_id", sa.String),
+    sa.column("emotion", sa.String),
+    sa.column("time", sa.String),
+    sa.column("data", sa.JSON),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # 启动时的 create_all 可能已经建好了空表
+    if "emotion_events" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "emotion_events",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "day_id",
+                sa.Integer(),
+                sa.ForeignKey("emotion_days.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("event_id", sa.String(36), nullable=False),
+            sa.Column("emotion", sa.String(32), nullable=True),
+            sa.Column("time", sa.String(16), nullable=True),
+            sa.Column("data", sa.JSON(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.UniqueConstraint("day_id", "event_id", name="uq_emotion_events_day_event"),
+        )
+        op.create_index("ix_emotion_events_day_id_id", "emotion_events", ["day_id", "id"])
+
+    days = bind.execute(sa.select(emotion_days.c.id, emotion_days.c.data).order_by(emotion_days.c.id)).all()
+    for day_id, data in days:
+        data = dict(data or {})
+        events = data.pop("events", None)
+        if events is None:
+            continue
+
+        rows, seen = [], set()
+        for event in events:
+            event_id = str(event.get("id"))
+            if event_id in seen:  # 旧数据中重复的事件只保留第一条
+                continue
+            seen.add(event_id)
+            rows.append({
+                "day_id": day_id,
+                "event_id": event_id,
+                "emotion": event.get("emotion"),
+                "time": event.get("time"),
+                "data": event,
+            })
+        if rows:
+            bind.execute(emotion_events.insert(), rows)
+
+        data.pop("date", None)
+        bind.execute(
+            emotion_days.update().where(emotion_days.c.id == day_id).values(data=data)
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    events = {}
+    rows = bind.execute(
+        sa.select(emotion_events.c.day_id, emotion_events.c.data)
+        .order_by(emotion_events.c.day_id, emotion_events.c.id)
+    ).all()
+    for day_id, data in rows:
+        events.setdefault(day_id, []).append(data)
+
+    days = bind.execute(sa.select(emotion_days.c.id, emotion_days.c.date, emotion_days.c.data)).all()
+    for day_id, date, data in days:
+        data = dict(data or {})
+        data["date"] = date
+        data["events"] = events.get(day_id, [])
+        bind.execute(
+            emotion_days.update().where(emotion_days.c.id == day_id).values(data=data)
+        )
+
+    op.drop_index("ix_emotion_events_day_id_id", table_name="emotion_events")
+    op.drop_table("emotion_events")
@@ -0,0 +1,91 @@
+"""按用户隔离：emotion_days / scores / music_tasks 增加 user_id
+
+- emotion_days：date 不再全局唯一，改为 (user_id, date) 唯一
+- scores：(user_id, created_at) 索引
+- music_tasks：(user_id, date)、(user_id, created_at) 索引
+
+已有数据的 user_id 为 NULL（未登录数据），不携带用户标识的旧客户端仍能访问。
+
+Revision ID: 0003_user_partitioning
+Revises: 0002_emotion_events
+Create Date: 2025-10-21
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_user_partitioning"
+down_revision = "0002_emotion_events"
+branch_labels = None
+depends_on = None
+
+
+def _user_id_column() -> sa.Column:
+    return sa.Column("user_id", sa.Integer(), nullable=True)
+
+
+def _has_user_id(table: str) -> bool:
+    # 启动时的 create_all 可能已经按新模型建好了表
+    return "user_id" in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    if not _has_user_id("emotion_days"):
+        inspector = sa.inspect(op.get_bind())
+        date_uniques = [
+            uc["name"] for uc in inspector.get_unique_constraints("emotion_days")
+            if uc["column_names"] == ["date"] and uc["name"]
+        ]
+        date_indexes = [
+            ix["name"] for ix in inspector.get_indexes("emotion_days")
+            if ix["column_names"] == ["date"]
+        ]
+        with op.batch_alter_table("emotion_days") as batch:
+            batch.add_column(_user_id_column())
+            batch.create_foreign_key(
+                "emotion_days_user_id_fkey", "users", ["user_id"], ["id"], ondelete="CASCADE"
+            )
+            # 去掉 date 上的全局唯一约束和唯一索引（create_all 建表时为 uq_emotion_days_date / ix_emotion_days_date）
+            for name in date_uniques:
+                batch.drop_constraint(name, type_="unique")
+            for name in date_indexes:
+                batch.drop_index(name)
+            batch.create_unique_constraint("uq_emotion_days_user_date", ["user_id", "date"])
+
+    if not _has_user_id("scores"):
+        with op.batch_alter_table("scores") as batch:
+            batch.add_column(_user_id_column())
+            batch.create_foreign_key(
+                "scores_user_id_fkey", "users", ["user_id"], ["id"], ondelete="CASCADE"
+            )
+            batch.create_index("ix_scores_user_id_created_at", ["user_id", "created_at"])
+
+    if not _has_user_id("music_tasks"):
+        with op.batch_alter_table("music_tasks") as batch:
+            batch.add_column(_user_id_column())
+            batch.create_foreign_key(
+                "music_tasks_user_id_fkey", "users", ["user_id"], ["id"], ondelete="CASCADE"
+            )
+            batch.create_index("ix_music_tasks_user_id_date", ["user_id", "date"])
+            batch.create_index("ix_music_tasks_user_id_created_at", ["user_id", "created_at"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("music_tasks") as batch:
+        batch.drop_index("ix_music_tasks_user_id_created_at")
+        batch.drop_index("ix_music_tasks_user_id_date")
+        batch.drop_constraint("music_tasks_user_id_fkey", type_="foreignkey")
+        batch.drop_column("user_id")
+
+    with op.batch_alter_table("scores") as batch:
+        batch.drop_index("ix_scores_user_id_created_at")
+        batch.drop_constraint("scores_user_id_fkey", type_="foreignkey")
+        batch.drop_column("user_id")
+
+    # 回退到全局唯一的 date：同一天有多个用户的记录时会失败，需要先手工清理
+    with op.batch_alter_table("emotion_days") as batch:
+        batch.drop_constraint("uq_emotion_days_user_date", type_="unique")
+        batch.drop_constraint("emotion_days_user_id_fkey", type_="foreignkey")
+        batch.drop_column("user_id")
+        batch.create_index("ix_emotion_days_date", ["date"], unique=True)
+        batch.create_unique_constraint("uq_emotion_days_date", ["date"])
@@ -0,0 +1,105 @@
+"""emotion_day_summaries：每日情绪汇总（物化）
+
+事件数、各情绪次数（及首次出现的事件行 id）、HR / HRV 的合计、个数与最小 / 最大值、
+最早 / 最晚的事件时间。之后由 services.emotion_service 在事件写入的同一事务中增量维护；
+升级时按已有事件回填。
+
+Revision ID: 0005_emotion_day_summaries
+Revises: 0003_user_partitioning
+Create Date: 2025-10-25
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_emotion_day_summaries"
+down_revision = "0003_user_partitioning"
+branch_labels = None
+depends_on = None
+
+
+emotion_days = sa.table("emotion_days", sa.column("id", sa.Integer))
+
+emotion_events = sa.table(
+    "emotion_events",
+    sa.column("id", sa.Integer),
+    sa.column("day_id", sa.Integer),
+    sa.column("emotion", sa.String),
+    sa.column("time", sa.String),
+    sa.column("data", sa.JSON),
+)
+
+
+def _int_or_none(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def _summarize(day_id, events):
+    """events: [(行 id, 情绪, 时间, 事件 JSON)]，按行 id 升序"""
+    row = {
+        "day_id": day_id, "event_count": len(events), "emotion_counts": {},
+        "hr_sum": 0, "hr_count": 0, "hr_min": None, "hr_max": None,
+        "hrv_sum": 0, "hrv_count": 0, "hrv_min": None, "hrv_max": None,
+        "first_time": None, "last_time": None,
+    }
+    for row_id, emotion, time, data in events:
+        if emotion:
+            count, first_id = row["emotion_counts"].get(emotion, (0, row_id))
+            row["emotion_counts"][emotion] = [count + 1, first_id]
+        for name in ("hr", "hrv"):
+            value = _int_or_none((data or {}).get(name))
+            if value is None:
+                continue
+            row[f"{name}_sum"] += value
+            row[f"{name}_count"] += 1
+            row[f"{name}_min"] = value if row[f"{name}_min"] is None else min(row[f"{name}_min"], value)
+            row[f"{name}_max"] = value if row[f"{name}_max"] is None else max(row[f"{name}_max"], value)
+        if time:
+            row["first_time"] = time if row["first_time"] is None else min(row["first_time"], time)
+            row["last_time"] = time if row["last_time"] is None else max(row["last_time"], time)
+    return row
+
+
+def upgrade() -> None:
+    summaries = op.create_table(
+        "emotion_day_summaries",
+        sa.Column(
+            "day_id",
+            sa.Integer(),
+            sa.ForeignKey("emotion_days.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("event_count", sa.Integer(), nullable=False),
+        sa.Column("emotion_counts", sa.JSON(), nullable=False),
+        sa.Column("hr_sum", sa.Integer(), nullable=False),
+        sa.Column("hr_count", sa.Integer(), nullable=False),
+        sa.Column("hr_min", sa.Integer(), nullable=True),
+        sa.Column("hr_max", sa.Integer(), nullable=True),
+        sa.Column("hrv_sum", sa.Integer(), nullable=False),
+        sa.Column("hrv_count", sa.Integer(), nullable=False),
+        sa.Column("hrv_min", sa.Integer(), nullable=True),
+        sa.Column("hrv_max", sa.Integer(), nullable=True),
+        sa.Column("first_time", sa.String(16), nullable=True),
+        sa.Column("last_time", sa.String(16), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+    bind = op.get_bind()
+    events = {day_id: [] for (day_id,) in bind.execute(sa.select(emotion_days.c.id))}
+    rows = bind.execute(
+        sa.select(
+            emotion_events.c.day_id, emotion_events.c.id, emotion_events.c.emotion,
+            emotion_events.c.time, emotion_events.c.data,
+        ).order_by(emotion_events.c.day_id, emotion_events.c.id)
+    )
+    for day_id, *event in rows:
+        if day_id in events:
+            events[day_id].append(event)
+
+    values = [_summarize(day_id, day_events) for day_id, day_events in events.items()]
+    if values:
+        op.bulk_insert(summaries, values)
+
+
+def downgrade() -> None:
+    op.drop_table("emotion_day_summaries")
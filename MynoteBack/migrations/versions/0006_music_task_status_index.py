@@ -0,0 +1,24 @@
+"""music_tasks.status 索引
+
+调度器 leader 定期扫描未完成（queued / running / reviewing / streaming）的任务，
+接手其他 worker 创建的任务；未完成的任务只占很小一部分，按状态走索引。
+
+Revision ID: 0006_music_task_status_index
+Revises: 0005_emotion_day_summaries
+Create Date: 2025-10-27
+"""
+from alembic import op
+
+
+revision = "0006_music_task_status_index"
+down_revision = "0005_emotion_day_summaries"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_music_tasks_status", "music_tasks", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_music_tasks_status", table_name="music_tasks")
@@ -0,0 +1,159 @@
+"""emotion_days：未登录数据每天一条
+
+(user_id, date) 唯一约束中 NULL 互不相等，未登录（user_id 为 NULL）的同一天可以有多条，
+并发创建同一天时会产生重复记录。增加部分唯一索引 (date) WHERE user_id IS NULL。
+
+升级时先合并已有的重复记录：保留 id 最小的一条，其余记录的事件按原顺序移入
+（event_id 已存在的事件丢弃，与 0002 相同保留第一条），然后重算保留记录的每日汇总，
+并刷新其 updated_at，增量导出会重新导出合并后的当天。
+
+Revision ID: 0007_anonymous_day_unique
+Revises: 0006_music_task_status_index
+Create Date: 2025-10-27
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007_anonymous_day_unique"
+down_revision = "0006_music_task_status_index"
+branch_labels = None
+depends_on = None
+
+
+emotion_days = sa.table(
+    "emotion_days",
+    sa.column("id", sa.Integer),
+    sa.column("user_id", sa.Integer),
+    sa.column("date", sa.String),
+    sa.column("updated_at", sa.DateTime),
+)
+
+emotion_events = sa.table(
+    "emotion_events",
+    sa.column("id", sa.Integer),
+    sa.column("day_id", sa.Integer),
+    sa.column("event_id", sa.String),
+    sa.column("emotion", sa.String),
+    sa.column("time", sa.String),
+    sa.column("data", sa.JSON),
+)
+
+emotion_day_summaries = sa.table(
+    "emotion_day_summaries",
+    sa.column("day_id", sa.Integer),
+    sa.column("event_count", sa.Integer),
+    sa.column("emotion_counts", sa.JSON),
+    sa.column("hr_sum", sa.Integer),
+    sa.column("hr_count", sa.Integer),
+    sa.column("hr_min", sa.Integer),
+    sa.column("hr_max", sa.Integer),
+    sa.column("hrv_sum", sa.Integer),
+    sa.column("hrv_count", sa.Integer),
+    sa.column("hrv_min", sa.Integer),
+    sa.column("hrv_max", sa.Integer),
+    sa.column("first_time", sa.String),
+    sa.column("last_time", sa.String),
+)
+
+
+def _int_or_none(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def _summarize(day_id, events):
+    """events: [(行 id, 情绪, 时间, 事件 JSON)]，按行 id 升序（与 0005 相同）"""
+    row = {
+        "day_id": day_id, "event_count": len(events), "emotion_counts": {},
+        "hr_sum": 0, "hr_count": 0, "hr_min": None, "hr_max": None,
+        "hrv_sum": 0, "hrv_count": 0, "hrv_min": None, "hrv_max": None,
+        "first_time": None, "last_time": None,
+    }
+    for row_id, emotion, time, data in events:
+        if emotion:
+            count, first_id = row["emotion_counts"].get(emotion, (0, row_id))
+            row["emotion_counts"][emotion] = [count + 1, first_id]
+        for name in ("hr", "hrv"):
+            value = _int_or_none((data or {}).get(name))
+            if value is None:
+                continue
+            row[f"{name}_sum"] += value
+            row[f"{name}_count"] += 1
+            row[f"{name}_min"] = value if row[f"{name}_min"] is None else min(row[f"{name}_min"], value)
+            row[f"{name}_max"] = value if row[f"{name}_max"] is None else max(row[f"{name}_max"], value)
+        if time:
+            row["first_time"] = time if row["first_time"] is None else min(row["first_time"], time)
+            row["last_time"] = time if row["last_time"] is None else max(row["last_time"], time)
+    return row
+
+
+def _merge_duplicates(bind) -> None:
+    rows = bind.execute(
+        sa.select(emotion_days.c.date, emotion_days.c.id)
+        .where(emotion_days.c.user_id.is_(None))
+        .order_by(emotion_days.c.date, emotion_days.c.id)
+    ).all()
+    days = {}
+    for date, day_id in rows:
+        days.setdefault(date, []).append(day_id)
+
+    for keep, *duplicates in days.values():
+        if not duplicates:
+            continue
+        seen = {
+            event_id for (event_id,) in
+            bind.execute(sa.select(emotion_events.c.event_id).where(emotion_events.c.day_id == keep))
+        }
+        for day_id in duplicates:
+            events = bind.execute(
+                sa.select(emotion_events.c.id, emotion_events.c.event_id)
+                .where(emotion_events.c.day_id == day_id)
+                .order_by(emotion_events.c.id)
+            ).all()
+            moved = []
+            for row_id, event_id in events:
+                if event_id not in seen:
+                    seen.add(event_id)
+                    moved.append(row_id)
+            # 行 id 不变：合并后仍按各条记录的写入顺序排列
+            if moved:
+                bind.execute(
+                    emotion_events.update()
+                    .where(emotion_events.c.id.in_(moved))
+                    .values(day_id=keep)
+                )
+            bind.execute(emotion_events.delete().where(emotion_events.c.day_id == day_id))
+            bind.execute(emotion_day_summaries.delete().where(emotion_day_summaries.c.day_id == day_id))
+            bind.execute(emotion_days.delete().where(emotion_days.c.id == day_id))
+
+        events = bind.execute(
+            sa.select(
+                emotion_events.c.id, emotion_events.c.emotion,
+                emotion_events.c.time, emotion_events.c.data,
+            )
+            .where(emotion_events.c.day_id == keep)
+            .order_by(emotion_events.c.id)
+        ).all()
+        bind.execute(emotion_day_summaries.delete().where(emotion_day_summaries.c.day_id == keep))
+        bind.execute(emotion_day_summaries.insert().values(**_summarize(keep, events)))
+        bind.execute(
+            emotion_days.update()
+            .where(emotion_days.c.id == keep)
+            .values(updated_at=sa.func.now())
+        )
+
+
+def upgrade() -> None:
+    _merge_duplicates(op.get_bind())
+    op.create_index(
+        "uq_emotion_days_anonymous_date",
+        "emotion_days",
+        ["date"],
+        unique=True,
+        sqlite_where=sa.text("user_id IS NULL"),
+        postgresql_where=sa.text("user_id IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_emotion_days_anonymous_date", table_name="emotion_days")
@@ -0,0 +1,31 @@
+"""revoked_tokens：已作废的 refresh token
+
+refresh token 只能使用一次。作废记录原先只保存在各进程内存中，多 worker 时同一个
+refresh token 可以在每个进程各换取一次；改为以 jti 为主键写入数据库，并发换取时只有一个成功。
+
+Revision ID: 0008_revoked_tokens
+Revises: 0007_anonymous_day_unique
+Create Date: 2025-10-27
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008_revoked_tokens"
+down_revision = "0007_anonymous_day_unique"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "revoked_tokens",
+        sa.Column("jti", sa.String(32), primary_key=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_revoked_tokens_expires_at", "revoked_tokens", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_revoked_tokens_expires_at", table_name="revoked_tokens")
+    op.drop_table("revoked_tokens")
@@ -0,0 +1,32 @@
+"""login_attempts：登录限流计数
+
+计数原先保存在各进程内存中，实际上限为「次数 × worker 数」，worker 重启后清零；
+改为保存在数据库中，所有进程共享同一个窗口。
+
+Revision ID: 0009_login_attempts
+Revises: 0008_revoked_tokens
+Create Date: 2025-10-27
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009_login_attempts"
+down_revision = "0008_revoked_tokens"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "login_attempts",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("window_end", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_login_attempts_window_end", "login_attempts", ["window_end"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_login_attempts_window_end", table_name="login_attempts")
+    op.drop_table("login_attempts")
@@ -0,0 +1,40 @@
+"""scores.uuid：按用户唯一
+
+uuid 由客户端生成，原先全局唯一：创建乐谱时如果其他用户已有同一 uuid 会返回「已存在」，
+既暴露了其他用户的数据是否存在，也会拒绝合法的 uuid。改为 (user_id, uuid) 唯一，
+未登录数据（user_id 为 NULL）用部分唯一索引 (uuid) WHERE user_id IS NULL。
+
+Revision ID: 0010_score_uuid_per_user
+Revises: 0009_login_attempts
+Create Date: 2025-10-28
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010_score_uuid_per_user"
+down_revision = "0009_login_attempts"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("scores") as batch:
+        batch.drop_index("ix_scores_uuid")
+        batch.create_unique_constraint("uq_scores_user_uuid", ["user_id", "uuid"])
+    op.create_index(
+        "uq_scores_anonymous_uuid",
+        "scores",
+        ["uuid"],
+        unique=True,
+        sqlite_where=sa.text("user_id IS NULL"),
+        postgresql_where=sa.text("user_id IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    # 回退到全局唯一的 uuid：不同用户有相同 uuid 时会失败，需要先手工清理
+    op.drop_index("uq_scores_anonymous_uuid", table_name="scores")
+    with op.batch_alter_table("scores") as batch:
+        batch.drop_constraint("uq_scores_user_uuid", type_="unique")
+        batch.create_index("ix_scores_uuid", ["uuid"], unique=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, func, text, UniqueConstraint
 from sqlalchemy.types import JSON
 from config import Base
 
@@ -7,8 +7,9 @@ class EmotionDay(Base):
     __tablename__ = "emotion_days"
 
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(String(32), nullable=False, unique=True, index=True)  # 格式: yyyy-MM-dd
-    data = Column(JSON, nullable=False)  # 存储完整 JSON
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)  # NULL: 未登录数据
+    date = Column(String(32), nullable=False)  # 格式: yyyy-MM-dd
+    data = Column(JSON, nullable=False)  # 日级字段（finalPrompt / musicGenerated），事件存放在 emotion_events
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(
@@ -16,5 +17,64 @@ class EmotionDay(Base):
     )
 
     __table_args__ = (
-        UniqueConstraint("date", name="uq_emotion_days_date"),
+        # 每个用户每天一条；同时作为 (user_id, date) 的查询索引
+        UniqueConstraint("user_id", "date", name="uq_emotion_days_user_date"),
+        # 上面的约束中 NULL 互不相等，未登录数据单独用部分唯一索引保证每天一条
+        Index(
+            "uq_emotion_days_anonymous_date",
+            "date",
+            unique=True,
+            sqlite_where=text("user_id IS NULL"),
+            postgresql_where=text("user_id IS NULL"),
+        ),
+    )
+
+
+class EmotionEventRecord(Base):
+    __tablename__ = "emotion_events"
+
+    id = Column(Integer, primary_key=True)  # 自增，决定事件在当天的顺序
+    day_id = Column(Integer, ForeignKey("emotion_days.id", ondelete="CASCADE"), nullable=False)
+    event_id = Column(String(36), nullable=False)  # EmotionEvent.id
+    emotion = Column(String(32), nullable=True)
+    time = Column(String(16), nullable=True)
+    data = Column(JSON, nullable=False)  # 完整 EmotionEvent JSON
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        UniqueConstraint("day_id", "event_id", name="uq_emotion_events_day_event"),
+        Index("ix_emotion_events_day_id_id", "day_id", "id"),
+    )
+
+
+class EmotionDaySummary(Base):
+    """
+    每日情绪汇总（物化），由 services.emotion_service 在事件写入的同一事务中增量维护，
+    读取一天的事件数、主导情绪、心率等不必加载当天的事件
+    """
+    __tablename__ = "emotion_day_summaries"
+
+    day_id = Column(Integer, ForeignKey("emotion_days.id", ondelete="CASCADE"), primary_key=True)
+    event_count = Column(Integer, nullable=False, default=0)
+    # {情绪: [次数, 当天首次出现的事件行 id]}，按首次出现的顺序
+    emotion_counts = Column(JSON, nullable=False, default=dict)
+
+    hr_sum = Column(Integer, nullable=False, default=0)
+    hr_count = Column(Integer, nullable=False, default=0)
+    hr_min = Column(Integer, nullable=True)
+    hr_max = Column(Integer, nullable=True)
+    hrv_sum = Column(Integer, nullable=False, default=0)
+    hrv_count = Column(Integer, nullable=False, default=0)
+    hrv_min = Column(Integer, nullable=True)
+    hrv_max = Column(Integer, nullable=True)
+
+    first_time = Column(String(16), nullable=True)  # 当天最早 / 最晚的事件时间（HH:MM）
+    last_time = Column(String(16), nullable=True)
+
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
     )
@@ -2,7 +2,7 @@
 音乐生成任务数据库模型
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, func
 from sqlalchemy.types import JSON
 from config import Base
 
@@ -14,6 +14,9 @@ class MusicTask(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(String(128), unique=True, index=True, nullable=False, comment="Suno 任务 ID")
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, comment="所属用户（NULL 为未登录）"
+    )
     date = Column(String(32), index=True, nullable=False, comment="日期 YYYY-MM-DD")
     task_type = Column(String(32), default="daily", comment="任务类型: daily/weekly")
     status = Column(String(32), default="queued", comment="任务状态")
@@ -24,6 +27,7 @@ class MusicTask(Base):
     
     # Suno 参数（JSON 存储）
     suno_params = Column(JSON, nullable=True, comment="Suno 生成参数")
+    params_hash = Column(String(64), nullable=True, comment="Suno 参数 SHA-256（内容寻址缓存）")
     
     # 时间戳
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -35,6 +39,16 @@ class MusicTask(Base):
         nullable=False
     )
     
+    __table_args__ = (
+        # 内容寻址缓存：按哈希查找最新的任务
+        Index("ix_music_tasks_params_hash_created_at", "params_hash", "created_at"),
+        # 按用户隔离
+        Index("ix_music_tasks_user_id_date", "user_id", "date"),
+        Index("ix_music_tasks_user_id_created_at", "user_id", "created_at"),
+        # 调度器 leader 扫描未完成的任务
+        Index("ix_music_tasks_status", "status"),
+    )
+    
     def __repr__(self):
         return f"<MusicTask(task_id={self.task_id}, status={self.status})>"
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint, func, text
 from sqlalchemy.types import JSON
 from config import Base
 
@@ -7,7 +7,8 @@ class ScoreRecord(Base):
     __tablename__ = "scores"
 
     id = Column(Integer, primary_key=True, index=True)
-    uuid = Column(String(36), unique=True, index=True, nullable=False)  # 与前端 Score.id 对齐
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)  # NULL: 未登录数据
+    uuid = Column(String(36), nullable=False)  # 与前端 Score.id 对齐，每个用户内唯一
     title = Column(String(255), nullable=True)
     data = Column(JSON, nullable=False)  # 完整 Score JSON
 
@@ -15,3 +16,17 @@ class ScoreRecord(Base):
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
     )
+
+    __table_args__ = (
+        Index("ix_scores_user_id_created_at", "user_id", "created_at"),
+        # uuid 由客户端生成，只在同一用户内唯一；同时作为按 uuid 查询的索引
+        UniqueConstraint("user_id", "uuid", name="uq_scores_user_uuid"),
+        # 上面的约束中 NULL 互不相等，未登录数据单独用部分唯一索引
+        Index(
+            "uq_scores_anonymous_uuid",
+            "uuid",
+            unique=True,
+            sqlite_where=text("user_id IS NULL"),
+            postgresql_where=text("user_id IS NULL"),
+        ),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, Integer, String, DateTime, Index, func
 from config import Base
 
 
@@ -18,3 +18,33 @@ class User(Base):
         onupdate=func.now(),
         nullable=False,
     )
+
+    # INSERT 时通过 RETURNING 一并取回 created_at / updated_at，不需要 commit 后再 refresh
+    __mapper_args__ = {"eager_defaults": True}
+
+
+class RevokedToken(Base):
+    """已作废的 refresh token（换取新令牌或注销后），所有进程共享，保留到令牌原本的过期时间"""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # 定期清理已过期的记录
+        Index("ix_revoked_tokens_expires_at", "expires_at"),
+    )
+
+
+class LoginAttempt(Base):
+    """登录限流计数（services.rate_limit.LoginThrottle），所有进程共享"""
+    __tablename__ = "login_attempts"
+
+    key = Column(String(64), primary_key=True)  # 登录标识的 SHA-256
+    count = Column(Integer, nullable=False)
+    window_end = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # 定期清理窗口已结束的记录
+        Index("ix_login_attempts_window_end", "window_end"),
+    )
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 
-from config import get_db
+from config import get_db, EXPORT_GZIP_LEVEL
+from services.auth import get_current_user_id
 from schemas.emotion import EmotionDayData, EmotionEvent, EmotionDayOut, MusicStatusUpdate
 from services.emotion_service import (
     list_days,
@@ -17,68 +19,145 @@ from services.emotion_service import (
     update_event,
     delete_event,
     update_music_generation,
+    serialize_day,
+    serialize_days,
+    summarize_days,
 )
-from services.response import success, error
+from services.export_service import iter_emotion_days
+from services.response import success, error, raw_success, accepts_gzip, ndjson_response
 
 router = APIRouter(prefix="/emotions", tags=["emotions"])
 
 
 @router.get("/days")
-def list_emotion_days(db: Session = Depends(get_db)):
-    items = list_days(db)
-    data: List[EmotionDayData] = [EmotionDayData(**it.data) for it in items]
-    return success(data=[d.model_dump() for d in data])
+def list_emotion_days(
+    date_from: Optional[str] = Query(None, alias="from", description="起始日期（含），yyyy-MM-dd"),
+    date_to: Optional[str] = Query(None, alias="to", description="结束日期（含），yyyy-MM-dd"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 nextCursor"),
+    limit: Optional[int] = Query(None, ge=1, le=200, description="每页条数；不传时返回全部（旧版列表格式）"),
+    summary: bool = Query(False, description="只返回日期、事件数、主导情绪、musicGenerated"),
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    # 多取一条用来判断是否还有下一页
+    items = list_days(
+        db,
+        user_id,
+        date_from=date_from,
+        date_to=date_to,
+        before=cursor,
+        limit=limit + 1 if limit is not None else None,
+    )
+    next_cursor = None
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        next_cursor = items[-1].date
+
+    data = summarize_days(db, items) if summary else serialize_days(db, items)
+    if limit is None:
+        return raw_success(data=data)
+    return raw_success(data={"items": data, "nextCursor": next_cursor})
+
+
+@router.get("/export")
+def export_emotion_days(
+    request: Request,
+    date_from: Optional[str] = Query(None, alias="from", description="起始日期（含），yyyy-MM-dd"),
+    date_to: Optional[str] = Query(None, alias="to", description="结束日期（含），yyyy-MM-dd"),
+    updated_since: Optional[datetime] = Query(None, description="只导出该时间（含）之后更新过的天，用于增量拉取"),
+    user_id: Optional[int] = Depends(get_current_user_id),
+):
+    """流式导出情绪记录（NDJSON，每行一天）；请求头带 Accept-Encoding: gzip 时压缩"""
+    records = iter_emotion_days(user_id, date_from=date_from, date_to=date_to, updated_since=updated_since)
+    return ndjson_response(
+        records,
+        filename="emotions.ndjson",
+        gzip_level=EXPORT_GZIP_LEVEL if accepts_gzip(request.headers.get("accept-encoding")) else None,
+    )
 
 
 @router.get("/days/{date}")
-def get_emotion_day(date: str, db: Session = Depends(get_db)):
-    obj = get_day_by_date(db, date)
+def get_emotion_day(
+    date: str,
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    obj = get_day_by_date(db, user_id, date)
     if not obj:
         return error(code=2001, message="Emotion day not found")
-    return success(data=EmotionDayData(**obj.data).model_dump())
+    return raw_success(data=serialize_day(db, obj))
 
 
 @router.put("/days")
-def upsert_emotion_day(payload: EmotionDayData, db: Session = Depends(get_db)):
-    obj = upsert_day(db, payload)
-    return success(data=EmotionDayData(**obj.data).model_dump())
+def upsert_emotion_day(
+    payload: EmotionDayData,
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    obj = upsert_day(db, user_id, payload)
+    return raw_success(data=serialize_day(db, obj))
 
 
 @router.delete("/days/{date}")
-def delete_emotion_day(date: str, db: Session = Depends(get_db)):
-    ok = delete_day(db, date)
+def delete_emotion_day(
+    date: str,
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    ok = delete_day(db, user_id, date)
     if not ok:
         return error(code=2002, message="Delete failed or not found")
     return success(data=True)
 
 
 @router.post("/days/{date}/events")
-def add_emotion_event(date: str, payload: EmotionEvent, db: Session = Depends(get_db)):
-    obj = add_event(db, date, payload)
+def add_emotion_event(
+    date: str,
+    payload: EmotionEvent,
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    obj = add_event(db, user_id, date, payload)
     if not obj:
         return error(code=2003, message="Add event failed")
-    return success(data=EmotionDayData(**obj.data).model_dump())
+    return raw_success(data=serialize_day(db, obj))
 
 
 @router.put("/days/{date}/events/{event_id}")
-def update_emotion_event(date: str, event_id: UUID, payload: EmotionEvent, db: Session = Depends(get_db)):
-    obj = update_event(db, date, event_id, payload)
+def update_emotion_event(
+    date: str,
+    event_id: UUID,
+    payload: EmotionEvent,
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    obj = update_event(db, user_id, date, event_id, payload)
     if not obj:
         return error(code=2004, message="Update event failed or not found")
-    return success(data=EmotionDayData(**obj.data).model_dump())
+    return raw_success(data=serialize_day(db, obj))
 
 
 @router.delete("/days/{date}/events/{event_id}")
-def delete_emotion_event(date: str, event_id: UUID, db: Session = Depends(get_db)):
-    obj = delete_event(db, date, event_id)
+def delete_emotion_event(
+    date: str,
+    event_id: UUID,
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    obj = delete_event(db, user_id, date, event_id)
     if not obj:
         return error(code=2005, message="Delete event failed or not found")
-    return success(data=EmotionDayData(**obj.data).model_dump())
+    return raw_success(data=serialize_day(db, obj))
 
 
 @router.patch("/days/{date}/music")
-def patch_music_status(date: str, payload: MusicStatusUpdate, db: Session = Depends(get_db)):
-    obj = update_music_generation(db, date, prompt=payload.prompt, generated=payload.generated)
+def patch_music_status(
+    date: str,
+    payload: MusicStatusUpdate,
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    obj = update_music_generation(db, user_id, date, prompt=payload.prompt, generated=payload.generated)
     if not obj:
         return error(code=2006, message="Update music status failed or not found")
-    return success(data=EmotionDayData(**obj.data).model_dump())
+    return raw_success(data=serialize_day(db, obj))
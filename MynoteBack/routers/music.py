@@ -6,23 +6,47 @@
 from __future__ import annotations
 
 import os
-from typing import Optional
-from datetime import datetime
+from typing import Dict, Optional
 
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from config import get_db
-from models.music_task import MusicTask
+from config import (
+    MUSIC_QUERY_CACHE_TTL,
+    MUSIC_QUERY_CACHE_SIZE,
+    MUSIC_CACHE_MAX_AGE_SECONDS,
+)
 from schemas.music import (
     DailyMusicRequest,
     WeeklyMusicRequest,
+    WeeklyHistoryMusicRequest,
     MusicTaskResponse,
     MusicQueryResponse,
-    SunoCallback
+    SunoCallback,
+    SunoGenerationParams
 )
+from services.auth import get_current_user_id
+from services.cache import TTLCache, SingleFlight
+from services.db_executor import run_db
+from services.emotion_summary import build_weekly_summary, day_summaries
 from services.music_mapper import emotion_mapper
-from services.suno_client import SunoClient, SunoClientFactory, SunoAPIError, get_user_friendly_error
+from services.music_scheduler import music_scheduler
+from services.music_task_service import (
+    TERMINAL_STATUSES,
+    get_user_task,
+    create_task,
+    apply_callback,
+    task_to_dict,
+    compute_params_hash,
+    find_reusable_task,
+)
+from services.suno_client import (
+    SunoClient,
+    SunoClientFactory,
+    SunoAPIError,
+    batch_refresher,
+    get_user_friendly_error,
+)
 from services.response import success, error
 
 import logging
@@ -31,6 +55,14 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/music", tags=["music"])
 
+# /music/query 的并发合并与短 TTL 缓存（只缓存未完成的状态）
+# 缓存值为 (user_id, data)，key 只用 task_id，回调时不需要知道任务所属用户即可失效
+_status_cache = TTLCache(maxsize=MUSIC_QUERY_CACHE_SIZE, ttl=MUSIC_QUERY_CACHE_TTL)
+_status_flight = SingleFlight()
+
+# 相同 Suno 参数的并发生成请求合并为一次
+_generate_flight = SingleFlight()
+
 
 # ============================================
 # Suno API 配置
@@ -54,17 +86,17 @@ def get_suno_client() -> SunoClient:
 @router.post("/generate-daily", response_model=dict)
 async def generate_daily_music(
     request: DailyMusicRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    user_id: Optional[int] = Depends(get_current_user_id)
 ):
     """
     生成单日音乐
     
     流程：
     1. 情绪映射 → Suno 参数
-    2. 调用 Suno API 创建任务
-    3. 保存任务到数据库
-    4. 后台轮询任务状态
+    2. 相同参数已有成功或进行中的任务时直接复用
+    3. 调用 Suno API 创建任务
+    4. 保存任务到数据库
+    5. 交给调度器轮询任务状态
     """
     logger.info(f"[MusicRouter] 📥 收到单日音乐生成请求，日期: {request.date}")
     logger.info(f"[MusicRouter] 情绪事件数: {len(request.emotions)}")
@@ -80,64 +112,15 @@ async def generate_daily_music(
         logger.info(f"[MusicRouter] 音乐标题: {suno_params.title}")
         logger.info(f"[MusicRouter] 音乐风格: {suno_params.style}")
         
-        # 2. 调用 Suno API
-        suno_client = get_suno_client()
-        
-        # 设置回调 URL
-        # 注意：Suno API 要求必须提供 callBackUrl
-        # 开发环境：使用占位符URL（Suno会尝试回调但失败，我们用轮询）
-        # 生产环境：使用真实的公网URL
-        callback_url = os.getenv("SUNO_CALLBACK_URL")
-        if not callback_url:
-            # 开发环境占位符（Suno会尝试回调但失败，不影响功能）
-            callback_url = "https://placeholder.example.com/callback"
-            logger.info("[MusicRouter] ⚠️ 使用占位符回调URL（开发模式）")
-        
-        task_id = await suno_client.generate_music(
-            prompt=suno_params.prompt,
-            style=suno_params.style,
-            title=suno_params.title,
-            custom_mode=suno_params.customMode,
-            instrumental=suno_params.instrumental,
-            model=suno_params.model,
-            style_weight=suno_params.styleWeight,
-            weirdness_constraint=suno_params.weirdnessConstraint,
-            negative_tags=suno_params.negativeTags,
-            callback_url=callback_url
-        )
-        
-        logger.info(f"[MusicRouter] ✅ Suno 任务创建成功，Task ID: {task_id}")
-        
-        # 3. 保存到数据库
-        music_task = MusicTask(
-            task_id=task_id,
+        # 2-5. 复用或创建任务
+        data = await _generate_or_reuse(
+            suno_params,
+            user_id=user_id,
             date=request.date,
             task_type="daily",
-            status="queued",
-            suno_params=suno_params.model_dump()
+            message="任务已创建，正在生成中"
         )
-        
-        db.add(music_task)
-        db.commit()
-        db.refresh(music_task)
-        
-        logger.info(f"[MusicRouter] ✅ 任务已保存到数据库，ID: {music_task.id}")
-        
-        # 4. 后台轮询任务状态（如果没有配置回调）
-        if not callback_url:
-            background_tasks.add_task(
-                poll_task_status,
-                task_id=task_id,
-                db_session=SessionLocal()
-            )
-            logger.info(f"[MusicRouter] 🔄 已启动后台轮询任务")
-        
-        # 5. 返回响应
-        return success(data={
-            "taskId": task_id,
-            "status": "queued",
-            "message": "任务已创建，正在生成中"
-        })
+        return success(data=data)
         
     except SunoAPIError as e:
         logger.error(f"[MusicRouter] ❌ Suno API 错误: {e}")
@@ -152,8 +135,7 @@ async def generate_daily_music(
 @router.post("/generate-weekly", response_model=dict)
 async def generate_weekly_music(
     request: WeeklyMusicRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    user_id: Optional[int] = Depends(get_current_user_id)
 ):
     """
     生成周音乐
@@ -173,55 +155,66 @@ async def generate_weekly_music(
         logger.info(f"[MusicRouter] ✅ 周情绪映射完成")
         logger.info(f"[MusicRouter] 音乐标题: {suno_params.title}")
         
-        # 2. 调用 Suno API
-        suno_client = get_suno_client()
-        
-        # 设置回调 URL（同 generate-daily）
-        callback_url = os.getenv("SUNO_CALLBACK_URL")
-        if not callback_url:
-            callback_url = "https://placeholder.example.com/callback"
-            logger.info("[MusicRouter] ⚠️ 使用占位符回调URL（开发模式）")
+        # 2-5. 复用或创建任务（使用 startDate 作为 date）
+        data = await _generate_or_reuse(
+            suno_params,
+            user_id=user_id,
+            date=request.startDate,
+            task_type="weekly",
+            message="周音乐任务已创建"
+        )
+        return success(data=data)
         
-        task_id = await suno_client.generate_music(
-            prompt=suno_params.prompt,
-            style=suno_params.style,
-            title=suno_params.title,
-            custom_mode=suno_params.customMode,
-            instrumental=suno_params.instrumental,
-            model=suno_params.model,
-            style_weight=suno_params.styleWeight,
-            weirdness_constraint=suno_params.weirdnessConstraint,
-            callback_url=callback_url
+    except SunoAPIError as e:
+        logger.error(f"[MusicRouter] ❌ Suno API 错误: {e}")
+        return error(code=5001, message=get_user_friendly_error(e))
+    
+    except Exception as e:
+        logger.error(f"[MusicRouter] ❌ 周音乐生成失败: {str(e)}", exc_info=True)
+        return error(code=5000, message=f"周音乐生成失败: {str(e)}")
+
+
+@router.post("/generate-weekly-from-history", response_model=dict)
+async def generate_weekly_music_from_history(
+    request: WeeklyHistoryMusicRequest,
+    user_id: Optional[int] = Depends(get_current_user_id)
+):
+    """
+    按已保存的情绪记录生成周音乐
+    
+    与 generate-weekly 相同，但 WeeklySummary 与每日数据由服务端从 emotion_days 计算，
+    客户端只需提供日期范围
+    """
+    logger.info(f"[MusicRouter] 📥 收到周音乐生成请求（服务端汇总）")
+    logger.info(f"[MusicRouter] 时间范围: {request.startDate} - {request.endDate}")
+    
+    try:
+        # 1. 汇总一周的情绪记录
+        days = await run_db(day_summaries, user_id, request.startDate, request.endDate)
+        weekly = build_weekly_summary(days)
+        if weekly is None:
+            return error(code=2001, message="该时间范围内没有情绪记录")
+        weekly_summary, daily_data = weekly
+        
+        # 2. 情绪映射
+        suno_params = emotion_mapper.map_weekly_emotions_to_suno(
+            weekly_summary=weekly_summary,
+            daily_data=daily_data
         )
         
-        logger.info(f"[MusicRouter] ✅ 周音乐任务创建成功，Task ID: {task_id}")
+        logger.info(f"[MusicRouter] ✅ 周情绪映射完成（{len(daily_data)} 天有记录）")
+        logger.info(f"[MusicRouter] 音乐标题: {suno_params.title}")
         
-        # 3. 保存到数据库（使用 startDate 作为 date）
-        music_task = MusicTask(
-            task_id=task_id,
+        # 3-6. 复用或创建任务（使用 startDate 作为 date）
+        data = await _generate_or_reuse(
+            suno_params,
+            user_id=user_id,
             date=request.startDate,
             task_type="weekly",
-            status="queued",
-            suno_params=suno_params.model_dump()
+            message="周音乐任务已创建"
         )
-        
-        db.add(music_task)
-        db.commit()
-        db.refresh(music_task)
-        
-        # 4. 后台轮询（如果没有回调）
-        if not callback_url:
-            background_tasks.add_task(
-                poll_task_status,
-                task_id=task_id,
-                db_session=SessionLocal()
-            )
-        
-        return success(data={
-            "taskId": task_id,
-            "status": "queued",
-            "message": "周音乐任务已创建"
-        })
+        # single-flight 的并发请求共享同一个 data，复制后再附加汇总
+        return success(data={**data, "weeklySummary": weekly_summary.model_dump()})
         
     except SunoAPIError as e:
         logger.error(f"[MusicRouter] ❌ Suno API 错误: {e}")
@@ -232,65 +225,127 @@ async def generate_weekly_music(
         return error(code=5000, message=f"周音乐生成失败: {str(e)}")
 
 
+async def _generate_or_reuse(
+    suno_params: SunoGenerationParams,
+    *,
+    user_id: Optional[int],
+    date: str,
+    task_type: str,
+    message: str
+) -> Dict:
+    """
+    内容寻址缓存：按参数哈希复用该用户已有的任务，否则创建新任务
+    
+    同一用户相同参数的并发请求合并为一次（single-flight），避免同时向 Suno 重复提交。
+    """
+    params_hash = compute_params_hash(suno_params)
+    return await _generate_flight.do(
+        (user_id, params_hash),
+        lambda: _submit_generation(suno_params, params_hash, user_id, date, task_type, message)
+    )
+
+
+async def _submit_generation(
+    suno_params: SunoGenerationParams,
+    params_hash: str,
+    user_id: Optional[int],
+    date: str,
+    task_type: str,
+    message: str
+) -> Dict:
+    # 2. 相同参数已有成功或进行中的任务时直接复用
+    cached_task = await run_db(_find_cached_task, params_hash, user_id)
+    if cached_task:
+        logger.info(
+            f"[MusicRouter] ♻️ 命中音乐缓存，复用任务: {cached_task['taskId']}（{cached_task['status']}）"
+        )
+        return {
+            "taskId": cached_task["taskId"],
+            "status": cached_task["status"],
+            "message": "相同内容的音乐已生成或正在生成，复用已有任务",
+            "cached": True
+        }
+    
+    # 3. 调用 Suno API
+    suno_client = get_suno_client()
+    
+    # 设置回调 URL
+    # 注意：Suno API 要求必须提供 callBackUrl
+    # 开发环境：使用占位符URL（Suno会尝试回调但失败，我们用轮询）
+    # 生产环境：使用真实的公网URL
+    callback_url = os.getenv("SUNO_CALLBACK_URL")
+    if not callback_url:
+        # 开发环境占位符（Suno会尝试回调但失败，不影响功能）
+        callback_url = "https://placeholder.example.com/callback"
+        logger.info("[MusicRouter] ⚠️ 使用占位符回调URL（开发模式）")
+    
+    task_id = await suno_client.generate_music(
+        prompt=suno_params.prompt,
+        style=suno_params.style,
+        title=suno_params.title,
+        custom_mode=suno_params.customMode,
+        instrumental=suno_params.instrumental,
+        model=suno_params.model,
+        style_weight=suno_params.styleWeight,
+        weirdness_constraint=suno_params.weirdnessConstraint,
+        negative_tags=suno_params.negativeTags,
+        callback_url=callback_url
+    )
+    
+    logger.info(f"[MusicRouter] ✅ Suno 任务创建成功，Task ID: {task_id}")
+    
+    # 4. 保存到数据库
+    task_pk = await run_db(
+        _save_task,
+        task_id=task_id,
+        user_id=user_id,
+        date=date,
+        task_type=task_type,
+        suno_params=suno_params.model_dump(),
+        params_hash=params_hash
+    )
+    
+    logger.info(f"[MusicRouter] ✅ 任务已保存到数据库，ID: {task_pk}")
+    
+    # 5. 交给调度器轮询（本进程不是 leader 时由 leader 扫描数据库接手；回调先到达时，调度器会直接结束该任务）
+    music_scheduler.schedule(task_id)
+    logger.info(f"[MusicRouter] 🔄 任务已加入轮询调度")
+    
+    return {
+        "taskId": task_id,
+        "status": "queued",
+        "message": message
+    }
+
+
 @router.get("/query/{task_id}", response_model=dict)
 async def query_music_task(
     task_id: str,
-    db: Session = Depends(get_db)
+    user_id: Optional[int] = Depends(get_current_user_id)
 ):
     """
     查询音乐生成任务状态
     
     逻辑：
-    1. 先从数据库查询
-    2. 如果状态不是终态（succeeded/failed），则查询 Suno API
-    3. 更新数据库并返回
+    1. 未完成任务的状态在短 TTL 内直接从内存返回
+    2. 同一 task_id 的并发请求合并为一次查询，共享结果
+    3. 调度器运行时，数据库中就是最近一次批量 sweep 的结果，直接返回
+    4. 调度器未运行时（如被禁用），按需对这一条任务做一次 sweep
     """
     logger.info(f"[MusicRouter] 📊 查询任务状态: {task_id}")
     
-    # 1. 从数据库查询
-    music_task = db.query(MusicTask).filter(MusicTask.task_id == task_id).first()
+    cached = _status_cache.get(task_id)
+    if cached is not None and cached[0] == user_id:
+        return success(data=cached[1])
     
-    if not music_task:
-        logger.warning(f"[MusicRouter] ⚠️ 任务不存在: {task_id}")
-        return error(code=4004, message="任务不存在")
-    
-    # 2. 如果已完成或失败，直接返回缓存结果
-    if music_task.status in ["succeeded", "failed"]:
-        logger.info(f"[MusicRouter] ✅ 返回缓存结果，状态: {music_task.status}")
-        return success(data={
-            "taskId": music_task.task_id,
-            "status": music_task.status,
-            "musicUrl": music_task.music_url,
-            "duration": music_task.duration,
-            "createdAt": music_task.created_at.isoformat() if music_task.created_at else None,
-            "finishedAt": music_task.finished_at.isoformat() if music_task.finished_at else None
-        })
-    
-    # 3. 查询 Suno API 获取最新状态
     try:
-        suno_client = get_suno_client()
-        result = await suno_client.query_task(task_id)
-        
-        # 4. 更新数据库
-        music_task.status = result["status"]
+        data = await _status_flight.do((user_id, task_id), lambda: _load_task_status(task_id, user_id))
         
-        if result["status"] == "succeeded":
-            music_task.music_url = result.get("musicUrl")
-            music_task.duration = result.get("duration")
-            music_task.finished_at = datetime.utcnow()
-            logger.info(f"[MusicRouter] ✅ 任务完成！音乐 URL: {result.get('musicUrl')}")
-        
-        db.commit()
-        db.refresh(music_task)
+        if data is None:
+            logger.warning(f"[MusicRouter] ⚠️ 任务不存在: {task_id}")
+            return error(code=4004, message="任务不存在")
         
-        return success(data={
-            "taskId": music_task.task_id,
-            "status": music_task.status,
-            "musicUrl": music_task.music_url,
-            "duration": music_task.duration,
-            "createdAt": music_task.created_at.isoformat() if music_task.created_at else None,
-            "finishedAt": music_task.finished_at.isoformat() if music_task.finished_at else None
-        })
+        return success(data=data)
         
     except SunoAPIError as e:
         logger.error(f"[MusicRouter] ❌ 查询失败: {e}")
@@ -301,10 +356,42 @@ async def query_music_task(
         return error(code=5000, message=f"查询失败: {str(e)}")
 
 
+async def _load_task_status(task_id: str, user_id: Optional[int]) -> Optional[Dict]:
+    """
+    读取任务状态，必要时按需刷新
+    
+    Returns:
+        /music/query 的响应数据；任务不存在时返回 None
+        
+    Raises:
+        SunoAPIError: 按需刷新失败
+    """
+    # 1. 从数据库查询（只能查到自己的任务）
+    data = await run_db(_read_task, task_id, user_id)
+    if data is None:
+        return None
+    
+    # 2. 按需刷新（结果由 sweep 写回数据库）
+    if data["status"] not in TERMINAL_STATUSES and not music_scheduler.enabled:
+        get_suno_client()
+        states = await batch_refresher.sweep([task_id])
+        
+        state = states.get(task_id)
+        if state and state["error"] is not None:
+            raise state["error"]
+        
+        data = await run_db(_read_task, task_id, user_id)
+        if data["status"] == "succeeded":
+            logger.info(f"[MusicRouter] ✅ 任务完成！音乐 URL: {data['musicUrl']}")
+    
+    if data["status"] not in TERMINAL_STATUSES:
+        _status_cache.set(task_id, (user_id, data))
+    return data
+
+
 @router.post("/callback", response_model=dict)
 async def suno_callback(
-    callback: SunoCallback,
-    db: Session = Depends(get_db)
+    callback: SunoCallback
 ):
     """
     Suno API 回调接口
@@ -315,35 +402,29 @@ async def suno_callback(
     logger.info(f"[MusicRouter] 回调阶段: {callback.stage}")
     
     try:
-        # 1. 查找任务
-        music_task = db.query(MusicTask).filter(
-            MusicTask.task_id == callback.taskId
-        ).first()
+        # 1. 查找并更新任务状态
+        status = await run_db(
+            apply_callback,
+            callback.taskId,
+            stage=callback.stage,
+            audio_url=callback.data.audioUrl,
+            duration=callback.data.duration
+        )
         
-        if not music_task:
+        if status is None:
             logger.warning(f"[MusicRouter] ⚠️ 回调任务不存在: {callback.taskId}")
             return error(code=4004, message="任务不存在")
         
-        # 2. 更新任务状态
+        # 2. 记录日志
         if callback.stage == "complete":
-            music_task.status = "succeeded"
-            music_task.music_url = callback.data.audioUrl
-            music_task.duration = callback.data.duration
-            music_task.finished_at = datetime.utcnow()
-            
             logger.info(f"[MusicRouter] ✅ 任务完成（回调），音乐 URL: {callback.data.audioUrl}")
-        
         elif callback.stage == "failed":
-            music_task.status = "failed"
-            music_task.finished_at = datetime.utcnow()
-            
             logger.error(f"[MusicRouter] ❌ 任务失败（回调）")
-        
         else:
             # 中间状态（text, first 等）
             logger.info(f"[MusicRouter] 📊 中间回调阶段: {callback.stage}")
         
-        db.commit()
+        _status_cache.pop(callback.taskId)
         
         return success(data={"status": "ok"})
         
@@ -353,67 +434,23 @@ async def suno_callback(
 
 
 # ============================================
-# 后台任务
+# 数据库操作（通过 run_db 在数据库线程池中执行）
 # ============================================
 
-from sqlalchemy.orm import sessionmaker
-from config import engine
+def _read_task(db: Session, task_id: str, user_id: Optional[int]) -> Optional[Dict]:
+    music_task = get_user_task(db, user_id, task_id)
+    return task_to_dict(music_task) if music_task else None
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _find_cached_task(db: Session, params_hash: str, user_id: Optional[int]) -> Optional[Dict]:
+    music_task = find_reusable_task(
+        db, params_hash, user_id=user_id, max_age_seconds=MUSIC_CACHE_MAX_AGE_SECONDS
+    )
+    return task_to_dict(music_task) if music_task else None
 
-async def poll_task_status(task_id: str, db_session: Session):
-    """
-    后台轮询任务状态（在没有回调时使用）
-    
-    Args:
-        task_id: 任务 ID
-        db_session: 数据库会话
-    """
-    logger.info(f"[BackgroundTask] 🔄 开始轮询任务: {task_id}")
-    
-    try:
-        suno_client = get_suno_client()
-        
-        # 轮询直到完成（最多 5 分钟）
-        result = await suno_client.poll_until_complete(
-            task_id=task_id,
-            max_wait_seconds=300
-        )
-        
-        # 更新数据库
-        music_task = db_session.query(MusicTask).filter(
-            MusicTask.task_id == task_id
-        ).first()
-        
-        if music_task:
-            music_task.status = "succeeded"
-            music_task.music_url = result.get("musicUrl")
-            music_task.duration = result.get("duration")
-            music_task.finished_at = datetime.utcnow()
-            
-            db_session.commit()
-            
-            logger.info(f"[BackgroundTask] ✅ 轮询完成，任务成功")
-        
-    except TimeoutError:
-        logger.error(f"[BackgroundTask] ⏰ 轮询超时: {task_id}")
-        
-        # 标记为超时
-        music_task = db_session.query(MusicTask).filter(
-            MusicTask.task_id == task_id
-        ).first()
-        
-        if music_task:
-            music_task.status = "timeouted"
-            music_task.finished_at = datetime.utcnow()
-            db_session.commit()
-    
-    except Exception as e:
-        logger.error(f"[BackgroundTask] ❌ 轮询失败: {str(e)}", exc_info=True)
-    
-    finally:
-        db_session.close()
+
+def _save_task(db: Session, **fields) -> int:
+    return create_task(db, **fields).id
 
 
 # ============================================
@@ -435,3 +472,19 @@ async def health_check():
         logger.error(f"[MusicRouter] ❌ 健康检查失败: {str(e)}")
         return error(code=5003, message="健康检查失败")
 
+
+@router.get("/stats")
+async def music_stats():
+    """运行时统计（Suno 连接池等），用于容量规划"""
+    return success(data={
+        "pool": SunoClientFactory.pool_stats(),
+        "scheduler": music_scheduler.stats(),
+        "query": {
+            "cache": _status_cache.stats(),
+            "singleFlight": _status_flight.stats()
+        },
+        "generate": {
+            "singleFlight": _generate_flight.stats()
+        }
+    })
+
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 
-from config import get_db
+from config import get_db, EXPORT_GZIP_LEVEL
+from services.auth import get_current_user_id
 from schemas.score import Score
-from services.response import success, error
+from services.export_service import iter_scores
+from services.response import success, error, raw_success, accepts_gzip, ndjson_response
 from services.score_service import (
-    list_scores,
-    get_score_by_uuid,
+    list_scores_raw,
+    get_score_raw,
     create_score,
     update_score,
     delete_score,
@@ -18,39 +23,73 @@ router = APIRouter(prefix="/scores", tags=["scores"])
 
 
 @router.get("")
-def list_all_scores(db: Session = Depends(get_db)):
-    recs = list_scores(db)
-    # 直接返回存储的 JSON 数据
-    return success(data=[r.data for r in recs])
+def list_all_scores(
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    # 直接返回存储的 JSON 文本，不经过解码和 jsonable_encoder
+    return raw_success(data=list_scores_raw(db, user_id))
+
+
+# 必须在 /{uuid} 之前注册
+@router.get("/export")
+def export_scores(
+    request: Request,
+    updated_since: Optional[datetime] = Query(None, description="只导出该时间（含）之后更新过的乐谱，用于增量拉取"),
+    user_id: Optional[int] = Depends(get_current_user_id),
+):
+    """流式导出乐谱（NDJSON，每行一个）；请求头带 Accept-Encoding: gzip 时压缩"""
+    return ndjson_response(
+        iter_scores(user_id, updated_since=updated_since),
+        filename="scores.ndjson",
+        gzip_level=EXPORT_GZIP_LEVEL if accepts_gzip(request.headers.get("accept-encoding")) else None,
+    )
 
 
 @router.get("/{uuid}")
-def get_score(uuid: str, db: Session = Depends(get_db)):
-    rec = get_score_by_uuid(db, uuid)
-    if not rec:
+def get_score(
+    uuid: str,
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    data = get_score_raw(db, user_id, uuid)
+    if data is None:
         return error(code=2101, message="Score not found")
-    return success(data=rec.data)
+    return raw_success(data=data)
 
 
 @router.post("")
-def create_new_score(payload: Score, db: Session = Depends(get_db)):
-    rec, err = create_score(db, payload)
+def create_new_score(
+    payload: Score,
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    rec, err = create_score(db, user_id, payload)
     if err:
         return error(code=2102, message=err)
     return success(data=rec.data)
 
 
 @router.put("/{uuid}")
-def update_existing_score(uuid: str, payload: Score, db: Session = Depends(get_db)):
-    rec = update_score(db, uuid, payload)
+def update_existing_score(
+    uuid: str,
+    payload: Score,
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    rec = update_score(db, user_id, uuid, payload)
     if not rec:
         return error(code=2103, message="Update failed or not found")
     return success(data=rec.data)
 
 
 @router.delete("/{uuid}")
-def remove_score(uuid: str, db: Session = Depends(get_db)):
-    ok = delete_score(db, uuid)
+def remove_score(
+    uuid: str,
+    user_id: Optional[int] = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    ok = delete_score(db, user_id, uuid)
     if not ok:
         return error(code=2104, message="Delete failed or not found")
     return success(data=True)
@@ -1,43 +1,113 @@
-from fastapi import APIRouter, Depends
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 
-from config import get_db
-from schemas.user import UserRegister, UserLogin, UserOut
+from config import get_db, LOGIN_MAX_ATTEMPTS, LOGIN_ATTEMPT_WINDOW_SECONDS
+from schemas.user import UserRegister, UserLogin, TokenRefresh, UserLogout
+from services.auth import require_token_claims
+from services.db_executor import run_db
+from services.password_hasher import PasswordHasherBusy
+from services.rate_limit import LoginThrottle
 from services.response import success, error
+from services.tokens import REFRESH, TokenError, token_service
 from services.user_service import (
-    create_user,
+    register_user,
     authenticate_user,
-    get_user_by_id,
+    get_user_profile,
 )
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# 按登录标识限流（计数保存在数据库中，所有 worker 共享），暴力破解请求不会进入密码校验
+_login_throttle = LoginThrottle(max_attempts=LOGIN_MAX_ATTEMPTS, window=LOGIN_ATTEMPT_WINDOW_SECONDS)
+
 
 @router.post("/register")
-def register(payload: UserRegister, db: Session = Depends(get_db)):
-    user, err = create_user(
-        db,
-        email=payload.email,
-        phone=payload.phone,
-        username=payload.username,
-        password=payload.password,
-    )
+async def register(payload: UserRegister):
+    try:
+        user, err = await register_user(
+            email=payload.email,
+            phone=payload.phone,
+            username=payload.username,
+            password=payload.password,
+        )
+    except PasswordHasherBusy:
+        return error(code=1004, message="Server busy, please retry later")
     if err:
         return error(code=1001, message=err)
-    return success(data=UserOut.model_validate(user).model_dump())
+    return success(data={**user, **token_service.issue(user["id"])})
 
 
 @router.post("/login")
-def login(payload: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, login=payload.login, password=payload.password)
+async def login(payload: UserLogin):
+    key = payload.login.strip().lower()
+    attempts = await run_db(_login_throttle.acquire, key)
+    if attempts is None:
+        return error(code=1005, message="Too many login attempts, please retry later")
+
+    try:
+        user = await authenticate_user(login=payload.login, password=payload.password)
+    except PasswordHasherBusy:
+        return error(code=1004, message="Server busy, please retry later")
     if not user:
         return error(code=1002, message="Invalid credentials")
-    return success(data=UserOut.model_validate(user).model_dump())
+
+    # 窗口内第一次尝试就成功（常见情况）时不必清零，省掉一次写事务
+    if attempts > 1:
+        await run_db(_login_throttle.reset, key)
+    # 之后的请求携带 accessToken，不再重复校验密码
+    return success(data={**user, **token_service.issue(user["id"])})
+
+
+@router.post("/refresh")
+def refresh_token(payload: TokenRefresh, db: Session = Depends(get_db)):
+    try:
+        claims = token_service.verify(payload.refreshToken, REFRESH)
+    except TokenError:
+        return error(code=1006, message="Invalid refresh token")
+    # 每个 refresh token 只能使用一次（作废记录在数据库中，所有 worker 共享）
+    if not token_service.redeem(db, claims):
+        return error(code=1006, message="Invalid refresh token")
+    return success(data=token_service.issue(claims["sub"]))
+
+
+@router.post("/logout")
+def logout(
+    payload: Optional[UserLogout] = None,
+    claims: Dict = Depends(require_token_claims),
+    db: Session = Depends(get_db),
+):
+    token_service.revoke(claims)
+    if payload and payload.refreshToken:
+        try:
+            token_service.redeem(db, token_service.verify(payload.refreshToken, REFRESH))
+        except TokenError:
+            pass
+    return success(data=True)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 使用弱比较：忽略 W/ 前缀，支持多个值和 *"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
 
 
 @router.get("/{user_id}")
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = get_user_by_id(db, user_id)
-    if not user:
+def get_user(user_id: int, request: Request, db: Session = Depends(get_db)):
+    profile = get_user_profile(db, user_id)
+    if not profile:
         return error(code=1003, message="User not found")
-    return success(data=UserOut.model_validate(user).model_dump())
+
+    etag, body = profile
+    # no-cache：客户端每次都带 If-None-Match 重新验证，资料未变时返回 304 空响应
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
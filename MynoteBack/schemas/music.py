@@ -101,6 +101,12 @@ class WeeklyMusicRequest(BaseModel):
     weeklySummary: WeeklySummary = Field(..., description="周汇总数据")
 
 
+class WeeklyHistoryMusicRequest(BaseModel):
+    """按服务端已保存的情绪记录生成周音乐（周汇总在服务端计算）"""
+    startDate: str = Field(..., description="开始日期，格式 YYYY-MM-DD")
+    endDate: str = Field(..., description="结束日期（含），格式 YYYY-MM-DD")
+
+
 # ============================================
 # 响应模型（Response Schemas）
 # ============================================
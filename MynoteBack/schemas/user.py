@@ -32,3 +32,11 @@ class UserOut(BaseModel):
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class TokenRefresh(BaseModel):
+    refreshToken: str
+
+
+class UserLogout(BaseModel):
+    refreshToken: Optional[str] = None
@@ -0,0 +1,42 @@
+"""
+当前用户解析
+客户端登录后在请求头中携带 Authorization: Bearer <accessToken>，
+令牌只做 HMAC 校验，不访问数据库。
+未携带令牌时为 None，对应未登录（旧客户端）的数据，所有用户数据都按该 id 隔离。
+"""
+
+from typing import Dict, Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from services.tokens import ACCESS, TokenError, token_service
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def get_token_claims(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+) -> Optional[Dict]:
+    """校验 access token；未携带时返回 None，无效时返回 401"""
+    if credentials is None:
+        return None
+    try:
+        return token_service.verify(credentials.credentials, ACCESS)
+    except TokenError as e:
+        raise HTTPException(
+            status_code=401,
+            detail=f"Invalid token: {e}",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def get_current_user_id(claims: Optional[Dict] = Depends(get_token_claims)) -> Optional[int]:
+    return claims["sub"] if claims else None
+
+
+def require_token_claims(claims: Optional[Dict] = Depends(get_token_claims)) -> Dict:
+    """必须登录的接口使用"""
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return claims
@@ -0,0 +1,48 @@
+"""
+当前进程实际可用的 CPU 数
+os.cpu_count() / multiprocessing.cpu_count() 返回宿主机的核数，容器内会偏大：
+- CPU 亲和性（taskset、cpuset）限制可调度的核
+- cgroup CPU 配额（docker --cpus、Kubernetes limits.cpu）限制可用的 CPU 时间
+取两者中较小的值，至少为 1。
+"""
+
+import math
+import os
+from typing import Optional
+
+
+def _cgroup_quota() -> Optional[float]:
+    """cgroup 配额折算的 CPU 数；未限制或无法读取时返回 None"""
+    try:
+        # cgroup v2：「配额 周期」，未限制时配额为 max
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1：未限制时配额为 -1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        # macOS / Windows 没有 sched_getaffinity
+        count = os.cpu_count() or 1
+
+    quota = _cgroup_quota()
+    if quota is not None:
+        count = min(count, math.ceil(quota))
+    return max(1, count)
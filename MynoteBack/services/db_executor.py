@@ -0,0 +1,62 @@
+"""
+数据库线程池
+async 路由不能直接调用同步 SQLAlchemy Session（commit 会阻塞事件循环），
+统一通过 run_db 把数据库操作放到独立的有界线程池中执行。
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from config import SessionLocal, DB_EXECUTOR_WORKERS
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def configure(workers: int) -> None:
+    """
+    (重新)创建数据库线程池
+
+    Args:
+        workers: 线程数；0 表示不使用线程池，直接在事件循环中执行（仅用于调试和基准对比）
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db") if workers > 0 else None
+    logger.info(f"[DBExecutor] 数据库线程池 workers={workers}")
+
+
+def shutdown() -> None:
+    """等待进行中的数据库操作完成后关闭线程池"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def run_db(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    在数据库线程池中执行 fn(db, *args, **kwargs)
+
+    每次调用使用独立的 Session，调用结束即关闭。
+    fn 应返回普通数据（dict / 基本类型），不要把 ORM 对象带出线程。
+    """
+    def call():
+        db: Session = SessionLocal()
+        try:
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    if _executor is None:
+        return call()
+    return await asyncio.get_running_loop().run_in_executor(_executor, call)
+
+
+configure(DB_EXECUTOR_WORKERS)
@@ -0,0 +1,124 @@
+"""
+带统计的数据库连接池
+在 QueuePool 的基础上记录每次取连接（checkout）的等待时间和连接池饱和情况，
+用于判断瓶颈是否在连接池：饱和次数 / 等待时间上升时应调大 DB_POOL_SIZE / DB_MAX_OVERFLOW，
+或减少并发访问数据库的线程数。
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# 计算等待时间分位数时保留的最近样本数
+_WAIT_SAMPLES = 1000
+
+
+class PoolMetrics:
+    """连接池取连接统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self.checkouts = 0
+        self.saturated = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.peak_in_use = 0
+
+    def record(self, wait: float, in_use: int, saturated: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.saturated += saturated
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+            self._waits.append(wait)
+
+    def record_timeout(self, wait: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.wait_max = max(self.wait_max, wait)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            checkouts = self.checkouts
+            return {
+                "checkouts": checkouts,
+                "saturatedCheckouts": self.saturated,
+                "timeouts": self.timeouts,
+                "peakInUse": self.peak_in_use,
+                "waitMsAvg": round(self.wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "waitMsP50": round(waits[len(waits) // 2] * 1000, 3) if waits else 0.0,
+                "waitMsP99": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000, 3) if waits else 0.0,
+                "waitMsMax": round(self.wait_max * 1000, 3),
+            }
+
+
+class MeteredQueuePool(QueuePool):
+    """
+    记录取连接耗时的 QueuePool
+
+    等待时间包含排队、新建连接和 pre_ping 的时间；
+    取连接时连接数已达 pool_size + max_overflow 的记为一次饱和（saturatedCheckouts）。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        capacity = self.capacity()
+        saturated = capacity is not None and self.checkedout() >= capacity
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            waited = time.perf_counter() - started
+            self.metrics.record_timeout(waited)
+            logger.warning(f"[DBPool] ⚠️ 等待数据库连接超时（{waited:.1f}s）：{self.status()}")
+            raise
+        self.metrics.record(time.perf_counter() - started, self.checkedout(), saturated)
+        return connection
+
+    def recreate(self) -> "MeteredQueuePool":
+        # engine.dispose() 会重建连接池，统计数据保留
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def capacity(self):
+        """最大连接数；max_overflow 为 -1 时不限制，返回 None"""
+        if self._max_overflow < 0:
+            return None
+        return self.size() + self._max_overflow
+
+    def stats(self) -> Dict:
+        capacity = self.capacity()
+        in_use = self.checkedout()
+        return {
+            "size": self.size(),
+            "maxOverflow": self._max_overflow,
+            "capacity": capacity,
+            "inUse": in_use,
+            "idle": self.checkedin(),
+            "overflow": self.overflow(),
+            "saturation": round(in_use / capacity, 3) if capacity else None,
+            **self.metrics.stats(),
+        }
+
+
+def pool_stats(engine) -> Dict:
+    """当前进程的数据库连接池统计"""
+    pool = engine.pool
+    if isinstance(pool, MeteredQueuePool):
+        return pool.stats()
+    return {"pool": type(pool).__name__, "status": pool.status()}
@@ -1,105 +1,420 @@
 from __future__ import annotations
 
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
+from sqlalchemy import Text, cast, func, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from models.emotion import EmotionDay
+from models.emotion import EmotionDay, EmotionDaySummary, EmotionEventRecord
 from schemas.emotion import EmotionDayData, EmotionEvent
+from services.response import RawJSON
 
 
 # -------- EmotionDay 基础 CRUD --------
 
-def list_days(db: Session) -> List[EmotionDay]:
-    return db.query(EmotionDay).order_by(EmotionDay.date.desc()).all()
+def list_days(
+    db: Session,
+    user_id: Optional[int],
+    *,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[EmotionDay]:
+    """
+    按日期倒序列出某个用户的记录（走 (user_id, date) 索引）
 
+    Args:
+        date_from / date_to: 日期范围（闭区间，yyyy-MM-dd）
+        before: 游标，只返回日期严格小于它的记录（上一页最后一条的 date）
+        limit: 最多返回条数，None 表示不限
+    """
+    q = db.query(EmotionDay).filter(EmotionDay.user_id == user_id)
+    if date_from:
+        q = q.filter(EmotionDay.date >= date_from)
+    if date_to:
+        q = q.filter(EmotionDay.date <= date_to)
+    if before:
+        q = q.filter(EmotionDay.date < before)
+    q = q.order_by(EmotionDay.date.desc())
+    if limit is not None:
+        q = q.limit(limit)
+    return q.all()
 
-def get_day_by_date(db: Session, date: str) -> Optional[EmotionDay]:
-    return db.query(EmotionDay).filter(EmotionDay.date == date).first()
 
+def get_day_by_date(db: Session, user_id: Optional[int], date: str) -> Optional[EmotionDay]:
+    return db.query(EmotionDay).filter(EmotionDay.user_id == user_id, EmotionDay.date == date).first()
 
-def upsert_day(db: Session, day_data: EmotionDayData) -> EmotionDay:
-    obj = get_day_by_date(db, day_data.date)
-    data_dict = day_data.model_dump(mode='json')
-    if obj:
+
+def upsert_day(db: Session, user_id: Optional[int], day_data: EmotionDayData) -> EmotionDay:
+    data_dict = _day_fields(day_data.finalPrompt, day_data.musicGenerated)
+    obj = get_day_by_date(db, user_id, day_data.date)
+    created = False
+    if obj is None:
+        obj = _insert_day(db, user_id, day_data.date, data_dict)
+        created = obj is not None
+        if not created:
+            # 并发请求抢先创建了当天记录，按已有记录整体覆盖
+            obj = get_day_by_date(db, user_id, day_data.date)
+    if not created:
         obj.data = data_dict
-    else:
-        obj = EmotionDay(date=day_data.date, data=data_dict)
-        db.add(obj)
+        _touch(obj)
+        db.query(EmotionEventRecord).filter(EmotionEventRecord.day_id == obj.id).delete(
+            synchronize_session=False
+        )
+    db.add_all([_event_record(obj.id, e) for e in _unique_events(day_data.events)])
+    _rebuild_summary(db, obj.id)
     db.commit()
-    db.refresh(obj)
     return obj
 
 
-def delete_day(db: Session, date: str) -> bool:
-    obj = get_day_by_date(db, date)
+def delete_day(db: Session, user_id: Optional[int], date: str) -> bool:
+    obj = get_day_by_date(db, user_id, date)
     if not obj:
         return False
+    db.query(EmotionEventRecord).filter(EmotionEventRecord.day_id == obj.id).delete(
+        synchronize_session=False
+    )
+    db.query(EmotionDaySummary).filter(EmotionDaySummary.day_id == obj.id).delete(
+        synchronize_session=False
+    )
     db.delete(obj)
     db.commit()
     return True
 
 
-# -------- EmotionEvent 操作（基于 JSON 内部列表） --------
+# -------- EmotionEvent 操作（emotion_events 单行读写） --------
 
-def add_event(db: Session, date: str, event: EmotionEvent) -> Optional[EmotionDay]:
-    obj = get_day_by_date(db, date)
-    if not obj:
-        # 如果不存在该日期，自动创建
-        day = EmotionDayData(date=date, events=[event], finalPrompt=None, musicGenerated=False)
-        return upsert_day(db, day)
+def add_event(db: Session, user_id: Optional[int], date: str, event: EmotionEvent) -> Optional[EmotionDay]:
+    # 如果不存在该日期，自动创建
+    obj = get_day_by_date(db, user_id, date) or _insert_day(db, user_id, date, _day_fields(None, False))
+    if obj is None:
+        # 并发请求抢先创建了当天记录
+        obj = get_day_by_date(db, user_id, date)
+    summary = _locked_summary(db, obj.id)
 
-    cur = EmotionDayData(**obj.data)
-    cur.events.append(event)
-    obj.data = cur.model_dump()
+    rec = _event_record(obj.id, event)
+    db.add(rec)
+    try:
+        db.flush()  # 取得行 id（决定事件顺序和主导情绪的先后）
+    except IntegrityError:
+        # 当天已有相同 id 的事件
+        db.rollback()
+        return None
+    if summary is None:
+        _rebuild_summary(db, obj.id)
+    else:
+        _summary_add(summary, _summary_row(rec))
+    _touch(obj)
     db.commit()
-    db.refresh(obj)
     return obj
 
 
-def update_event(db: Session, date: str, event_id: UUID, new_event: EmotionEvent) -> Optional[EmotionDay]:
-    obj = get_day_by_date(db, date)
+def update_event(
+    db: Session, user_id: Optional[int], date: str, event_id: UUID, new_event: EmotionEvent
+) -> Optional[EmotionDay]:
+    obj = get_day_by_date(db, user_id, date)
     if not obj:
         return None
-    cur = EmotionDayData(**obj.data)
-    replaced = False
-    for idx, e in enumerate(cur.events):
-        if e.id == event_id:
-            cur.events[idx] = new_event
-            replaced = True
-            break
-    if not replaced:
+    # 先锁定汇总行再读事件，读到的是其他事务提交后的事件
+    summary = _locked_summary(db, obj.id)
+    rec = (
+        db.query(EmotionEventRecord)
+        .filter(EmotionEventRecord.day_id == obj.id, EmotionEventRecord.event_id == str(event_id))
+        .first()
+    )
+    if not rec:
+        db.rollback()
+        return None
+    old_row = _summary_row(rec)
+    rec.event_id = str(new_event.id)
+    rec.emotion = new_event.emotion
+    rec.time = new_event.time
+    rec.data = new_event.model_dump(mode='json')
+    try:
+        db.flush()
+    except IntegrityError:
+        # 新 id 与当天的其他事件重复
+        db.rollback()
         return None
-    obj.data = cur.model_dump()
+    if summary is not None and _summary_remove(summary, old_row):
+        _summary_add(summary, _summary_row(rec))
+    else:
+        _rebuild_summary(db, obj.id)
+    _touch(obj)
     db.commit()
-    db.refresh(obj)
     return obj
 
 
-def delete_event(db: Session, date: str, event_id: UUID) -> Optional[EmotionDay]:
-    obj = get_day_by_date(db, date)
+def delete_event(db: Session, user_id: Optional[int], date: str, event_id: UUID) -> Optional[EmotionDay]:
+    obj = get_day_by_date(db, user_id, date)
     if not obj:
         return None
-    cur = EmotionDayData(**obj.data)
-    before = len(cur.events)
-    cur.events = [e for e in cur.events if e.id != event_id]
-    if len(cur.events) == before:
+    # 先锁定汇总行再读事件，读到的是其他事务提交后的事件
+    summary = _locked_summary(db, obj.id)
+    rec = (
+        db.query(EmotionEventRecord)
+        .filter(EmotionEventRecord.day_id == obj.id, EmotionEventRecord.event_id == str(event_id))
+        .first()
+    )
+    if not rec:
+        db.rollback()
         return None
-    obj.data = cur.model_dump()
+    removed = _summary_row(rec)
+    db.delete(rec)
+    if summary is None or not _summary_remove(summary, removed):
+        _rebuild_summary(db, obj.id)
+    _touch(obj)
     db.commit()
-    db.refresh(obj)
     return obj
 
 
-def update_music_generation(db: Session, date: str, *, prompt: Optional[str], generated: bool) -> Optional[EmotionDay]:
-    obj = get_day_by_date(db, date)
+def update_music_generation(
+    db: Session, user_id: Optional[int], date: str, *, prompt: Optional[str], generated: bool
+) -> Optional[EmotionDay]:
+    obj = get_day_by_date(db, user_id, date)
     if not obj:
         return None
-    cur = EmotionDayData(**obj.data)
-    cur.finalPrompt = prompt
-    cur.musicGenerated = generated
-    obj.data = cur.model_dump()
+    obj.data = _day_fields(prompt, generated)
     db.commit()
-    db.refresh(obj)
     return obj
+
+
+# -------- 序列化（组装成 EmotionDayData 结构） --------
+
+def serialize_day(db: Session, obj: EmotionDay) -> Dict[str, Any]:
+    return serialize_days(db, [obj])[0]
+
+
+def serialize_days(db: Session, objs: List[EmotionDay]) -> List[Dict[str, Any]]:
+    """
+    一次查询取出所有天的事件，按插入顺序拼回 EmotionDayData 结构
+
+    事件以数据库中的 JSON 文本（RawJSON）返回，不再解码和重新校验，
+    需配合 services.response.raw_success 输出
+    """
+    events: Dict[int, List[RawJSON]] = {obj.id: [] for obj in objs}
+    if events:
+        rows = (
+            db.query(EmotionEventRecord.day_id, cast(EmotionEventRecord.data, Text))
+            .filter(EmotionEventRecord.day_id.in_(list(events)))
+            .order_by(EmotionEventRecord.day_id, EmotionEventRecord.id)
+            .all()
+        )
+        for day_id, data in rows:
+            events[day_id].append(RawJSON(data))
+
+    return [
+        {
+            "date": obj.date,
+            "events": events[obj.id],
+            "finalPrompt": obj.data.get("finalPrompt"),
+            "musicGenerated": obj.data.get("musicGenerated", False),
+        }
+        for obj in objs
+    ]
+
+
+def summarize_days(db: Session, objs: List[EmotionDay]) -> List[Dict[str, Any]]:
+    """只返回日期、事件数、主导情绪、musicGenerated（读 emotion_day_summaries，不加载事件）"""
+    summaries: Dict[int, EmotionDaySummary] = {}
+    if objs:
+        rows = (
+            db.query(EmotionDaySummary)
+            .filter(EmotionDaySummary.day_id.in_([obj.id for obj in objs]))
+            .all()
+        )
+        summaries = {row.day_id: row for row in rows}
+
+    result = []
+    for obj in objs:
+        summary = summaries.get(obj.id)
+        result.append({
+            "date": obj.date,
+            "eventCount": summary.event_count if summary else 0,
+            "dominantEmotion": dominant_emotion(summary.emotion_counts) if summary else None,
+            "musicGenerated": obj.data.get("musicGenerated", False),
+        })
+    return result
+
+
+def dominant_emotion(emotion_counts: Dict[str, List[int]]) -> Optional[str]:
+    """次数最多的情绪；次数相同时取当天最先出现的"""
+    if not emotion_counts:
+        return None
+    return min(emotion_counts.items(), key=lambda item: (-item[1][0], item[1][1]))[0]
+
+
+# -------- 每日汇总（emotion_day_summaries）增量维护，与事件写入在同一事务中 --------
+
+# (事件行 id, 情绪, 时间, hr, hrv)
+SummaryRow = Tuple[int, Optional[str], Optional[str], Optional[int], Optional[int]]
+
+
+def _summary_row(rec: EmotionEventRecord) -> SummaryRow:
+    data = rec.data or {}
+    return rec.id, rec.emotion, rec.time, _int_or_none(data.get("hr")), _int_or_none(data.get("hrv"))
+
+
+def _int_or_none(value: Any) -> Optional[int]:
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def _empty_summary(day_id: int) -> EmotionDaySummary:
+    summary = EmotionDaySummary(day_id=day_id)
+    _reset_summary(summary)
+    return summary
+
+
+def _reset_summary(summary: EmotionDaySummary) -> None:
+    summary.event_count = 0
+    summary.emotion_counts = {}
+    summary.hr_sum = summary.hr_count = summary.hrv_sum = summary.hrv_count = 0
+    summary.hr_min = summary.hr_max = summary.hrv_min = summary.hrv_max = None
+    summary.first_time = summary.last_time = None
+
+
+def _locked_summary(db: Session, day_id: int) -> Optional[EmotionDaySummary]:
+    # 锁定汇总行，并发写同一天时依次执行读改写：PostgreSQL 使用 FOR UPDATE；
+    # SQLite 不支持行锁，先执行一条空 UPDATE 取得写锁（pysqlite 在第一条写语句前才开始事务，
+    # 之前的 SELECT 不在事务中），之后的读取不会再被其他连接修改
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(
+            update(EmotionDaySummary)
+            .where(EmotionDaySummary.day_id == day_id)
+            .values(day_id=EmotionDaySummary.day_id)
+            .execution_options(synchronize_session=False)
+        )
+    return (
+        db.query(EmotionDaySummary)
+        .filter(EmotionDaySummary.day_id == day_id)
+        .with_for_update()
+        .first()
+    )
+
+
+def _summary_add(summary: EmotionDaySummary, row: SummaryRow) -> None:
+    row_id, emotion, time, hr, hrv = row
+    summary.event_count += 1
+    if emotion:
+        # JSON 列整体赋值，SQLAlchemy 才能检测到变更
+        counts = dict(summary.emotion_counts)
+        count, first_id = counts.get(emotion, (0, row_id))
+        counts[emotion] = [count + 1, min(first_id, row_id)]
+        summary.emotion_counts = counts
+    for name, value in (("hr", hr), ("hrv", hrv)):
+        if value is None:
+            continue
+        setattr(summary, f"{name}_sum", getattr(summary, f"{name}_sum") + value)
+        setattr(summary, f"{name}_count", getattr(summary, f"{name}_count") + 1)
+        low, high = getattr(summary, f"{name}_min"), getattr(summary, f"{name}_max")
+        setattr(summary, f"{name}_min", value if low is None else min(low, value))
+        setattr(summary, f"{name}_max", value if high is None else max(high, value))
+    if time:
+        summary.first_time = time if summary.first_time is None else min(summary.first_time, time)
+        summary.last_time = time if summary.last_time is None else max(summary.last_time, time)
+
+
+def _summary_remove(summary: EmotionDaySummary, row: SummaryRow) -> bool:
+    """
+    从汇总中减去一个事件；返回 False 表示无法增量计算（删掉的是最小 / 最大值、
+    最早 / 最晚时间或该情绪首次出现的事件），调用方需要重算当天汇总
+    """
+    row_id, emotion, time, hr, hrv = row
+    if hr is not None and hr in (summary.hr_min, summary.hr_max):
+        return False
+    if hrv is not None and hrv in (summary.hrv_min, summary.hrv_max):
+        return False
+    if time and time in (summary.first_time, summary.last_time):
+        return False
+    counts = dict(summary.emotion_counts)
+    if emotion:
+        if emotion not in counts:
+            return False
+        count, first_id = counts[emotion]
+        if count > 1 and first_id == row_id:
+            return False
+        if count > 1:
+            counts[emotion] = [count - 1, first_id]
+        else:
+            del counts[emotion]
+
+    summary.event_count -= 1
+    summary.emotion_counts = counts
+    if hr is not None:
+        summary.hr_sum -= hr
+        summary.hr_count -= 1
+    if hrv is not None:
+        summary.hrv_sum -= hrv
+        summary.hrv_count -= 1
+    return True
+
+
+def _rebuild_summary(db: Session, day_id: int) -> None:
+    """按当天的事件重算汇总（只读当天的事件行）"""
+    db.flush()
+    summary = _locked_summary(db, day_id)
+    if summary is None:
+        summary = _empty_summary(day_id)
+        db.add(summary)
+    else:
+        _reset_summary(summary)
+    recs = (
+        db.query(EmotionEventRecord)
+        .filter(EmotionEventRecord.day_id == day_id)
+        .order_by(EmotionEventRecord.id)
+        .all()
+    )
+    for rec in recs:
+        _summary_add(summary, _summary_row(rec))
+
+
+def _insert_day(db: Session, user_id: Optional[int], date: str, data: Dict[str, Any]) -> Optional[EmotionDay]:
+    """
+    新建当天记录（连同空的每日汇总）
+
+    并发请求抢先创建了同一天时唯一约束冲突：回滚并返回 None，调用方重新读取已有记录。
+    调用前会话中不能有其他未提交的修改。
+    """
+    obj = EmotionDay(user_id=user_id, date=date, data=data)
+    db.add(obj)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        return None
+    db.add(_empty_summary(obj.id))
+    db.flush()
+    return obj
+
+
+def _touch(obj: EmotionDay) -> None:
+    # 事件存放在 emotion_events，日记录本身不变：显式刷新 updated_at，增量导出据此发现当天的变更
+    obj.updated_at = func.now()
+
+
+def _day_fields(prompt: Optional[str], generated: bool) -> Dict[str, Any]:
+    return {"finalPrompt": prompt, "musicGenerated": generated}
+
+
+def _unique_events(events: List[EmotionEvent]) -> List[EmotionEvent]:
+    """去掉 id 重复的事件，保留第一条（与迁移 0002 相同）"""
+    seen = set()
+    result = []
+    for event in events:
+        if event.id not in seen:
+            seen.add(event.id)
+            result.append(event)
+    return result
+
+
+def _event_record(day_id: int, event: EmotionEvent) -> EmotionEventRecord:
+    return EmotionEventRecord(
+        day_id=day_id,
+        event_id=str(event.id),
+        emotion=event.emotion,
+        time=event.time,
+        data=event.model_dump(mode='json'),
+    )
@@ -0,0 +1,126 @@
+"""
+服务端情绪汇总
+按天汇总情绪事件（事件数、各情绪次数、平均心率 / HRV），再合成周音乐需要的
+WeeklySummary 与每日数据，客户端不必下载一周的事件自行计算。
+
+每日汇总来自 emotion_day_summaries（事件写入时增量维护），一周只需一条范围查询，不加载事件。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models.emotion import EmotionDay, EmotionDaySummary
+from schemas.music import DailySummaryData, WeeklySummary
+from services.emotion_service import dominant_emotion
+from services.music_mapper import EMOTION_VALENCE
+
+# 前后半周平均效价之差超过该值时视为上升 / 下降
+TREND_THRESHOLD = 0.2
+# 每日平均效价的极差超过该值时整体情绪视为波动较大
+SWING_THRESHOLD = 1.0
+
+
+def day_summaries(db: Session, user_id: Optional[int], start: str, end: str) -> List[Dict[str, Any]]:
+    """
+    日期范围内（闭区间，yyyy-MM-dd）每天的情绪汇总，按日期升序
+
+    每项包含 date / eventCount / emotionCounts / dominantEmotion / avgHeartRate / avgHRV / valence。
+    """
+    rows = (
+        db.query(EmotionDay.date, EmotionDaySummary)
+        .outerjoin(EmotionDaySummary, EmotionDaySummary.day_id == EmotionDay.id)
+        .filter(EmotionDay.user_id == user_id, EmotionDay.date >= start, EmotionDay.date <= end)
+        .order_by(EmotionDay.date)
+        .all()
+    )
+    return [_day_summary(date, row) for date, row in rows]
+
+
+def _day_summary(date: str, row: Optional[EmotionDaySummary]) -> Dict[str, Any]:
+    if row is None:
+        return {
+            "date": date, "eventCount": 0, "emotionCounts": {}, "dominantEmotion": None,
+            "avgHeartRate": 0, "avgHRV": None, "valence": 0.0,
+        }
+    # 按当天首次出现的顺序排列
+    ordered = sorted(row.emotion_counts.items(), key=lambda item: item[1][1])
+    counts = {emotion: count for emotion, (count, _) in ordered}
+    return {
+        "date": date,
+        "eventCount": row.event_count,
+        "emotionCounts": counts,
+        "dominantEmotion": dominant_emotion(row.emotion_counts),
+        "avgHeartRate": round(row.hr_sum / row.hr_count) if row.hr_count else 0,
+        "avgHRV": round(row.hrv_sum / row.hrv_count) if row.hrv_count else None,
+        "valence": _valence(counts, row.event_count),
+    }
+
+
+def _valence(counts: Dict[str, int], event_count: int) -> float:
+    """当天平均效价（-1 ~ 1）"""
+    if not event_count:
+        return 0.0
+    return sum(EMOTION_VALENCE.get(emotion, 0) * count for emotion, count in counts.items()) / event_count
+
+
+def build_weekly_summary(
+    days: List[Dict[str, Any]]
+) -> Optional[Tuple[WeeklySummary, List[DailySummaryData]]]:
+    """
+    由每日汇总合成 map_weekly_emotions_to_suno 的输入；没有任何事件时返回 None
+
+    - mostFrequentEmotion：全周次数最多的情绪（次数相同时取最先出现的）
+    - emotionTrend：后半周与前半周平均效价之差
+    - weeklyMood：每日效价波动较大时为「波动较大」，否则按全周平均效价
+    - avgDailyEvents：有记录的天平均事件数
+    """
+    days = [day for day in days if day["eventCount"]]
+    if not days:
+        return None
+
+    totals: Dict[str, int] = {}
+    for day in days:
+        for emotion, count in day["emotionCounts"].items():
+            totals[emotion] = totals.get(emotion, 0) + count
+    event_count = sum(day["eventCount"] for day in days)
+    counted = sum(totals.values())
+
+    valences = [day["valence"] for day in days]
+    half = len(days) // 2
+    if half:
+        delta = sum(valences[-half:]) / half - sum(valences[:half]) / half
+    else:
+        delta = 0.0
+    trend = "上升" if delta > TREND_THRESHOLD else "下降" if delta < -TREND_THRESHOLD else "平稳"
+
+    mean_valence = _valence(totals, event_count)
+    if max(valences) - min(valences) >= SWING_THRESHOLD:
+        mood = "波动较大"
+    elif mean_valence > TREND_THRESHOLD:
+        mood = "积极"
+    elif mean_valence < -TREND_THRESHOLD:
+        mood = "低落"
+    else:
+        mood = "平稳"
+
+    summary = WeeklySummary(
+        mostFrequentEmotion=max(totals, key=totals.get) if totals else "Calm",
+        emotionDistribution={emotion: round(count / counted, 2) for emotion, count in totals.items()},
+        emotionTrend=trend,
+        weeklyMood=mood,
+        avgDailyEvents=round(event_count / len(days)),
+    )
+    daily_data = [
+        DailySummaryData(
+            date=day["date"],
+            dominantEmotion=day["dominantEmotion"] or summary.mostFrequentEmotion,
+            eventCount=day["eventCount"],
+            avgHeartRate=day["avgHeartRate"],
+            totalSteps=0,  # 情绪事件不记录步数
+        )
+        for day in days
+    ]
+    return summary, daily_data
@@ -0,0 +1,116 @@
+"""
+情绪记录与乐谱的批量导出（NDJSON，配合 services.response.ndjson_response）
+
+- 每行 {"updatedAt": ..., "data": ...}，data 与 GET /emotions/days、GET /scores 中的单项相同
+- 服务端游标（yield_per）分批读取，存储的 JSON 文本以 RawJSON 原样输出，内存占用与导出条数无关
+- updated_since 用于增量拉取：客户端保存收到的最大 updatedAt，下次从该时间（含）开始导出；
+  已删除的记录不会出现在导出中
+
+生成器自己创建 Session：流式响应在路由函数返回之后才开始迭代，不依赖 get_db 的生命周期。
+导出期间占用一个数据库连接。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import Text, cast
+
+from config import SessionLocal, EXPORT_BATCH_SIZE
+from models.emotion import EmotionDay, EmotionEventRecord
+from models.score import ScoreRecord
+from services.response import RawJSON
+
+
+def iter_emotion_days(
+    user_id: Optional[int],
+    *,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+) -> Iterator[Dict[str, Any]]:
+    """按日期升序逐天导出（一次 join 查询，按天分组，每次只在内存中保留一天的事件）"""
+    db = SessionLocal()
+    try:
+        q = (
+            db.query(
+                EmotionDay.id,
+                EmotionDay.date,
+                EmotionDay.data,
+                EmotionDay.updated_at,
+                cast(EmotionEventRecord.data, Text),
+            )
+            .outerjoin(EmotionEventRecord, EmotionEventRecord.day_id == EmotionDay.id)
+            .filter(EmotionDay.user_id == user_id)
+        )
+        if date_from:
+            q = q.filter(EmotionDay.date >= date_from)
+        if date_to:
+            q = q.filter(EmotionDay.date <= date_to)
+        if updated_since is not None:
+            q = q.filter(EmotionDay.updated_at >= _since(updated_since))
+        q = q.order_by(EmotionDay.date, EmotionEventRecord.id).yield_per(EXPORT_BATCH_SIZE)
+
+        for _, rows in groupby(q, key=lambda row: row[0]):
+            _, date, data, updated_at, event = next(rows)
+            events = [RawJSON(event)] if event is not None else []
+            events.extend(RawJSON(row[4]) for row in rows)
+            yield {
+                "updatedAt": _isoformat(updated_at),
+                "data": {
+                    "date": date,
+                    "events": events,
+                    "finalPrompt": data.get("finalPrompt"),
+                    "musicGenerated": data.get("musicGenerated", False),
+                },
+            }
+    finally:
+        db.close()
+
+
+def iter_scores(
+    user_id: Optional[int],
+    *,
+    updated_since: Optional[datetime] = None,
+) -> Iterator[Dict[str, Any]]:
+    """按创建时间升序导出（走 (user_id, created_at) 索引）"""
+    db = SessionLocal()
+    try:
+        q = (
+            db.query(ScoreRecord.updated_at, cast(ScoreRecord.data, Text))
+            .filter(ScoreRecord.user_id == user_id)
+        )
+        if updated_since is not None:
+            q = q.filter(ScoreRecord.updated_at >= _since(updated_since))
+        q = q.order_by(ScoreRecord.created_at, ScoreRecord.id).yield_per(EXPORT_BATCH_SIZE)
+
+        for updated_at, data in q:
+            yield {"updatedAt": _isoformat(updated_at), "data": RawJSON(data)}
+    finally:
+        db.close()
+
+
+def _utc(value: datetime) -> datetime:
+    # 不带时区的参数按 UTC 处理（数据库中的 updated_at 为 UTC）
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _since(value: datetime) -> datetime:
+    """
+    增量导出的起点（含）
+
+    SQLite 的 CURRENT_TIMESTAMP 只精确到秒，并以不带小数的文本存储（'2025-10-20 08:00:00'），
+    而绑定参数带微秒（'2025-10-20 08:00:00.000000'），按文本比较时同一秒的记录会被漏掉：
+    先取整到秒，再减 1 微秒。重复导出的记录由客户端按 id / date 覆盖。
+    """
+    return _utc(value).replace(microsecond=0) - timedelta(microseconds=1)
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    return _utc(value).isoformat()
@@ -0,0 +1,115 @@
+"""
+多进程部署下的单实例选举
+gunicorn 多 worker（或多台机器）共用一个数据库时，部分后台任务只能在一处运行。
+LeaderLock 以非阻塞方式抢锁，抢到的进程即为 leader：
+- PostgreSQL：会话级 advisory lock，绑定在一条专用连接上；进程退出或连接断开时自动释放
+- 其他数据库（SQLite，只能单机部署）：对锁文件加 flock，进程退出时由操作系统释放
+"""
+
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+try:
+    import fcntl
+except ImportError:  # Windows：没有 flock，本地单进程调试时直接视为 leader
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """非阻塞的进程间互斥锁"""
+
+    def __init__(self, engine: Engine, lock_id: int, lock_file: str):
+        """
+        Args:
+            engine: 数据库引擎（PostgreSQL 时使用 advisory lock）
+            lock_id: advisory lock 的键
+            lock_file: 非 PostgreSQL 时使用的锁文件路径
+        """
+        self.engine = engine
+        self.lock_id = lock_id
+        self.lock_file = lock_file
+
+        self._conn: Optional[Connection] = None
+        self._file = None
+        self._held = False
+
+    @property
+    def held(self) -> bool:
+        return self._held
+
+    def try_acquire(self) -> bool:
+        """尝试获取锁（不等待）；已持有时直接返回 True"""
+        if self._held:
+            return True
+        if self.engine.dialect.name == "postgresql":
+            self._held = self._try_advisory_lock()
+        else:
+            self._held = self._try_file_lock()
+        return self._held
+
+    def check(self) -> bool:
+        """
+        确认仍持有锁
+
+        PostgreSQL 的锁随连接存在：连接断开（数据库重启、网络中断）后锁已被释放，
+        其他进程可能已经接手，此时放弃 leader 身份并返回 False。
+        """
+        if not self._held:
+            return False
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT 1"))
+            except Exception as e:
+                logger.warning(f"[Leader] ⚠️ 锁连接已断开: {str(e)}")
+                self.release()
+                return False
+        return True
+
+    def release(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": self.lock_id})
+            except Exception:
+                # 连接已断开时锁已随会话释放
+                pass
+            finally:
+                self._conn.close()
+                self._conn = None
+        if self._file is not None:
+            # 关闭文件即释放 flock
+            self._file.close()
+            self._file = None
+        self._held = False
+
+    def _try_advisory_lock(self) -> bool:
+        conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = conn.execute(
+                text("SELECT pg_try_advisory_lock(:id)"), {"id": self.lock_id}
+            ).scalar()
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        # 持有期间占用连接池中的一条连接
+        self._conn = conn
+        return True
+
+    def _try_file_lock(self) -> bool:
+        if fcntl is None:
+            return True
+        f = open(self.lock_file, "a")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
@@ -1,9 +1,13 @@
 """
 情绪到音乐风格映射服务
 将用户的情绪数据转换为 Suno API 的音乐生成参数
+
+所有映射表在模块加载时预先计算：情绪名称只查一次字典得到 Emotion，
+之后按下标读取元组；小时 → 时间段描述是 24 项的元组。
 """
 
-from typing import List, Dict, Tuple
+from enum import IntEnum
+from typing import List, Dict, Optional, Sequence, Tuple
 from schemas.music import (
     EmotionEventData,
     DailySummary,
@@ -12,102 +16,189 @@ from schemas.music import (
 )
 
 
+class Emotion(IntEnum):
+    """映射表支持的情绪（值即查表下标）"""
+    Joy = 0
+    Happy = 1
+    Sadness = 2
+    Sad = 3
+    Anger = 4
+    Angry = 5
+    Fear = 6
+    Anxious = 7
+    Calm = 8
+    Relaxed = 9
+    Excited = 10
+    Stressed = 11
+    Surprised = 12
+
+
+# 情绪 → 音乐风格映射表
+EMOTION_STYLE_MAP = {
+    "Joy": {
+        "style": "古典钢琴, 明亮弦乐",
+        "keywords": ["欢快", "轻盈", "跳跃"],
+        "tempo": "中快板",
+        "dynamics": "活泼明亮"
+    },
+    "Happy": {
+        "style": "流行钢琴, 轻快旋律",
+        "keywords": ["愉悦", "阳光", "欢乐"],
+        "tempo": "快板",
+        "dynamics": "开朗明快"
+    },
+    "Sadness": {
+        "style": "新古典, 大提琴, 弦乐",
+        "keywords": ["忧郁", "缓慢", "深沉"],
+        "tempo": "慢板",
+        "dynamics": "温柔深情"
+    },
+    "Sad": {
+        "style": "钢琴独奏, 小调和弦",
+        "keywords": ["悲伤", "低沉", "平静"],
+        "tempo": "柔板",
+        "dynamics": "轻柔低沉"
+    },
+    "Anger": {
+        "style": "摇滚, 打击乐, 电吉他",
+        "keywords": ["激烈", "强烈", "紧张"],
+        "tempo": "急板",
+        "dynamics": "强劲有力"
+    },
+    "Angry": {
+        "style": "重音乐, 激烈节奏",
+        "keywords": ["愤怒", "爆发", "冲突"],
+        "tempo": "极快板",
+        "dynamics": "强烈冲击"
+    },
+    "Fear": {
+        "style": "实验电子, 氛围音乐",
+        "keywords": ["紧张", "不安", "悬疑"],
+        "tempo": "中板",
+        "dynamics": "压抑紧张"
+    },
+    "Anxious": {
+        "style": "实验音乐, 断续节奏",
+        "keywords": ["焦虑", "不安", "波动"],
+        "tempo": "不规则",
+        "dynamics": "不稳定"
+    },
+    "Calm": {
+        "style": "环境音乐, 新世纪, 钢琴",
+        "keywords": ["平静", "舒缓", "安详"],
+        "tempo": "慢板",
+        "dynamics": "轻柔流畅"
+    },
+    "Relaxed": {
+        "style": "爵士, 轻音乐",
+        "keywords": ["放松", "惬意", "柔和"],
+        "tempo": "中慢板",
+        "dynamics": "轻松自在"
+    },
+    "Excited": {
+        "style": "电子舞曲, 流行",
+        "keywords": ["兴奋", "激动", "活力"],
+        "tempo": "快板",
+        "dynamics": "充满活力"
+    },
+    "Stressed": {
+        "style": "现代古典, 紧张弦乐",
+        "keywords": ["压力", "紧迫", "急促"],
+        "tempo": "急板",
+        "dynamics": "紧张压迫"
+    },
+    "Surprised": {
+        "style": "爵士, 变化节奏",
+        "keywords": ["惊讶", "突然", "变化"],
+        "tempo": "变化多端",
+        "dynamics": "跳跃起伏"
+    }
+}
+
+# 情绪 → 钢琴演奏风格（统一使用钢琴，符合五线谱概念）
+PIANO_STYLE_MAP = {
+    "Joy": "明亮欢快的古典钢琴",
+    "Happy": "轻快愉悦的钢琴",
+    "Sadness": "忧郁深沉的钢琴独奏",
+    "Sad": "缓慢悲伤的钢琴",
+    "Anger": "激烈强劲的钢琴",
+    "Angry": "愤怒有力的钢琴",
+    "Fear": "紧张不安的钢琴",
+    "Anxious": "焦虑波动的钢琴",
+    "Calm": "平静舒缓的钢琴",
+    "Relaxed": "放松柔和的钢琴",
+    "Excited": "兴奋活力的钢琴",
+    "Stressed": "压力紧迫的钢琴",
+    "Surprised": "惊讶跳跃的钢琴"
+}
+
+# 情绪 → 负面标签（排除不需要的风格）
+NEGATIVE_TAGS_MAP = {
+    "Joy": "悲伤, 沉重, 压抑",
+    "Happy": "忧郁, 低沉, 阴暗",
+    "Sadness": "欢快, 激烈, 喧闹",
+    "Sad": "轻快, 活泼, 跳跃",
+    "Anger": "温柔, 平静, 舒缓",
+    "Calm": "激烈, 急促, 喧闹",
+    "Anxious": "平静, 稳定, 舒缓",
+    "Excited": "沉闷, 缓慢, 低沉"
+}
+
+# 时间 → 描述映射
+TIME_DESCRIPTION_MAP = {
+    range(0, 6): "凌晨",
+    range(6, 9): "清晨",
+    range(9, 12): "上午",
+    range(12, 14): "中午",
+    range(14, 18): "下午",
+    range(18, 20): "傍晚",
+    range(20, 23): "晚上",
+    range(23, 24): "深夜"
+}
+
+UNKNOWN_TIME = "某个时刻"
+
+# 情绪效价（积极 1 / 中性 0 / 消极 -1），服务端汇总周情绪趋势时使用；未列出的情绪按 0 处理
+EMOTION_VALENCE = {
+    "Joy": 1, "Happy": 1, "Excited": 1, "Calm": 1, "Relaxed": 1,
+    "Surprised": 0,
+    "Sadness": -1, "Sad": -1, "Anger": -1, "Angry": -1, "Fear": -1, "Anxious": -1, "Stressed": -1,
+}
+
+# -------- 预计算的查找表 --------
+
+_EMOTIONS: Dict[str, Emotion] = {emotion.name: emotion for emotion in Emotion}
+
+# 按 Emotion 下标排列
+_STYLES: Tuple[str, ...] = tuple(EMOTION_STYLE_MAP[e.name]["style"] for e in Emotion)
+_KEYWORDS: Tuple[str, ...] = tuple(EMOTION_STYLE_MAP[e.name]["keywords"][0] for e in Emotion)
+_TEMPOS: Tuple[str, ...] = tuple(EMOTION_STYLE_MAP[e.name]["tempo"] for e in Emotion)
+_DYNAMICS: Tuple[str, ...] = tuple(EMOTION_STYLE_MAP[e.name]["dynamics"] for e in Emotion)
+_PIANO_STYLES: Tuple[str, ...] = tuple(PIANO_STYLE_MAP[e.name] for e in Emotion)
+_NEGATIVE_TAGS: Tuple[str, ...] = tuple(NEGATIVE_TAGS_MAP.get(e.name, "") for e in Emotion)
+
+# 按小时（0-23）排列
+_HOUR_DESCRIPTIONS: Tuple[str, ...] = tuple(
+    next((desc for hours, desc in TIME_DESCRIPTION_MAP.items() if hour in hours), UNKNOWN_TIME)
+    for hour in range(24)
+)
+
+
+def to_emotion(name: str) -> Optional[Emotion]:
+    """情绪名称 → Emotion；映射表中没有的情绪返回 None（使用各处的默认值）"""
+    return _EMOTIONS.get(name)
+
+
+def _lookup(table: Tuple[str, ...], name: str, default: str) -> str:
+    emotion = _EMOTIONS.get(name)
+    return default if emotion is None else table[emotion]
+
+
 class EmotionMusicMapper:
     """情绪音乐映射器"""
     
-    # 情绪 → 音乐风格映射表
-    EMOTION_STYLE_MAP = {
-        "Joy": {
-            "style": "古典钢琴, 明亮弦乐",
-            "keywords": ["欢快", "轻盈", "跳跃"],
-            "tempo": "中快板",
-            "dynamics": "活泼明亮"
-        },
-        "Happy": {
-            "style": "流行钢琴, 轻快旋律",
-            "keywords": ["愉悦", "阳光", "欢乐"],
-            "tempo": "快板",
-            "dynamics": "开朗明快"
-        },
-        "Sadness": {
-            "style": "新古典, 大提琴, 弦乐",
-            "keywords": ["忧郁", "缓慢", "深沉"],
-            "tempo": "慢板",
-            "dynamics": "温柔深情"
-        },
-        "Sad": {
-            "style": "钢琴独奏, 小调和弦",
-            "keywords": ["悲伤", "低沉", "平静"],
-            "tempo": "柔板",
-            "dynamics": "轻柔低沉"
-        },
-        "Anger": {
-            "style": "摇滚, 打击乐, 电吉他",
-            "keywords": ["激烈", "强烈", "紧张"],
-            "tempo": "急板",
-            "dynamics": "强劲有力"
-        },
-        "Angry": {
-            "style": "重音乐, 激烈节奏",
-            "keywords": ["愤怒", "爆发", "冲突"],
-            "tempo": "极快板",
-            "dynamics": "强烈冲击"
-        },
-        "Fear": {
-            "style": "实验电子, 氛围音乐",
-            "keywords": ["紧张", "不安", "悬疑"],
-            "tempo": "中板",
-            "dynamics": "压抑紧张"
-        },
-        "Anxious": {
-            "style": "实验音乐, 断续节奏",
-            "keywords": ["焦虑", "不安", "波动"],
-            "tempo": "不规则",
-            "dynamics": "不稳定"
-        },
-        "Calm": {
-            "style": "环境音乐, 新世纪, 钢琴",
-            "keywords": ["平静", "舒缓", "安详"],
-            "tempo": "慢板",
-            "dynamics": "轻柔流畅"
-        },
-        "Relaxed": {
-            "style": "爵士, 轻音乐",
-            "keywords": ["放松", "惬意", "柔和"],
-            "tempo": "中慢板",
-            "dynamics": "轻松自在"
-        },
-        "Excited": {
-            "style": "电子舞曲, 流行",
-            "keywords": ["兴奋", "激动", "活力"],
-            "tempo": "快板",
-            "dynamics": "充满活力"
-        },
-        "Stressed": {
-            "style": "现代古典, 紧张弦乐",
-            "keywords": ["压力", "紧迫", "急促"],
-            "tempo": "急板",
-            "dynamics": "紧张压迫"
-        },
-        "Surprised": {
-            "style": "爵士, 变化节奏",
-            "keywords": ["惊讶", "突然", "变化"],
-            "tempo": "变化多端",
-            "dynamics": "跳跃起伏"
-        }
-    }
-    
-    # 时间 → 描述映射
-    TIME_DESCRIPTION_MAP = {
-        range(0, 6): "凌晨",
-        range(6, 9): "清晨",
-        range(9, 12): "上午",
-        range(12, 14): "中午",
-        range(14, 18): "下午",
-        range(18, 20): "傍晚",
-        range(20, 23): "晚上",
-        range(23, 24): "深夜"
-    }
+    EMOTION_STYLE_MAP = EMOTION_STYLE_MAP
+    TIME_DESCRIPTION_MAP = TIME_DESCRIPTION_MAP
     
     def map_emotions_to_suno_params(
         self,
@@ -156,6 +247,21 @@ class EmotionMusicMapper:
             negativeTags=negative_tags
         )
     
+    def map_many(
+        self,
+        days: Sequence[Tuple[List[EmotionEventData], DailySummary]]
+    ) -> List[SunoGenerationParams]:
+        """
+        批量映射多天（夜间回填、周汇总），逐天调用 map_emotions_to_suno_params
+        
+        Args:
+            days: (情绪事件列表, 每日汇总数据) 列表
+            
+        Returns:
+            List[SunoGenerationParams]: 与 days 一一对应
+        """
+        return [self.map_emotions_to_suno_params(emotions, summary) for emotions, summary in days]
+    
     def map_weekly_emotions_to_suno(
         self,
         weekly_summary: WeeklySummary,
@@ -176,10 +282,7 @@ class EmotionMusicMapper:
         
         # 2. 选择主导风格
         dominant_emotion = weekly_summary.mostFrequentEmotion
-        style = self.EMOTION_STYLE_MAP.get(
-            dominant_emotion,
-            {"style": "古典钢琴"}
-        )["style"]
+        style = _lookup(_STYLES, dominant_emotion, "古典钢琴")
         
         # 3. 生成标题
         title = f"这一周的旋律"
@@ -206,14 +309,7 @@ class EmotionMusicMapper:
         Returns:
             List[Tuple[emotion, intensity, time]]
         """
-        sequence = []
-        for emotion_data in emotions:
-            sequence.append((
-                emotion_data.emotion,
-                emotion_data.intensity,
-                emotion_data.time
-            ))
-        return sequence
+        return [(e.emotion, e.intensity, e.time) for e in emotions]
     
     def _build_daily_prompt(
         self,
@@ -236,8 +332,7 @@ class EmotionMusicMapper:
         
         for i, (emotion, intensity, time) in enumerate(sequence):
             time_desc = self._time_to_description(time)
-            emotion_info = self.EMOTION_STYLE_MAP.get(emotion, {})
-            emotion_keyword = emotion_info.get("keywords", ["平静"])[0]
+            emotion_keyword = _lookup(_KEYWORDS, emotion, "平静")
             
             intensity_desc = self._intensity_to_description(intensity)
             
@@ -281,8 +376,7 @@ class EmotionMusicMapper:
         dominant = weekly_summary.mostFrequentEmotion
         mood = weekly_summary.weeklyMood
         
-        emotion_info = self.EMOTION_STYLE_MAP.get(dominant, {})
-        keyword = emotion_info.get("keywords", ["平静"])[0]
+        keyword = _lookup(_KEYWORDS, dominant, "平静")
         
         prompt = (
             f"一首描绘一周生活的纯音乐，"
@@ -299,13 +393,10 @@ class EmotionMusicMapper:
     def _time_to_description(self, time_str: str) -> str:
         """将时间转换为描述（如 '09:30' → '上午'）"""
         try:
-            hour = int(time_str.split(":")[0])
-            for time_range, description in self.TIME_DESCRIPTION_MAP.items():
-                if hour in time_range:
-                    return description
-            return "某个时刻"
-        except:
-            return "某个时刻"
+            hour = int(time_str.split(":", 1)[0])
+        except (AttributeError, TypeError, ValueError):
+            return UNKNOWN_TIME
+        return _HOUR_DESCRIPTIONS[hour] if 0 <= hour < 24 else UNKNOWN_TIME
     
     def _intensity_to_description(self, intensity: float) -> str:
         """将强度转换为描述"""
@@ -329,25 +420,8 @@ class EmotionMusicMapper:
         ⚠️ 统一使用钢琴风格（符合五线谱概念）
         只根据情绪调整钢琴的演奏方式（明亮/忧郁/激烈等）
         """
-        # 统一使用钢琴，根据情绪选择演奏风格
-        piano_style_map = {
-            "Joy": "明亮欢快的古典钢琴",
-            "Happy": "轻快愉悦的钢琴",
-            "Sadness": "忧郁深沉的钢琴独奏",
-            "Sad": "缓慢悲伤的钢琴",
-            "Anger": "激烈强劲的钢琴",
-            "Angry": "愤怒有力的钢琴",
-            "Fear": "紧张不安的钢琴",
-            "Anxious": "焦虑波动的钢琴",
-            "Calm": "平静舒缓的钢琴",
-            "Relaxed": "放松柔和的钢琴",
-            "Excited": "兴奋活力的钢琴",
-            "Stressed": "压力紧迫的钢琴",
-            "Surprised": "惊讶跳跃的钢琴"
-        }
-        
-        # 统一返回钢琴风格
-        return piano_style_map.get(dominant_emotion, "古典钢琴")
+        # 统一使用钢琴，根据情绪选择演奏风格（PIANO_STYLE_MAP）
+        return _lookup(_PIANO_STYLES, dominant_emotion, "古典钢琴")
     
     def _generate_musical_transition(
         self,
@@ -360,14 +434,11 @@ class EmotionMusicMapper:
         first_emotion = sequence[0][0]
         last_emotion = sequence[-1][0]
         
-        first_info = self.EMOTION_STYLE_MAP.get(first_emotion, {})
-        last_info = self.EMOTION_STYLE_MAP.get(last_emotion, {})
-        
-        first_tempo = first_info.get("tempo", "中板")
-        last_tempo = last_info.get("tempo", "中板")
+        first_tempo = _lookup(_TEMPOS, first_emotion, "中板")
+        last_tempo = _lookup(_TEMPOS, last_emotion, "中板")
         
-        first_dynamics = first_info.get("dynamics", "平稳")
-        last_dynamics = last_info.get("dynamics", "平稳")
+        first_dynamics = _lookup(_DYNAMICS, first_emotion, "平稳")
+        last_dynamics = _lookup(_DYNAMICS, last_emotion, "平稳")
         
         transition = (
             f"音乐从{first_tempo}的节奏逐渐过渡到{last_tempo}，"
@@ -425,8 +496,7 @@ class EmotionMusicMapper:
         date = "今天"  # 可以从外部传入日期
         dominant = summary.dominantEmotion
         
-        emotion_info = self.EMOTION_STYLE_MAP.get(dominant, {})
-        keyword = emotion_info.get("keywords", ["情绪"])[0]
+        keyword = _lookup(_KEYWORDS, dominant, "情绪")
         
         return f"{date}的{keyword}旋律"
     
@@ -436,18 +506,7 @@ class EmotionMusicMapper:
         
         例如：如果主导情绪是平静，就排除激烈、重金属等
         """
-        negative_map = {
-            "Joy": "悲伤, 沉重, 压抑",
-            "Happy": "忧郁, 低沉, 阴暗",
-            "Sadness": "欢快, 激烈, 喧闹",
-            "Sad": "轻快, 活泼, 跳跃",
-            "Anger": "温柔, 平静, 舒缓",
-            "Calm": "激烈, 急促, 喧闹",
-            "Anxious": "平静, 稳定, 舒缓",
-            "Excited": "沉闷, 缓慢, 低沉"
-        }
-        
-        return negative_map.get(dominant_emotion, "")
+        return _lookup(_NEGATIVE_TAGS, dominant_emotion, "")
 
 
 # 单例模式
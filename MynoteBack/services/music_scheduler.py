@@ -0,0 +1,291 @@
+"""
+音乐任务调度器
+全部部署中唯一的轮询调度器，替代每个任务一个 BackgroundTasks 协程的做法：
+- 多 worker / 多实例时由 LeaderLock 选出一个进程运行调度器，其余进程只把任务写入数据库
+- 任务状态以数据库为准，leader 定期扫描 music_tasks 中未完成的任务（含其他进程创建的任务）
+- 最小堆按下次轮询时间排序，只有到期的任务才会被取出
+- 同一时刻到期的任务合并为一次批量 sweep（有界并发查询 + 一条批量 UPDATE）
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import (
+    engine,
+    SUNO_REFRESH_BATCH_SIZE,
+    MUSIC_POLL_INITIAL_INTERVAL,
+    MUSIC_POLL_MAX_INTERVAL,
+    MUSIC_TASK_TIMEOUT_SECONDS,
+    MUSIC_SCHEDULER_LOCK_FILE,
+)
+from services.db_executor import run_db
+from services.leader import LeaderLock
+from services.music_task_service import (
+    TERMINAL_STATUSES,
+    list_task_states,
+    mark_timeouted,
+)
+from services.suno_client import SunoBatchRefresher, batch_refresher
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL advisory lock 的键（与 services.schema 的迁移锁区分）
+_SCHEDULER_LOCK_ID = 3852025
+
+
+class MusicTaskScheduler:
+    """基于最小堆的音乐任务轮询调度器"""
+
+    def __init__(
+        self,
+        refresher: SunoBatchRefresher,
+        batch_size: int = 200,
+        initial_interval: float = 5,
+        max_interval: float = 20,
+        timeout_seconds: float = 300
+    ):
+        """
+        Args:
+            refresher: 批量状态刷新引擎（决定单次 sweep 的并发上限）
+            batch_size: 单次 sweep 最多处理的任务数
+            initial_interval: 首次轮询间隔（秒）
+            max_interval: 最大轮询间隔（秒），间隔每次递增 5 秒
+            timeout_seconds: 任务从创建起的最长等待时间（秒）
+        """
+        self.refresher = refresher
+        self.batch_size = batch_size
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.timeout_seconds = timeout_seconds
+
+        # 堆元素：(下次轮询时间, 序号, task_id, 已轮询次数)
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._seq = itertools.count()
+        self._scheduled: Set[str] = set()
+        self._in_flight: Set[str] = set()
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._discoverer: Optional[asyncio.Task] = None
+        # 正在参与选举（不论是否为 leader）
+        self._electing = False
+
+        # 统计
+        self._errors = 0
+        self._finished: Dict[str, int] = {status: 0 for status in TERMINAL_STATUSES}
+
+    @property
+    def running(self) -> bool:
+        """本进程是 leader，调度器正在运行"""
+        return self._dispatcher is not None and not self._dispatcher.done()
+
+    @property
+    def enabled(self) -> bool:
+        """部署中有调度器负责轮询（leader 可能是其他进程）"""
+        return self._electing or self.running
+
+    # ---------- 生命周期 ----------
+
+    async def run_elected(self, lock: LeaderLock, retry_interval: float) -> None:
+        """
+        参与 leader 选举，直到被取消
+
+        抢到锁后启动调度器（从数据库恢复未完成的任务），每 retry_interval 秒确认一次仍持有锁；
+        没抢到时每 retry_interval 秒重试，leader 退出（worker 重启）后由其他进程接手。
+        """
+        loop = asyncio.get_running_loop()
+        self._electing = True
+        try:
+            while True:
+                try:
+                    if await loop.run_in_executor(None, lock.try_acquire):
+                        await self.start()
+                        while await loop.run_in_executor(None, lock.check):
+                            await asyncio.sleep(retry_interval)
+                        logger.warning("[MusicScheduler] ⚠️ 已失去 leader 锁，停止调度")
+                        await self.stop()
+                except Exception as e:
+                    logger.error(f"[MusicScheduler] ❌ leader 选举失败: {str(e)}")
+                await asyncio.sleep(retry_interval)
+        finally:
+            self._electing = False
+            await self.stop()
+            lock.release()
+
+    async def start(self) -> None:
+        """启动调度器，并从数据库恢复未完成的任务"""
+        if self.running:
+            return
+
+        self._wakeup = asyncio.Event()
+
+        count = await self._discover()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        self._discoverer = asyncio.create_task(self._discover_loop())
+        logger.info(f"[MusicScheduler] 🚀 调度器已启动，恢复任务数={count}")
+
+    async def stop(self) -> None:
+        """停止调度器；未完成的任务保留在数据库中，由下一个 leader 恢复"""
+        tasks = [task for task in (self._dispatcher, self._discoverer) if task is not None]
+        if not tasks:
+            return
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self._dispatcher = None
+        self._discoverer = None
+        self._heap.clear()
+        self._scheduled.clear()
+        self._in_flight.clear()
+        logger.info("[MusicScheduler] 🛑 调度器已停止")
+
+    # ---------- 调度 ----------
+
+    def schedule(self, task_id: str) -> None:
+        """
+        新任务立即入堆（首次轮询间隔后轮询）
+
+        本进程不是 leader 时什么都不做：任务已写入数据库，由 leader 在下次扫描时接手。
+        """
+        if self.running:
+            self._push(task_id)
+
+    def _push(self, task_id: str, delay: Optional[float] = None, attempt: int = 0) -> None:
+        """把任务放入堆中，delay 秒后轮询（默认使用首次轮询间隔）"""
+        if task_id in self._scheduled or task_id in self._in_flight:
+            return
+        if delay is None:
+            delay = self.initial_interval
+
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), task_id, attempt))
+        self._scheduled.add(task_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _next_interval(self, attempt: int) -> float:
+        # 与 SunoClient.poll_until_complete 相同的退避：每次 +5 秒，封顶 max_interval
+        return min(self.initial_interval + 5 * attempt, self.max_interval)
+
+    async def _discover(self) -> int:
+        """把数据库中未完成、且不在堆中的任务（其他进程创建的）放入堆中立即轮询"""
+        count = 0
+        for _, task_id, _, _ in await run_db(list_task_states):
+            if task_id not in self._scheduled and task_id not in self._in_flight:
+                self._push(task_id, delay=0)
+                count += 1
+        return count
+
+    async def _discover_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.initial_interval)
+            try:
+                await self._discover()
+            except Exception as e:
+                logger.error(f"[MusicScheduler] ❌ 扫描未完成任务失败: {str(e)}")
+
+    def _pop_due(self) -> List[Tuple[str, int]]:
+        now = time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            _, _, task_id, attempt = heapq.heappop(self._heap)
+            self._scheduled.discard(task_id)
+            due.append((task_id, attempt))
+        return due
+
+    async def _dispatch_loop(self) -> None:
+        """等待堆顶任务到期，把所有到期任务合并为一次 sweep"""
+        while True:
+            self._wakeup.clear()
+
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            wait = self._heap[0][0] - time.monotonic()
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = self._pop_due()
+            self._in_flight.update(task_id for task_id, _ in due)
+            try:
+                await self._sweep(due)
+            except Exception as e:
+                self._errors += 1
+                logger.error(f"[MusicScheduler] ❌ sweep 异常: {str(e)}", exc_info=True)
+                self._in_flight.clear()
+                for task_id, attempt in due:
+                    self._push(task_id, delay=self._next_interval(attempt), attempt=attempt + 1)
+            finally:
+                self._in_flight.clear()
+
+    async def _sweep(self, due: List[Tuple[str, int]]) -> None:
+        """刷新一批到期任务；未完成的重新入堆，超时的批量标记"""
+        states = await self.refresher.sweep([task_id for task_id, _ in due])
+
+        expired = []
+        for task_id, attempt in due:
+            state = states.get(task_id)
+            if state is None:
+                logger.warning(f"[MusicScheduler] ⚠️ 任务不存在，停止轮询: {task_id}")
+                continue
+
+            if state["status"] in TERMINAL_STATUSES:
+                self._finished[state["status"]] += 1
+                logger.info(f"[MusicScheduler] ✅ 任务结束: {task_id}，状态: {state['status']}")
+                continue
+
+            if self._is_expired(state["createdAt"]):
+                expired.append(task_id)
+                continue
+
+            self._in_flight.discard(task_id)
+            self._push(task_id, delay=self._next_interval(attempt), attempt=attempt + 1)
+
+        if expired:
+            count = await run_db(mark_timeouted, expired)
+            self._finished["timeouted"] += count
+            logger.error(f"[MusicScheduler] ⏰ 轮询超时: {', '.join(expired)}")
+
+    def _is_expired(self, created_at: Optional[datetime]) -> bool:
+        if created_at is None:
+            return False
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        age = (datetime.now(timezone.utc) - created_at).total_seconds()
+        return age > self.timeout_seconds
+
+    # ---------- 统计 ----------
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "scheduled": len(self._heap),
+            "inFlight": len(self._in_flight),
+            "errors": self._errors,
+            "finished": dict(self._finished),
+            "refresher": self.refresher.stats()
+        }
+
+
+# 单例
+music_scheduler = MusicTaskScheduler(
+    refresher=batch_refresher,
+    batch_size=SUNO_REFRESH_BATCH_SIZE,
+    initial_interval=MUSIC_POLL_INITIAL_INTERVAL,
+    max_interval=MUSIC_POLL_MAX_INTERVAL,
+    timeout_seconds=MUSIC_TASK_TIMEOUT_SECONDS
+)
+
+# 调度器 leader 选举锁
+scheduler_lock = LeaderLock(engine, _SCHEDULER_LOCK_ID, MUSIC_SCHEDULER_LOCK_FILE)
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, or_, update
+from sqlalchemy.orm import Session
+
+from models.music_task import MusicTask
+from schemas.music import SunoGenerationParams
+
+
+# 终态：不再需要轮询
+TERMINAL_STATUSES = ("succeeded", "failed", "timeouted")
+# 进行中：需要继续向 Suno 查询
+ACTIVE_STATUSES = ("queued", "running", "reviewing", "streaming")
+
+
+def get_task(db: Session, task_id: str) -> Optional[MusicTask]:
+    return db.query(MusicTask).filter(MusicTask.task_id == task_id).first()
+
+
+def get_user_task(db: Session, user_id: Optional[int], task_id: str) -> Optional[MusicTask]:
+    """只返回属于该用户的任务（回调和调度器使用不区分用户的 get_task）"""
+    return (
+        db.query(MusicTask)
+        .filter(MusicTask.task_id == task_id, MusicTask.user_id == user_id)
+        .first()
+    )
+
+
+def create_task(
+    db: Session,
+    *,
+    task_id: str,
+    user_id: Optional[int],
+    date: str,
+    task_type: str,
+    suno_params: Dict,
+    params_hash: Optional[str] = None
+) -> MusicTask:
+    music_task = MusicTask(
+        task_id=task_id,
+        user_id=user_id,
+        date=date,
+        task_type=task_type,
+        status="queued",
+        suno_params=suno_params,
+        params_hash=params_hash
+    )
+    db.add(music_task)
+    db.commit()
+    db.refresh(music_task)
+    return music_task
+
+
+def apply_callback(
+    db: Session,
+    task_id: str,
+    *,
+    stage: str,
+    audio_url: Optional[str],
+    duration: Optional[int]
+) -> Optional[str]:
+    """
+    处理 Suno 回调
+
+    Returns:
+        更新后的任务状态；任务不存在时返回 None
+    """
+    music_task = get_task(db, task_id)
+    if not music_task:
+        return None
+
+    if stage == "complete":
+        music_task.status = "succeeded"
+        music_task.music_url = audio_url
+        music_task.duration = duration
+        music_task.finished_at = datetime.utcnow()
+    elif stage == "failed":
+        music_task.status = "failed"
+        music_task.finished_at = datetime.utcnow()
+
+    status = music_task.status
+    db.commit()
+    return status
+
+
+def compute_params_hash(params: SunoGenerationParams) -> str:
+    """
+    Suno 参数的内容哈希（SHA-256）
+
+    只取影响生成结果的字段，按 key 排序后序列化，保证同样的参数得到同样的哈希。
+    """
+    canonical = {
+        "prompt": params.prompt,
+        "style": params.style,
+        "title": params.title,
+        "customMode": params.customMode,
+        "instrumental": params.instrumental,
+        "model": params.model,
+        "styleWeight": params.styleWeight,
+        "weirdnessConstraint": params.weirdnessConstraint,
+        "negativeTags": params.negativeTags or None,
+    }
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def find_reusable_task(
+    db: Session, params_hash: str, *, user_id: Optional[int], max_age_seconds: float
+) -> Optional[MusicTask]:
+    """
+    查找可复用的任务：同一用户、同一参数哈希、已成功或仍在进行中、且在新鲜期内
+
+    失败/超时的任务不会被复用；max_age_seconds <= 0 时关闭缓存。
+    """
+    if max_age_seconds <= 0:
+        return None
+    since = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    return (
+        db.query(MusicTask)
+        .filter(MusicTask.params_hash == params_hash)
+        .filter(MusicTask.user_id == user_id)
+        .filter(MusicTask.created_at >= since)
+        .filter(MusicTask.status.in_(("succeeded",) + ACTIVE_STATUSES))
+        .order_by(MusicTask.created_at.desc())
+        .first()
+    )
+
+
+def list_task_states(
+    db: Session, task_ids: Optional[Sequence[str]] = None
+) -> List[Tuple[int, str, str, Optional[datetime]]]:
+    """
+    批量读取任务状态（一条查询）
+
+    Args:
+        task_ids: 指定任务；为 None 时取所有未完成任务
+
+    Returns:
+        [(id, task_id, status, created_at), ...]
+    """
+    q = db.query(MusicTask.id, MusicTask.task_id, MusicTask.status, MusicTask.created_at)
+    if task_ids is None:
+        q = q.filter(MusicTask.status.in_(ACTIVE_STATUSES))
+    else:
+        q = q.filter(MusicTask.task_id.in_(list(task_ids)))
+    return [tuple(row) for row in q.all()]
+
+
+def bulk_apply_suno_results(db: Session, results: Dict[int, Dict]) -> int:
+    """
+    用一条批量 UPDATE 回写多条 SunoClient.query_task 结果
+
+    Args:
+        results: {MusicTask.id: query_task 返回值}
+
+    Returns:
+        实际更新的行数（已被回调写成终态的行不会被覆盖）
+    """
+    if not results:
+        return 0
+
+    now = datetime.utcnow()
+    params = [
+        {
+            "_id": pk,
+            "_status": result["status"],
+            "_music_url": result.get("musicUrl"),
+            "_duration": result.get("duration"),
+            "_finished_at": now if result["status"] in TERMINAL_STATUSES else None,
+        }
+        for pk, result in results.items()
+    ]
+    table = MusicTask.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("_id"))
+        # executemany 不支持 IN 展开，逐个比较
+        .where(or_(*(table.c.status == status for status in ACTIVE_STATUSES)))
+        .values(
+            status=bindparam("_status"),
+            music_url=bindparam("_music_url"),
+            duration=bindparam("_duration"),
+            finished_at=bindparam("_finished_at"),
+        )
+    )
+    updated = db.execute(stmt, params).rowcount
+    db.commit()
+    return updated
+
+
+def mark_timeouted(db: Session, task_ids: Sequence[str]) -> int:
+    """把仍未完成的任务批量标记为超时"""
+    if not task_ids:
+        return 0
+    updated = (
+        db.query(MusicTask)
+        .filter(MusicTask.task_id.in_(list(task_ids)))
+        .filter(MusicTask.status.in_(ACTIVE_STATUSES))
+        .update(
+            {MusicTask.status: "timeouted", MusicTask.finished_at: datetime.utcnow()},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return updated
+
+
+def task_to_dict(music_task: MusicTask) -> Dict:
+    """/music/query 的响应结构"""
+    return {
+        "taskId": music_task.task_id,
+        "status": music_task.status,
+        "musicUrl": music_task.music_url,
+        "duration": music_task.duration,
+        "createdAt": music_task.created_at.isoformat() if music_task.created_at else None,
+        "finishedAt": music_task.finished_at.isoformat() if music_task.finished_at else None
+    }
@@ -0,0 +1,97 @@
+"""
+密码哈希进程池
+bcrypt 每次计算约 200ms CPU，在 Web 线程中执行会拖慢其他请求，
+统一通过 hash_password / check_password 放到独立的有界进程池中执行。
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """排队中的哈希任务超过上限，调用方应直接拒绝请求"""
+
+
+_workers = 0
+_max_pending = 0
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+_rejected = 0
+
+
+def configure(workers: int, max_pending: int) -> None:
+    """
+    (重新)配置密码哈希进程池；进程在第一次使用时才创建
+
+    Args:
+        workers: 进程数；0 表示在当前进程的默认线程池中计算（改造前的行为，仅用于调试和基准对比）
+        max_pending: 同时排队 + 执行中的任务上限，超过时抛出 PasswordHasherBusy
+    """
+    global _workers, _max_pending
+    shutdown()
+    _workers = workers
+    _max_pending = max_pending
+    logger.info(f"[PasswordHasher] 密码哈希进程池 workers={workers} max_pending={max_pending}")
+
+
+def shutdown() -> None:
+    """等待进行中的哈希任务完成后关闭进程池"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    # 延迟创建：多进程部署时每个 worker 进程各自创建自己的进程池
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=_workers)
+    return _executor
+
+
+def _call(name: str, *args: Any) -> Any:
+    # 在执行哈希的进程中才导入 passlib / bcrypt，Web 进程启动时不加载
+    from services import security
+
+    return getattr(security, name)(*args)
+
+
+async def _run(fn: Callable[..., Any], *args: Any) -> Any:
+    global _pending, _rejected
+    if _pending >= _max_pending:
+        _rejected += 1
+        raise PasswordHasherBusy(f"password hasher queue full ({_pending})")
+
+    _pending += 1
+    try:
+        executor = _get_executor() if _workers > 0 else None
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_call, "get_password_hash", password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run(_call, "verify_password", plain_password, hashed_password)
+
+
+def stats() -> Dict:
+    return {
+        "workers": _workers,
+        "maxPending": _max_pending,
+        "pending": _pending,
+        "rejected": _rejected
+    }
+
+
+configure(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
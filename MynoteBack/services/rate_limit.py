@@ -0,0 +1,92 @@
+"""
+登录限流
+按登录标识（邮箱 / 手机号）计数，窗口期内超过次数直接拒绝，
+暴力破解流量不会进入密码校验，也就不会占用哈希进程池。
+计数保存在数据库（login_attempts）中，多 worker / 多实例共享同一个窗口，worker 重启不会清零。
+"""
+
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import case, delete
+from sqlalchemy.orm import Session
+
+from models.user import LoginAttempt
+
+
+class LoginThrottle:
+    """固定窗口计数：窗口从第一次尝试开始计算"""
+
+    def __init__(self, max_attempts: int, window: float):
+        """
+        Args:
+            max_attempts: 窗口期内允许的尝试次数
+            window: 窗口长度（秒）
+        """
+        self.max_attempts = max_attempts
+        self.window = window
+        self._last_purge = 0.0
+        self._rejected = 0
+
+    def acquire(self, db: Session, key: str) -> Optional[int]:
+        """
+        记录一次尝试（一条 upsert 语句、一次提交）
+
+        Returns:
+            本次是窗口内的第几次尝试；超过次数时返回 None
+        """
+        key = _hash_key(key)
+        now = datetime.now(timezone.utc)
+        self._purge_expired(db, now)
+
+        # 窗口已结束时重新从 1 开始计数，否则在原窗口内自增
+        expired = LoginAttempt.window_end <= now
+        stmt = _insert(db)(LoginAttempt).values(key=key, count=1, window_end=now + timedelta(seconds=self.window))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LoginAttempt.key],
+            set_={
+                "count": case((expired, 1), else_=LoginAttempt.count + 1),
+                "window_end": case((expired, stmt.excluded.window_end), else_=LoginAttempt.window_end),
+            },
+        ).returning(LoginAttempt.count)
+        count = db.execute(stmt).scalar_one()
+        db.commit()
+
+        if count > self.max_attempts:
+            self._rejected += 1
+            return None
+        return count
+
+    def reset(self, db: Session, key: str) -> None:
+        db.execute(delete(LoginAttempt).where(LoginAttempt.key == _hash_key(key)))
+        db.commit()
+
+    def _purge_expired(self, db: Session, now: datetime) -> None:
+        # 每个窗口最多清理一次窗口已结束的记录，与本次计数在同一事务中提交
+        if time.monotonic() - self._last_purge < self.window:
+            return
+        self._last_purge = time.monotonic()
+        db.execute(delete(LoginAttempt).where(LoginAttempt.window_end <= now))
+
+    def stats(self) -> Dict:
+        return {
+            "maxAttempts": self.max_attempts,
+            "window": self.window,
+            "rejected": self._rejected
+        }
+
+
+def _insert(db: Session):
+    """支持 ON CONFLICT 的 insert（PostgreSQL / SQLite 3.35+）"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def _hash_key(key: str) -> str:
+    # 登录标识由客户端提交，长度不定：只保存固定长度的摘要
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
@@ -1,4 +1,13 @@
-from typing import Any, Optional
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时回退标准库
+    orjson = None
 
 
 def success(data: Any = None, message: str = "ok", code: int = 0):
@@ -7,3 +16,100 @@ def success(data: Any = None, message: str = "ok", code: int = 0):
 
 def error(message: str = "error", code: int = 1, data: Optional[Any] = None):
     return {"code": code, "message": message, "data": data}
+
+
+# -------- 快速响应：直接输出数据库中已校验过的 JSON --------
+
+class RawJSON(str):
+    """已经是合法 JSON 的文本（写入时已通过 Pydantic 校验的存储数据），编码时原样拼接"""
+
+
+def _dumps(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _encode(value: Any) -> str:
+    if isinstance(value, RawJSON):
+        return value
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{_dumps(str(k))}:{_encode(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_encode(v) for v in value) + "]"
+    return _dumps(value)
+
+
+def encode_success(data: Any = None, message: str = "ok", code: int = 0) -> bytes:
+    """
+    与 success 相同的响应结构，直接编码为 JSON 字节：
+    data 中的 RawJSON 原样写入，其余部分只能是 JSON 基本类型
+    """
+    return _encode(success(data=data, message=message, code=code)).encode("utf-8")
+
+
+def raw_success(data: Any = None, message: str = "ok", code: int = 0) -> Response:
+    """跳过 jsonable_encoder 的 success 响应"""
+    return Response(content=encode_success(data, message, code), media_type="application/json")
+
+
+# -------- 流式 NDJSON（批量导出） --------
+
+# 攒够该字节数再交给 StreamingResponse，减少同步迭代器在线程池中的往返次数
+NDJSON_CHUNK_BYTES = 64 * 1024
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Accept-Encoding 中包含 gzip 且 q 不为 0"""
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            q = params.strip()
+            if not q.startswith("q="):
+                return True
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+    return False
+
+
+def _ndjson_chunks(records: Iterable[Any], gzip_level: Optional[int]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31) if gzip_level is not None else None
+    buffer = []
+    size = 0
+    for record in records:
+        line = (_encode(record) + "\n").encode("utf-8")
+        buffer.append(line)
+        size += len(line)
+        if size >= NDJSON_CHUNK_BYTES:
+            chunk = b"".join(buffer)
+            buffer, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b"".join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def ndjson_response(
+    records: Iterable[Any], *, filename: str, gzip_level: Optional[int] = None
+) -> StreamingResponse:
+    """
+    逐条输出 NDJSON（每行一个 JSON，编码规则同 encode_success），内存占用与记录总数无关
+
+    records 可以是同步生成器（在线程池中迭代）；gzip_level 不为 None 时以 gzip 流式压缩。
+    """
+    headers: Dict[str, str] = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Cache-Control": "no-store",
+        "Vary": "Accept-Encoding",
+    }
+    if gzip_level is not None:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        _ndjson_chunks(records, gzip_level), media_type="application/x-ndjson", headers=headers
+    )
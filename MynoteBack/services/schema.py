@@ -0,0 +1,116 @@
+"""
+数据库结构版本
+表结构只由 Alembic 迁移维护（alembic upgrade head），应用进程启动时不再 create_all：
+- check_schema：一条 SELECT 读取 alembic_version 与迁移脚本的 head 比较，不反射任何表
+- upgrade_to_head：在启动 Web 进程之前执行一次（python main.py / start_server.sh / gunicorn 主进程），
+  PostgreSQL 上用 advisory lock 保证多个实例同时部署时只有一个在迁移
+
+alembic 导入约 150ms，只在真正需要迁移时才导入；Web 进程启动时的版本检查直接解析迁移脚本。
+"""
+
+import ast
+import functools
+import glob
+import logging
+import os
+from typing import FrozenSet, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_INI = os.path.join(_ROOT, "alembic.ini")
+VERSIONS_DIR = os.path.join(_ROOT, "migrations", "versions")
+
+# 任意固定值，同一数据库上的迁移互斥
+_MIGRATION_LOCK_ID = 3852024
+
+
+class SchemaOutOfDate(RuntimeError):
+    """数据库结构版本与代码中的迁移不一致"""
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    cfg = Config(ALEMBIC_INI)
+    # 在应用进程内执行时沿用应用的日志配置
+    cfg.attributes["configure_logger"] = False
+    return cfg
+
+
+def _revision_ids(path: str):
+    """读取迁移脚本模块级的 revision / down_revision 赋值（不执行脚本）"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    values = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            if node.targets[0].id in ("revision", "down_revision"):
+                values[node.targets[0].id] = ast.literal_eval(node.value)
+    down = values.get("down_revision")
+    if down is None:
+        down = ()
+    elif isinstance(down, str):
+        down = (down,)
+    return values.get("revision"), tuple(down)
+
+
+@functools.lru_cache(maxsize=None)
+def head_revisions() -> FrozenSet[str]:
+    """迁移脚本的 head：没有被任何脚本作为 down_revision 的版本（不连接数据库；进程内只解析一次）"""
+    revisions = set()
+    parents = set()
+    for path in glob.glob(os.path.join(VERSIONS_DIR, "*.py")):
+        revision, down = _revision_ids(path)
+        if revision:
+            revisions.add(revision)
+            parents.update(down)
+    return frozenset(revisions - parents)
+
+
+def current_revisions(engine: Engine) -> Set[str]:
+    """数据库当前的迁移版本；尚未迁移过的数据库返回空集合"""
+    try:
+        with engine.connect() as conn:
+            return {row[0] for row in conn.execute(text("SELECT version_num FROM alembic_version"))}
+    except DBAPIError:
+        # alembic_version 表不存在
+        return set()
+
+
+def check_schema(engine: Engine) -> None:
+    """
+    Raises:
+        SchemaOutOfDate: 数据库未迁移到最新版本（或比代码更新）
+    """
+    expected = head_revisions()
+    current = current_revisions(engine)
+    if current != expected:
+        raise SchemaOutOfDate(
+            f"数据库结构版本 {sorted(current) or '（未初始化）'} 与代码 {sorted(expected)} 不一致，"
+            f"请先在 MynoteBack 目录下执行 alembic upgrade head"
+        )
+
+
+def upgrade_to_head(engine: Engine) -> None:
+    """迁移到最新版本；已是最新版本时只有一次查询"""
+    if current_revisions(engine) == head_revisions():
+        return
+
+    from alembic import command
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": _MIGRATION_LOCK_ID})
+            try:
+                # 等锁期间其他实例可能已经完成迁移，alembic 从数据库当前版本继续，无需迁移时不做任何事
+                command.upgrade(_alembic_config(), "head")
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _MIGRATION_LOCK_ID})
+    else:
+        command.upgrade(_alembic_config(), "head")
+    logger.info(f"[Schema] ✅ 数据库已迁移到 {sorted(head_revisions())}")
@@ -2,34 +2,68 @@ from __future__ import annotations
 
 from typing import List, Optional, Tuple
 
+from sqlalchemy import Text, cast
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from models.score import ScoreRecord
 from schemas.score import Score
+from services.response import RawJSON
 
 
-def list_scores(db: Session) -> List[ScoreRecord]:
-    return db.query(ScoreRecord).order_by(ScoreRecord.created_at.desc()).all()
+def list_scores(db: Session, user_id: Optional[int]) -> List[ScoreRecord]:
+    return (
+        db.query(ScoreRecord)
+        .filter(ScoreRecord.user_id == user_id)
+        .order_by(ScoreRecord.created_at.desc())
+        .all()
+    )
 
 
-def get_score_by_uuid(db: Session, uuid: str) -> Optional[ScoreRecord]:
-    return db.query(ScoreRecord).filter(ScoreRecord.uuid == uuid).first()
+def list_scores_raw(db: Session, user_id: Optional[int]) -> List[RawJSON]:
+    """只取 data 列的 JSON 文本，不解码（配合 raw_success 输出）；走 (user_id, created_at) 索引"""
+    rows = (
+        db.query(cast(ScoreRecord.data, Text))
+        .filter(ScoreRecord.user_id == user_id)
+        .order_by(ScoreRecord.created_at.desc())
+        .all()
+    )
+    return [RawJSON(data) for data, in rows]
 
 
-def create_score(db: Session, score: Score) -> Tuple[Optional[ScoreRecord], Optional[str]]:
+def get_score_raw(db: Session, user_id: Optional[int], uuid: str) -> Optional[RawJSON]:
+    row = (
+        db.query(cast(ScoreRecord.data, Text))
+        .filter(ScoreRecord.uuid == uuid, ScoreRecord.user_id == user_id)
+        .first()
+    )
+    return RawJSON(row[0]) if row else None
+
+
+def get_score_by_uuid(db: Session, user_id: Optional[int], uuid: str) -> Optional[ScoreRecord]:
+    return db.query(ScoreRecord).filter(ScoreRecord.uuid == uuid, ScoreRecord.user_id == user_id).first()
+
+
+def create_score(db: Session, user_id: Optional[int], score: Score) -> Tuple[Optional[ScoreRecord], Optional[str]]:
     uuid = str(score.id)
-    exists = get_score_by_uuid(db, uuid)
+    # uuid 由客户端生成，只在当前用户内判断是否重复（不暴露其他用户是否有同一 uuid）
+    exists = db.query(ScoreRecord.id).filter(ScoreRecord.uuid == uuid, ScoreRecord.user_id == user_id).first()
     if exists:
         return None, "Score already exists"
-    rec = ScoreRecord(uuid=uuid, title=score.title, data=score.model_dump(mode='json'))
+    rec = ScoreRecord(user_id=user_id, uuid=uuid, title=score.title, data=score.model_dump(mode='json'))
     db.add(rec)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # 并发创建同一 uuid
+        db.rollback()
+        return None, "Score already exists"
     db.refresh(rec)
     return rec, None
 
 
-def update_score(db: Session, uuid: str, score: Score) -> Optional[ScoreRecord]:
-    rec = get_score_by_uuid(db, uuid)
+def update_score(db: Session, user_id: Optional[int], uuid: str, score: Score) -> Optional[ScoreRecord]:
+    rec = get_score_by_uuid(db, user_id, uuid)
     if not rec:
         return None
     rec.title = score.title
@@ -39,8 +73,8 @@ def update_score(db: Session, uuid: str, score: Score) -> Optional[ScoreRecord]:
     return rec
 
 
-def delete_score(db: Session, uuid: str) -> bool:
-    rec = get_score_by_uuid(db, uuid)
+def delete_score(db: Session, user_id: Optional[int], uuid: str) -> bool:
+    rec = get_score_by_uuid(db, user_id, uuid)
     if not rec:
         return False
     db.delete(rec)
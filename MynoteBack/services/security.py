@@ -1,6 +1,52 @@
+import logging
+from typing import List
+
 from passlib.context import CryptContext
+from passlib.registry import get_crypt_handler
+
+from config import (
+    PASSWORD_SCHEMES,
+    BCRYPT_ROUNDS,
+    ARGON2_TIME_COST,
+    ARGON2_MEMORY_COST,
+    ARGON2_PARALLELISM,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _available_schemes(schemes: List[str]) -> List[str]:
+    """argon2 依赖 argon2-cffi，未安装时跳过该算法"""
+    available = []
+    for scheme in schemes:
+        handler = get_crypt_handler(scheme)
+        if hasattr(handler, "has_backend") and not handler.has_backend():
+            logger.warning(f"[Security] ⚠️ 密码算法 {scheme} 缺少依赖，已跳过")
+            continue
+        available.append(scheme)
+    return available or ["bcrypt"]
 
-_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def build_context(schemes: List[str]) -> CryptContext:
+    """
+    第一个算法用于新密码；其余算法标记为 deprecated，
+    成本参数低于当前配置的哈希同样会被 needs_update 判定为需要升级
+    """
+    schemes = _available_schemes(schemes)
+    return CryptContext(
+        schemes=schemes,
+        default=schemes[0],
+        deprecated=schemes[1:],
+        bcrypt__default_rounds=BCRYPT_ROUNDS,
+        bcrypt__min_rounds=BCRYPT_ROUNDS,
+        argon2__type="ID",
+        argon2__time_cost=ARGON2_TIME_COST,
+        argon2__memory_cost=ARGON2_MEMORY_COST,
+        argon2__parallelism=ARGON2_PARALLELISM,
+    )
+
+
+_pwd_context = build_context(PASSWORD_SCHEMES)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -9,3 +55,8 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return _pwd_context.hash(password)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """哈希使用了旧算法或旧成本参数（只解析哈希字符串，不做计算）"""
+    return _pwd_context.needs_update(hashed_password)
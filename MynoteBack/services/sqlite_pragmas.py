@@ -0,0 +1,43 @@
+"""
+SQLite 连接参数
+默认的回滚日志模式下写事务会阻塞所有读写，并发写入只能排队，等待超时后报 database is locked。
+每个新连接建立时执行 PRAGMA：WAL 模式下读写互不阻塞，synchronous=NORMAL 只在 checkpoint 时 fsync，
+busy_timeout 让写锁冲突时等待而不是立即失败。
+"""
+
+import logging
+import re
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_VALUE = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+
+def install_sqlite_pragmas(engine: Engine, pragmas: Dict[str, str]) -> None:
+    """
+    为 engine 的每个新连接按顺序执行 PRAGMA name=value；非 SQLite 数据库忽略
+
+    Args:
+        engine: SQLAlchemy Engine
+        pragmas: PRAGMA 名称 -> 值（来自配置，只允许字母、数字、下划线和负号）
+    """
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+    for name, value in pragmas.items():
+        if not _VALUE.match(name) or not _VALUE.match(str(value)):
+            raise ValueError(f"非法的 SQLite PRAGMA 配置: {name}={value}")
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    logger.info(f"[SQLite] PRAGMA {', '.join(f'{k}={v}' for k, v in pragmas.items())}")
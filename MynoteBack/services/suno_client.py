@@ -3,14 +3,43 @@ Suno API 客户端
 负责调用 Suno API 生成音乐
 """
 
+from __future__ import annotations
+
 import asyncio
-import httpx
-from typing import Dict, Optional
+import os
+from typing import Dict, List, Optional, Sequence
 import logging
 from datetime import datetime
 
+from config import (
+    SUNO_HTTP_MAX_CONNECTIONS,
+    SUNO_HTTP_MAX_KEEPALIVE,
+    SUNO_HTTP_KEEPALIVE_EXPIRY,
+    SUNO_HTTP2,
+    SUNO_REFRESH_CONCURRENCY,
+)
+from services.db_executor import run_db
+from services.lazy import LazyModule
+from services.music_task_service import (
+    TERMINAL_STATUSES,
+    list_task_states,
+    bulk_apply_suno_results,
+)
+
 logger = logging.getLogger(__name__)
 
+# httpx 在创建 SunoClient 时才导入（约 100ms），不计入应用冷启动
+httpx = LazyModule("httpx")
+
+
+def _h2_available() -> bool:
+    """HTTP/2 依赖 h2 包（httpx[http2]），未安装时回退 HTTP/1.1"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
 
 class SunoAPIError(Exception):
     """Suno API 错误"""
@@ -23,20 +52,122 @@ class SunoAPIError(Exception):
 class SunoClient:
     """Suno API 客户端"""
     
-    def __init__(self, api_key: str, base_url: str = "https://api.sunoapi.org"):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.sunoapi.org",
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False
+    ):
         """
         初始化 Suno 客户端
         
         Args:
             api_key: Suno API Key
             base_url: API 基础 URL
+            max_connections: 连接池最大连接数
+            max_keepalive_connections: 最大保活（空闲）连接数
+            keepalive_expiry: 空闲连接保活时长（秒）
+            http2: 是否启用 HTTP/2（需要安装 h2）
         """
         self.api_key = api_key
         self.base_url = base_url
         self.timeout = httpx.Timeout(60.0, connect=10.0)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2 and _h2_available()
+        if http2 and not self.http2:
+            logger.warning("[SunoClient] ⚠️ 未安装 h2，HTTP/2 已禁用，回退到 HTTP/1.1")
+        
+        # 进程内共享的长连接客户端（open() 创建，aclose() 关闭）
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # 连接池统计（自行计数，不读取 httpx 连接池的内部状态）
+        self._requests = 0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._connections_opened = 0
+        self._tls_handshakes = 0
         
         logger.info(f"[SunoClient] 初始化完成，Base URL: {base_url}")
     
+    async def open(self) -> None:
+        """创建共享的 httpx.AsyncClient（应用启动时调用）"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2
+            )
+            logger.info(
+                f"[SunoClient] 🔌 连接池已创建，max={self.limits.max_connections}，"
+                f"keepalive={self.limits.max_keepalive_connections}，http2={self.http2}"
+            )
+    
+    async def aclose(self) -> None:
+        """关闭共享客户端，释放所有连接（应用关闭时调用）"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("[SunoClient] 🔌 连接池已关闭")
+        self._client = None
+    
+    async def _get_http_client(self) -> httpx.AsyncClient:
+        """获取共享客户端；未经 open() 的脚本场景下按需创建"""
+        if self._client is None or self._client.is_closed:
+            await self.open()
+        return self._client
+    
+    async def _trace(self, event_name: str, info: Dict) -> None:
+        """httpcore trace 回调：统计新建连接与 TLS 握手次数"""
+        if event_name == "connection.connect_tcp.complete":
+            self._connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            self._tls_handshakes += 1
+    
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """通过共享连接池发送请求"""
+        client = await self._get_http_client()
+        self._requests += 1
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            return await client.request(method, url, extensions={"trace": self._trace}, **kwargs)
+        finally:
+            self._in_flight -= 1
+    
+    def pool_stats(self) -> Dict:
+        """
+        连接池统计（用于容量规划）
+        
+        Returns:
+            {
+                "inFlight": 正在进行的请求数,
+                "peakInFlight": 并发请求数峰值（HTTP/1.1 下接近 maxConnections 说明连接池偏小）,
+                "requests": 累计请求数,
+                "connectionsOpened": 累计新建连接数,
+                "handshakesAvoided": 复用连接节省的握手次数,
+                ...
+            }
+        """
+        return {
+            "open": self._client is not None and not self._client.is_closed,
+            "http2": self.http2,
+            "maxConnections": self.limits.max_connections,
+            "maxKeepaliveConnections": self.limits.max_keepalive_connections,
+            "keepaliveExpiry": self.limits.keepalive_expiry,
+            "inFlight": self._in_flight,
+            "peakInFlight": self._peak_in_flight,
+            "requests": self._requests,
+            "connectionsOpened": self._connections_opened,
+            "tlsHandshakes": self._tls_handshakes,
+            "handshakesAvoided": max(self._requests - self._connections_opened, 0)
+        }
+    
     async def generate_music(
         self,
         prompt: str,
@@ -103,39 +234,38 @@ class SunoClient:
         logger.info(f"[SunoClient] Prompt 长度: {len(prompt)} 字符")
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(url, json=payload, headers=headers)
-                
-                # 检查响应状态
-                if response.status_code != 200:
-                    error_data = response.json() if response.text else {}
-                    error_msg = error_data.get("msg", "Unknown error")
-                    
-                    logger.error(f"[SunoClient] ❌ API 调用失败: {response.status_code}")
-                    logger.error(f"[SunoClient] 错误信息: {error_msg}")
-                    
-                    raise SunoAPIError(response.status_code, error_msg)
-                
-                # 解析响应
-                result = response.json()
-                
-                # 检查响应格式
-                if result.get("code") != 200:
-                    error_msg = result.get("msg", "Unknown error")
-                    logger.error(f"[SunoClient] ❌ 业务错误: {error_msg}")
-                    raise SunoAPIError(result.get("code", 500), error_msg)
-                
-                # 获取 taskId
-                task_id = result.get("data", {}).get("taskId")
-                
-                if not task_id:
-                    logger.error(f"[SunoClient] ❌ 响应中无 taskId: {result}")
-                    raise SunoAPIError(500, "响应中缺少 taskId")
-                
-                logger.info(f"[SunoClient] ✅ 任务创建成功，Task ID: {task_id}")
+            response = await self._request("POST", url, json=payload, headers=headers)
+            
+            # 检查响应状态
+            if response.status_code != 200:
+                error_data = response.json() if response.text else {}
+                error_msg = error_data.get("msg", "Unknown error")
                 
-                return task_id
+                logger.error(f"[SunoClient] ❌ API 调用失败: {response.status_code}")
+                logger.error(f"[SunoClient] 错误信息: {error_msg}")
                 
+                raise SunoAPIError(response.status_code, error_msg)
+            
+            # 解析响应
+            result = response.json()
+            
+            # 检查响应格式
+            if result.get("code") != 200:
+                error_msg = result.get("msg", "Unknown error")
+                logger.error(f"[SunoClient] ❌ 业务错误: {error_msg}")
+                raise SunoAPIError(result.get("code", 500), error_msg)
+            
+            # 获取 taskId
+            task_id = result.get("data", {}).get("taskId")
+            
+            if not task_id:
+                logger.error(f"[SunoClient] ❌ 响应中无 taskId: {result}")
+                raise SunoAPIError(500, "响应中缺少 taskId")
+            
+            logger.info(f"[SunoClient] ✅ 任务创建成功，Task ID: {task_id}")
+            
+            return task_id
+            
         except httpx.TimeoutException:
             logger.error("[SunoClient] ❌ 请求超时")
             raise SunoAPIError(504, "请求超时")
@@ -173,58 +303,57 @@ class SunoClient:
         logger.debug(f"[SunoClient] 查询任务状态: {task_id}")
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url, headers=headers, params=params)
-                
-                if response.status_code != 200:
-                    error_data = response.json() if response.text else {}
-                    error_msg = error_data.get("msg", "Unknown error")
-                    raise SunoAPIError(response.status_code, error_msg)
-                
-                result = response.json()
-                
-                # 检查业务状态码
-                if result.get("code") != 200:
-                    error_msg = result.get("msg", "Unknown error")
-                    raise SunoAPIError(result.get("code", 500), error_msg)
-                
-                # 解析数据
-                data = result.get("data", {})
-                if not data:
-                    logger.warning(f"[SunoClient] ⚠️ 响应中无data字段: {result}")
-                    raise SunoAPIError(500, "响应格式异常")
-                
-                status = data.get("status", "PENDING")
-                
-                # 提取音乐信息（从 response.sunoData 中获取）
-                response_data = data.get("response")
-                music_url = None
-                duration = None
-                
-                if response_data and isinstance(response_data, dict):
-                    suno_data_list = response_data.get("sunoData", [])
-                    
-                    # 获取第一首音乐的信息
-                    if suno_data_list and len(suno_data_list) > 0:
-                        first_music = suno_data_list[0]
-                        music_url = first_music.get("audioUrl")
-                        duration = first_music.get("duration")
-                
-                logger.debug(f"[SunoClient] 任务状态: {status}")
-                
-                # 映射Suno的状态到我们的状态
-                our_status = self._map_suno_status(status)
-                
-                return {
-                    "taskId": task_id,
-                    "status": our_status,
-                    "musicUrl": music_url,
-                    "duration": int(duration) if duration else None,
-                    "createdAt": None,  # Suno API未返回此字段
-                    "finishedAt": None,
-                    "failedReason": data.get("errorMessage")
-                }
+            response = await self._request("GET", url, headers=headers, params=params)
+            
+            if response.status_code != 200:
+                error_data = response.json() if response.text else {}
+                error_msg = error_data.get("msg", "Unknown error")
+                raise SunoAPIError(response.status_code, error_msg)
+            
+            result = response.json()
+            
+            # 检查业务状态码
+            if result.get("code") != 200:
+                error_msg = result.get("msg", "Unknown error")
+                raise SunoAPIError(result.get("code", 500), error_msg)
+            
+            # 解析数据
+            data = result.get("data", {})
+            if not data:
+                logger.warning(f"[SunoClient] ⚠️ 响应中无data字段: {result}")
+                raise SunoAPIError(500, "响应格式异常")
+            
+            status = data.get("status", "PENDING")
+            
+            # 提取音乐信息（从 response.sunoData 中获取）
+            response_data = data.get("response")
+            music_url = None
+            duration = None
+            
+            if response_data and isinstance(response_data, dict):
+                suno_data_list = response_data.get("sunoData", [])
                 
+                # 获取第一首音乐的信息
+                if suno_data_list and len(suno_data_list) > 0:
+                    first_music = suno_data_list[0]
+                    music_url = first_music.get("audioUrl")
+                    duration = first_music.get("duration")
+            
+            logger.debug(f"[SunoClient] 任务状态: {status}")
+            
+            # 映射Suno的状态到我们的状态
+            our_status = self._map_suno_status(status)
+            
+            return {
+                "taskId": task_id,
+                "status": our_status,
+                "musicUrl": music_url,
+                "duration": int(duration) if duration else None,
+                "createdAt": None,  # Suno API未返回此字段
+                "finishedAt": None,
+                "failedReason": data.get("errorMessage")
+            }
+            
         except httpx.TimeoutException:
             logger.error(f"[SunoClient] ❌ 查询超时: {task_id}")
             raise SunoAPIError(504, "查询超时")
@@ -339,21 +468,22 @@ class SunoClient:
             url = f"{self.base_url}/api/v1/query/health_check_dummy"
             headers = {"Authorization": f"Bearer {self.api_key}"}
             
-            async with httpx.AsyncClient(timeout=httpx.Timeout(10.0)) as client:
-                response = await client.get(url, headers=headers)
+            response = await self._request(
+                "GET", url, headers=headers, timeout=httpx.Timeout(10.0)
+            )
+            
+            # 如果返回 404 说明服务可用但任务不存在（正常）
+            # 如果返回 401 说明 API Key 无效
+            if response.status_code in [200, 404]:
+                logger.info("[SunoClient] ✅ 健康检查通过")
+                return True
+            elif response.status_code == 401:
+                logger.error("[SunoClient] ❌ API Key 无效")
+                return False
+            else:
+                logger.warning(f"[SunoClient] ⚠️ 健康检查异常: {response.status_code}")
+                return False
                 
-                # 如果返回 404 说明服务可用但任务不存在（正常）
-                # 如果返回 401 说明 API Key 无效
-                if response.status_code in [200, 404]:
-                    logger.info("[SunoClient] ✅ 健康检查通过")
-                    return True
-                elif response.status_code == 401:
-                    logger.error("[SunoClient] ❌ API Key 无效")
-                    return False
-                else:
-                    logger.warning(f"[SunoClient] ⚠️ 健康检查异常: {response.status_code}")
-                    return False
-                    
         except Exception as e:
             logger.error(f"[SunoClient] ❌ 健康检查失败: {str(e)}")
             return False
@@ -389,8 +519,22 @@ class MockSunoClient:
     async def health_check(self) -> bool:
         return True
 
+    async def open(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+    def pool_stats(self) -> Dict:
+        return {"open": False, "mock": True}
+
 class SunoClientFactory:
-    """Suno 客户端工厂（单例模式）"""
+    """
+    Suno 客户端工厂（单例模式）
+    
+    每个进程持有一个 SunoClient，其内部的 httpx.AsyncClient 在应用启动时
+    创建（startup），关闭时释放（shutdown），所有请求复用同一个连接池。
+    """
     
     _instance: Optional[SunoClient] = None
     _api_key: Optional[str] = None
@@ -414,17 +558,157 @@ class SunoClientFactory:
                 raise ValueError("首次调用必须提供 api_key (或设置 SUNO_API_KEY 环境变量)")
             
             cls._api_key = api_key
-            cls._instance = SunoClient(api_key=api_key)
+            cls._instance = SunoClient(
+                api_key=api_key,
+                max_connections=SUNO_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=SUNO_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=SUNO_HTTP_KEEPALIVE_EXPIRY,
+                http2=SUNO_HTTP2
+            )
             logger.info("[SunoClientFactory] 创建新的 Suno 客户端实例")
         
         return cls._instance
     
+    @classmethod
+    async def startup(cls) -> None:
+        """应用启动时创建共享连接池（未配置 API Key 时跳过）"""
+        try:
+            client = cls.get_client()
+        except ValueError:
+            logger.warning("[SunoClientFactory] ⚠️ SUNO_API_KEY 未配置，跳过连接池初始化")
+            return
+        await client.open()
+    
+    @classmethod
+    async def shutdown(cls) -> None:
+        """应用关闭时释放连接池"""
+        if cls._instance is not None:
+            await cls._instance.aclose()
+    
+    @classmethod
+    def pool_stats(cls) -> Dict:
+        """当前进程的连接池统计"""
+        if cls._instance is None:
+            return {"open": False}
+        return cls._instance.pool_stats()
+    
     @classmethod
     def reset(cls):
         cls._instance = None
         cls._api_key = None
 
 
+class SunoBatchRefresher:
+    """
+    批量状态刷新引擎
+    
+    一次 sweep 处理一批任务：
+    1. 一条查询取出这些任务在数据库中的状态
+    2. 对未完成的任务以有界并发查询 Suno
+    3. 用一条批量 UPDATE 回写结果
+    
+    /music/query 直接读取 sweep 写入的最新状态，不再各自访问 Suno。
+    """
+    
+    def __init__(self, concurrency: int = 8):
+        """
+        Args:
+            concurrency: 单次 sweep 内同时查询 Suno 的最大请求数
+        """
+        self.concurrency = concurrency
+        
+        # 统计
+        self.last_sweep_at: Optional[datetime] = None
+        self._sweeps = 0
+        self._queried = 0
+        self._updated = 0
+        self._errors = 0
+    
+    async def sweep(self, task_ids: Optional[Sequence[str]] = None) -> Dict[str, Dict]:
+        """
+        刷新一批任务的状态
+        
+        Args:
+            task_ids: 需要刷新的任务；为 None 时刷新所有未完成任务
+            
+        Returns:
+            {
+                task_id: {
+                    "status": 刷新后的状态,
+                    "createdAt": 创建时间,
+                    "error": 查询失败时的 SunoAPIError，否则为 None
+                }
+            }
+            数据库中不存在的任务不会出现在结果里
+        """
+        rows = await run_db(list_task_states, task_ids)
+        
+        active = [(pk, task_id) for pk, task_id, status, _ in rows if status not in TERMINAL_STATUSES]
+        results = await self._query_many([task_id for _, task_id in active])
+        
+        updates = {
+            pk: results[task_id]
+            for pk, task_id in active
+            if not isinstance(results[task_id], SunoAPIError)
+        }
+        if updates:
+            self._updated += await run_db(bulk_apply_suno_results, updates)
+        
+        self._sweeps += 1
+        self.last_sweep_at = datetime.utcnow()
+        
+        states = {}
+        for _, task_id, status, created_at in rows:
+            result = results.get(task_id)
+            if isinstance(result, SunoAPIError):
+                states[task_id] = {"status": status, "createdAt": created_at, "error": result}
+            elif result is not None:
+                states[task_id] = {"status": result["status"], "createdAt": created_at, "error": None}
+            else:
+                states[task_id] = {"status": status, "createdAt": created_at, "error": None}
+        return states
+    
+    async def _query_many(self, task_ids: List[str]) -> Dict[str, object]:
+        """有界并发查询；单个任务失败时返回 SunoAPIError，不影响其他任务（该任务留到下一轮）"""
+        if not task_ids:
+            return {}
+        
+        suno_client = SunoClientFactory.get_client()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def query_one(task_id: str):
+            async with semaphore:
+                try:
+                    return await suno_client.query_task(task_id)
+                except SunoAPIError as e:
+                    self._errors += 1
+                    logger.warning(f"[SunoBatchRefresher] ⚠️ 查询失败: {task_id}，{e}")
+                    return e
+                except Exception as e:
+                    # 响应格式异常等非预期错误：同样只影响该任务，不让整批 sweep 失败
+                    self._errors += 1
+                    logger.error(f"[SunoBatchRefresher] ❌ 查询异常: {task_id}，{str(e)}", exc_info=True)
+                    return SunoAPIError(500, f"查询异常: {str(e)}")
+        
+        self._queried += len(task_ids)
+        results = await asyncio.gather(*(query_one(task_id) for task_id in task_ids))
+        return dict(zip(task_ids, results))
+    
+    def stats(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "sweeps": self._sweeps,
+            "queried": self._queried,
+            "updated": self._updated,
+            "errors": self._errors,
+            "lastSweepAt": self.last_sweep_at.isoformat() if self.last_sweep_at else None
+        }
+
+
+# 单例
+batch_refresher = SunoBatchRefresher(concurrency=SUNO_REFRESH_CONCURRENCY)
+
+
 # 错误码映射表（用于前端友好提示）
 ERROR_CODE_MAP = {
     400: "请求参数错误，请检查输入",
@@ -0,0 +1,188 @@
+"""
+登录令牌
+无状态的 HMAC-SHA256 签名令牌：校验只需一次 HMAC 计算，不访问数据库。
+- access token：短期有效，放在 Authorization: Bearer 请求头中
+- refresh token：长期有效，只用于换取新的令牌对（换取后旧的 refresh token 作废）
+注销时把 access token 的 id（jti）放入进程内的撤销集合，保留到令牌原本的过期时间；
+作废的 refresh token 写入数据库（revoked_tokens），所有进程共享，每个 refresh token 只能换取一次。
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from datetime import datetime, timezone
+from typing import Dict
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import (
+    AUTH_SECRET_KEY,
+    AUTH_DEV_MODE,
+    ACCESS_TOKEN_TTL_SECONDS,
+    REFRESH_TOKEN_TTL_SECONDS,
+    TOKEN_REVOCATION_SIZE,
+)
+from models.user import RevokedToken
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+# 清理 revoked_tokens 中已过期记录的最短间隔（秒）
+_PURGE_INTERVAL = 3600
+
+
+class TokenError(Exception):
+    """令牌格式错误、签名不匹配、已过期或已撤销"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class TokenService:
+    """签发、校验、撤销令牌"""
+
+    def __init__(self, secret: bytes, access_ttl: int, refresh_ttl: int, revocation_size: int = 100_000):
+        """
+        Args:
+            secret: HMAC 密钥
+            access_ttl / refresh_ttl: 有效期（秒）
+            revocation_size: 撤销集合最多保留的令牌数
+        """
+        self._secret = secret
+        self.ttl = {ACCESS: access_ttl, REFRESH: refresh_ttl}
+        # jti -> True，过期时间与令牌一致
+        self._revoked = TTLCache(maxsize=revocation_size, ttl=refresh_ttl)
+        self._last_purge = 0.0
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self._secret, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def _encode(self, user_id: int, token_type: str, now: int) -> str:
+        claims = {
+            "sub": user_id,
+            "typ": token_type,
+            "iat": now,
+            "exp": now + self.ttl[token_type],
+            "jti": secrets.token_hex(8),
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        return f"{payload}.{self._sign(payload)}"
+
+    def issue(self, user_id: int) -> Dict:
+        """签发一对 access / refresh 令牌"""
+        now = int(time.time())
+        return {
+            "accessToken": self._encode(user_id, ACCESS, now),
+            "refreshToken": self._encode(user_id, REFRESH, now),
+            "tokenType": "bearer",
+            "expiresIn": self.ttl[ACCESS],
+        }
+
+    def verify(self, token: str, token_type: str = ACCESS) -> Dict:
+        """
+        校验令牌并返回其中的声明
+
+        Raises:
+            TokenError: 令牌无效、类型不符、已过期或已撤销
+        """
+        payload, _, signature = token.partition(".")
+        try:
+            valid = bool(signature) and hmac.compare_digest(
+                signature.encode("ascii"), self._sign(payload).encode("ascii")
+            )
+        except UnicodeEncodeError:
+            # 请求头中的非 ASCII 字符
+            raise TokenError("malformed token")
+        if not valid:
+            raise TokenError("invalid signature")
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            raise TokenError("malformed token")
+
+        if claims.get("typ") != token_type:
+            raise TokenError("wrong token type")
+        if claims.get("exp", 0) <= time.time():
+            raise TokenError("token expired")
+        if claims.get("jti") in self._revoked:
+            raise TokenError("token revoked")
+        return claims
+
+    def revoke(self, claims: Dict) -> None:
+        """在本进程内撤销令牌，保留到令牌原本的过期时间"""
+        remaining = claims["exp"] - time.time()
+        if remaining > 0:
+            self._revoked.set(claims["jti"], True, ttl=remaining)
+
+    def redeem(self, db: Session, claims: Dict) -> bool:
+        """
+        作废 refresh token；已被作废过（包括在其他进程中）时返回 False
+
+        以 jti 为主键写入 revoked_tokens，并发换取同一个令牌时只有一个 INSERT 成功。
+        """
+        expires_at = datetime.fromtimestamp(claims["exp"], timezone.utc)
+        db.add(RevokedToken(jti=claims["jti"], expires_at=expires_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        self.revoke(claims)
+        self._purge_expired(db)
+        return True
+
+    def _purge_expired(self, db: Session) -> None:
+        # 已过期的令牌本身无法通过校验，作废记录不再需要
+        now = time.time()
+        if now - self._last_purge < _PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        db.query(RevokedToken).filter(RevokedToken.expires_at < datetime.now(timezone.utc)).delete(
+            synchronize_session=False
+        )
+        db.commit()
+
+    def stats(self) -> Dict:
+        return {
+            "accessTtl": self.ttl[ACCESS],
+            "refreshTtl": self.ttl[REFRESH],
+            "revoked": self._revoked.stats()
+        }
+
+
+class SecretKeyMissing(RuntimeError):
+    """未配置 AUTH_SECRET_KEY"""
+
+
+def _secret_key() -> bytes:
+    if AUTH_SECRET_KEY:
+        return AUTH_SECRET_KEY.encode("utf-8")
+    # 随机密钥只在当前进程内有效：重启、worker 轮换、未 preload 的多 worker、多实例时令牌都会失效
+    if not AUTH_DEV_MODE:
+        raise SecretKeyMissing(
+            "AUTH_SECRET_KEY 未配置；本地开发可设置 AUTH_DEV_MODE=true 使用每次启动随机生成的密钥"
+        )
+    logger.warning("[Tokens] ⚠️ AUTH_DEV_MODE：使用随机密钥（重启后已签发的令牌失效）")
+    return secrets.token_bytes(32)
+
+
+# 单例
+token_service = TokenService(
+    secret=_secret_key(),
+    access_ttl=ACCESS_TOKEN_TTL_SECONDS,
+    refresh_ttl=REFRESH_TOKEN_TTL_SECONDS,
+    revocation_size=TOKEN_REVOCATION_SIZE
+)
@@ -1,8 +1,29 @@
-from typing import Optional, Tuple
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Optional, Set, Tuple
+from sqlalchemy import case, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from config import USER_PROFILE_CACHE_TTL, USER_PROFILE_CACHE_SIZE
 from models.user import User
-from services.security import get_password_hash, verify_password
+from schemas.user import UserOut
+from services.cache import TTLCache
+from services.db_executor import run_db
+from services.response import encode_success
+from services.password_hasher import PasswordHasherBusy, hash_password, check_password
+
+logger = logging.getLogger(__name__)
+
+# 后台密码升级任务（保留引用，避免任务在完成前被回收）
+_rehash_tasks: Set[asyncio.Task] = set()
+
+# 测试账号密码哈希，每个进程只计算一次
+_admin_password_hash: Optional[str] = None
+
+# 用户资料缓存：user_id -> (ETag, 完整响应 JSON)；用户数据写入时失效
+_profile_cache = TTLCache(maxsize=USER_PROFILE_CACHE_SIZE, ttl=USER_PROFILE_CACHE_TTL)
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
@@ -17,58 +38,178 @@ def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     return db.query(User).filter(User.id == user_id).first()
 
 
+def user_to_dict(user: User) -> Dict:
+    return UserOut.model_validate(user).model_dump()
+
+
+# -------- 用户资料缓存 --------
+
+def get_user_profile(db: Session, user_id: int) -> Optional[Tuple[str, bytes]]:
+    """
+    返回 (ETag, 响应 JSON)；用户不存在时返回 None（不缓存）
+    """
+    profile = _profile_cache.get(user_id)
+    if profile is not None:
+        return profile
+
+    user = get_user_by_id(db, user_id)
+    if not user:
+        return None
+    body = encode_success(data=UserOut.model_validate(user).model_dump(mode="json"))
+    profile = (f'"{hashlib.sha256(body).hexdigest()[:32]}"', body)
+    _profile_cache.set(user_id, profile)
+    return profile
+
+
+def invalidate_user_profile(user_id: int) -> None:
+    _profile_cache.pop(user_id)
+
+
+def profile_cache_stats() -> Dict:
+    return _profile_cache.stats()
+
+
+# -------- 数据库操作（同步，通过 run_db 在数据库线程池中执行，只返回普通数据） --------
+
 def create_user(
     db: Session,
     *,
     email: Optional[str],
     phone: Optional[str],
     username: Optional[str],
-    password: str,
-) -> Tuple[Optional[User], Optional[str]]:
-    if email:
-        exists = get_user_by_email(db, email)
-        if exists:
+    password_hash: str,
+) -> Tuple[Optional[Dict], Optional[str]]:
+    # 直接插入，由 email / phone 的唯一约束判断是否重复；只有冲突时才多查一次
+    user = User(email=email, phone=phone, username=username, password_hash=password_hash)
+    db.add(user)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        if email and get_user_by_email(db, email):
             return None, "Email already registered"
-    if phone:
-        exists = get_user_by_phone(db, phone)
-        if exists:
-            return None, "Phone already registered"
+        return None, "Phone already registered"
+
+    # flush 后 id / created_at 已就绪，commit 前序列化，避免 commit 过期后重新加载
+    data = user_to_dict(user)
+    db.commit()
+    invalidate_user_profile(data["id"])
+    return data, None
+
+
+def get_login_record(db: Session, login: str) -> Optional[Tuple[Dict, str]]:
+    """按邮箱或手机号查找用户（一条查询，两列都有唯一索引），返回 (用户数据, 密码哈希)"""
+    query = db.query(User)
+    if "@" in login:
+        # 可能同时匹配两个用户（一个的邮箱、另一个的手机号），优先邮箱
+        query = query.filter(or_(User.email == login, User.phone == login)).order_by(
+            case((User.email == login, 0), else_=1)
+        )
+    else:
+        query = query.filter(User.phone == login)
+    user = query.first()
+    if not user:
+        return None
+    return user_to_dict(user), user.password_hash
+
+
+def update_password_hash(db: Session, user_id: int, old_hash: str, new_hash: str) -> bool:
+    """只在哈希未被并发修改时替换（例如同时修改了密码）"""
+    updated = (
+        db.query(User)
+        .filter(User.id == user_id, User.password_hash == old_hash)
+        .update({User.password_hash: new_hash}, synchronize_session=False)
+    )
+    db.commit()
+    # 所有用户写操作都使缓存失效（资料中暂不含密码相关字段，但不依赖这一点）
+    invalidate_user_profile(user_id)
+    return bool(updated)
+
 
-    hashed = get_password_hash(password)
-    user = User(email=email, phone=phone, username=username, password_hash=hashed)
+def get_admin_user(db: Session) -> Optional[Dict]:
+    user = db.query(User).filter(User.username == "admin").first()
+    return user_to_dict(user) if user else None
+
+
+def create_admin_user(db: Session, password_hash: str) -> Optional[Dict]:
+    user = User(
+        email="admin@mynote.com",
+        phone="13800138000",
+        username="admin",
+        password_hash=password_hash
+    )
     db.add(user)
+    try:
+        db.flush()
+    except IntegrityError:
+        # 并发的首次 admin 登录已经创建了该用户
+        db.rollback()
+        return get_admin_user(db)
+    data = user_to_dict(user)
     db.commit()
-    db.refresh(user)
-    return user, None
+    invalidate_user_profile(data["id"])
+    return data
+
+
+# -------- 注册 / 登录（密码哈希在进程池中计算） --------
+
+async def register_user(
+    *,
+    email: Optional[str],
+    phone: Optional[str],
+    username: Optional[str],
+    password: str,
+) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Raises:
+        PasswordHasherBusy: 哈希进程池排队已满
+    """
+    hashed = await hash_password(password)
+    return await run_db(create_user, email=email, phone=phone, username=username, password_hash=hashed)
 
 
-def authenticate_user(db: Session, *, login: str, password: str) -> Optional[User]:
+async def authenticate_user(*, login: str, password: str) -> Optional[Dict]:
+    """
+    Raises:
+        PasswordHasherBusy: 哈希进程池排队已满
+    """
     # 特殊测试账号：admin / 123456
     if login == "admin" and password == "123456":
         # 检查是否已存在 admin 测试用户
-        test_user = db.query(User).filter(User.username == "admin").first()
+        test_user = await run_db(get_admin_user)
         if not test_user:
             # 创建测试用户
-            hashed = get_password_hash("123456")
-            test_user = User(
-                email="admin@mynote.com",
-                phone="13800138000",
-                username="admin",
-                password_hash=hashed
-            )
-            db.add(test_user)
-            db.commit()
-            db.refresh(test_user)
+            global _admin_password_hash
+            if _admin_password_hash is None:
+                _admin_password_hash = await hash_password("123456")
+            test_user = await run_db(create_admin_user, _admin_password_hash)
         return test_user
-    
+
     # 正常登录流程
-    user = None
-    if "@" in login:
-        user = get_user_by_email(db, login)
-    if not user:
-        user = get_user_by_phone(db, login)
-    if not user:
+    record = await run_db(get_login_record, login)
+    if not record:
         return None
-    if not verify_password(password, user.password_hash):
+    user, password_hash = record
+    if not await check_password(password, password_hash):
         return None
+
+    # 旧算法 / 旧成本的哈希在后台用当前配置重新计算，不增加本次登录的延迟
+    from services.security import needs_rehash
+
+    if needs_rehash(password_hash):
+        task = asyncio.create_task(_rehash_password(user["id"], password, password_hash))
+        _rehash_tasks.add(task)
+        task.add_done_callback(_rehash_tasks.discard)
     return user
+
+
+async def _rehash_password(user_id: int, password: str, old_hash: str) -> None:
+    try:
+        new_hash = await hash_password(password)
+        if await run_db(update_password_hash, user_id, old_hash, new_hash):
+            logger.info(f"[UserService] 🔐 用户 {user_id} 的密码哈希已升级")
+    except PasswordHasherBusy:
+        # 进程池繁忙时跳过，下次登录再升级
+        pass
+    except Exception as e:
+        logger.error(f"[UserService] ❌ 密码哈希升级失败: {str(e)}", exc_info=True)
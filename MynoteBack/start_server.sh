@@ -57,6 +57,15 @@ else
     echo "✅ 数据库文件存在"
 fi
 
+# 升级数据库结构（Web 进程启动时只检查版本，不再建表）
+echo ""
+echo "🗄️  升级数据库结构..."
+python -m alembic upgrade head
+if [ $? -ne 0 ]; then
+    echo "❌ 数据库迁移失败"
+    exit 1
+fi
+
 # 启动服务器
 echo ""
 echo "================================"